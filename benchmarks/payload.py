@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+#
+# © 2016-2018 Salesforce.com, inc.
+#
+"""
+Synthetic payloads of the OLAP reports of Cloud Health Tech API
+"""
+
+#
+# Standard libraries
+#
+
+from __future__ import absolute_import
+import random
+from datetime import datetime, timedelta
+
+
+# First date of the generated reports
+START_DATE = datetime(2018, 1, 1)
+
+# Fraction of the generated costs that are missing
+MISSING_RATIO = 0.05
+
+
+def generate_api_call(categories, services, depth=1, seed=0):
+    """
+    Returns an API call of an hourly report shaped like the ones returned by Cloud Health Tech.
+
+    The services are grouped under a summary service every 10 services and followed by a total, like the API does.
+
+    :argument categories: Number of dates in the report
+    :argument services: Number of services in the report, excluding the summary services and the total
+    :argument depth: Number of measures of each service
+    :argument seed: Seed of the random costs, so that the payloads are the same across runs
+    """
+    rng = random.Random(seed)
+
+    items = []
+    for index in range(services):
+        if index % 10 == 0:
+            parent = len(items)
+            group = index // 10
+            items.append({'label': 'Group {0}'.format(group), 'name': 'group_{0}'.format(group), 'parent': -1})
+        items.append({'label': 'Service {0}'.format(index), 'name': 'service_{0}'.format(index), 'parent': parent})
+    items.append({'label': 'Total', 'name': 'total', 'parent': -1})
+
+    dates = [
+        {'label': (START_DATE + timedelta(hours=index)).strftime('%Y-%m-%dT%H:00'), 'name': str(index)}
+        for index in range(categories)
+    ]
+
+    data = [
+        [
+            [None if rng.random() < MISSING_RATIO else rng.random() * 1000 for _ in range(depth)]
+            for _ in items
+        ]
+        for _ in dates
+    ]
+
+    return {
+        'report': 'Benchmark',
+        'dimensions': [
+            {'time': dates},
+            {'AWS-Service-Category': items},
+        ],
+        'measures': [{'label': 'Cost ($)', 'name': 'cost'}] * depth,
+        'interval': 'hourly',
+        'data': data,
+    }
@@ -0,0 +1,316 @@
+# -*- coding: utf-8 -*-
+#
+# © 2016-2018 Salesforce.com, inc.
+#
+"""
+Benchmarks of the parse and export hot paths against a local stand-in for Cloud Health Tech API.
+
+Run with `python -m benchmarks.run` from the root of the repository. Exits with 1 when a benchmark is slower, or uses
+more memory, than the stored baseline by more than the tolerance. The times are compared relative to a calibration run
+timed on each host, so that a baseline recorded on another host still holds.
+"""
+
+#
+# Standard libraries
+#
+
+from __future__ import absolute_import, print_function
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import subprocess
+import sys
+import time
+from collections import OrderedDict
+
+#
+# Third party libraries
+#
+
+from mock import patch
+
+#
+# Internal libraries
+#
+
+from krux.cli import get_parser
+from benchmarks.payload import generate_api_call
+from benchmarks.server import PayloadServer
+from krux_cloud_health.cloud_health import add_cloud_health_cli_arguments, get_cloud_health, NAME
+
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+DEFAULT_TOLERANCE = 0.25
+# Peak memory differences below this number of KB are noise
+MEMORY_NOISE = 4096
+
+# Shape of the report that the calibration run serializes and parses with the standard library only, so that its time
+# depends on the host and the interpreter but not on this code
+CALIBRATION_SHAPE = (744, 100)
+
+API_KEY = 'benchmark'
+REPORT = 'olap_reports/custom/1'
+PARAMS = {'interval': 'hourly'}
+
+# Set by main() before the benchmarks are forked, so that the children share it without pickling it.
+_CONTEXT = {}
+
+
+class _Sink(object):
+    """
+    Standard output that discards what the stdout Graphite sender writes.
+    """
+
+    def write(self, data):
+        pass
+
+    def flush(self):
+        pass
+
+
+def _get_cloud_health():
+    parser = get_parser(description=NAME)
+    add_cloud_health_cli_arguments(parser)
+
+    cloud_health = get_cloud_health(args=parser.parse_args([API_KEY, '--no-cache']))
+    cloud_health._API_ENDPOINT = _CONTEXT['url']
+
+    return cloud_health
+
+
+def _setup_get_api_call():
+    cloud_health = _get_cloud_health()
+    return lambda: cloud_health._get_api_call(REPORT, API_KEY, PARAMS)
+
+
+def _setup_get_data():
+    cloud_health = _get_cloud_health()
+    api_call = _CONTEXT['api_call']
+    return lambda: cloud_health._get_data(api_call, 'time', exclude_summary=False)
+
+
+def _setup_get_data_processes():
+    cloud_health = _get_cloud_health()
+    cloud_health.parse_processes = multiprocessing.cpu_count()
+    api_call = _CONTEXT['api_call']
+    return lambda: cloud_health._get_data(api_call, 'time', exclude_summary=False)
+
+
+def _setup_get_data_info():
+    cloud_health = _get_cloud_health()
+    api_call = _CONTEXT['api_call']
+    dates = api_call['dimensions'][0]['time']
+    services = api_call['dimensions'][1]['AWS-Service-Category']
+
+    def run():
+        for index, date in enumerate(dates):
+            cloud_health._get_data_info(api_call, services, date['label'], index, exclude_summary=False)
+
+    return run
+
+
+def _setup_export():
+    # GOTCHA: Imported here so that bin is only needed by this benchmark.
+    from bin.cloud_health_to_graphite import Application
+
+    argv = ['prog', API_KEY] + [str(report_id) for report_id in range(1, _CONTEXT['reports'] + 1)]
+    argv += ['--no-cache', '--log-level', 'error', '--graphite-mode', 'stdout']
+    argv += ['--interval', 'hourly', '--date-format', '%Y-%m-%dT%H:%M']
+
+    with patch('sys.argv', argv):
+        app = Application()
+    app.cloud_health._API_ENDPOINT = _CONTEXT['url']
+
+    # The datapoints are formatted but not written anywhere.
+    sys.stdout = _Sink()
+
+    return app.run
+
+
+def _setup_startup():
+    # GOTCHA: The modules are already loaded in this process. Time a new interpreter showing the --help instead.
+    command = [sys.executable, '-m', 'bin.cloud_health_to_graphite', '--help']
+    devnull = open(os.devnull, 'w')
+
+    return lambda: subprocess.check_call(command, stdout=devnull)
+
+
+# Name of each benchmark, with the function returning the callable to time and the number of reports it processes
+# (None for --reports, 0 for none)
+BENCHMARKS = OrderedDict([
+    ('get_api_call', (_setup_get_api_call, 1)),
+    ('get_data', (_setup_get_data, 1)),
+    ('get_data_processes', (_setup_get_data_processes, 1)),
+    ('get_data_info', (_setup_get_data_info, 1)),
+    ('export', (_setup_export, None)),
+    ('startup', (_setup_startup, 0)),
+])
+
+
+def _run_benchmark(name, repeat):
+    """
+    Runs a benchmark in this process and returns the best time of the runs and the peak memory in KB they added.
+    """
+    setup, _ = BENCHMARKS[name]
+    try:
+        run = setup()
+    except SystemExit as e:
+        # GOTCHA: A worker that exits is never replaced and the pool would wait for its result forever.
+        raise RuntimeError('Setup of {0} exited with {1}'.format(name, e.code))
+
+    # GOTCHA: ru_maxrss is the peak of the whole process. Only the growth since the setup is due to the benchmark.
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    seconds = None
+    for _ in range(repeat):
+        start = time.time()
+        run()
+        elapsed = time.time() - start
+        seconds = elapsed if seconds is None else min(seconds, elapsed)
+
+    return seconds, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before
+
+
+def _fork_benchmark(name, repeat):
+    """
+    Runs a benchmark in a fresh process so that its peak memory is not hidden by the previous ones.
+    """
+    pool = multiprocessing.Pool(1, maxtasksperchild=1)
+    try:
+        return pool.apply(_run_benchmark, (name, repeat))
+    finally:
+        pool.close()
+        pool.join()
+
+
+def _calibrate(repeat):
+    """
+    Returns the best time of the runs of a fixed workload, the unit in which the benchmarks are compared across hosts.
+    """
+    api_call = generate_api_call(*CALIBRATION_SHAPE)
+
+    seconds = None
+    for _ in range(repeat):
+        start = time.time()
+        json.loads(json.dumps(api_call))
+        elapsed = time.time() - start
+        seconds = elapsed if seconds is None else min(seconds, elapsed)
+
+    return seconds
+
+
+def _get_regressions(name, result, baseline, tolerance, scale=1.0):
+    """
+    Returns the descriptions of how the given result regressed compared to the baseline.
+
+    :argument scale: Ratio of the calibration time of this host to the one of the host of the baseline
+    """
+    expected = baseline.get(name)
+    if expected is None:
+        return []
+
+    regressions = []
+    expected_seconds = expected['seconds'] * scale
+    if result['seconds'] > expected_seconds * (1 + tolerance):
+        regressions.append('{0}: {1:.4f}s instead of {2:.4f}s'.format(name, result['seconds'], expected_seconds))
+
+    extra_memory = result['peak_kb'] - expected['peak_kb']
+    if extra_memory > MEMORY_NOISE and result['peak_kb'] > expected['peak_kb'] * (1 + tolerance):
+        regressions.append('{0}: {1} KB instead of {2} KB'.format(name, result['peak_kb'], expected['peak_kb']))
+
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--categories', type=int, default=744, help='Number of dates per report (default: %(default)s)')
+    parser.add_argument('--services', type=int, default=100, help='Number of services (default: %(default)s)')
+    parser.add_argument('--depth', type=int, default=1, help='Number of measures per service (default: %(default)s)')
+    parser.add_argument('--reports', type=int, default=4, help='Number of reports exported (default: %(default)s)')
+    parser.add_argument('--repeat', type=int, default=5, help='Number of runs of each benchmark (default: %(default)s)')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Baseline file (default: %(default)s)')
+    parser.add_argument(
+        '--tolerance',
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help='Fraction by which a benchmark can exceed the baseline (default: %(default)s)',
+    )
+    parser.add_argument('--save', action='store_true', help='Save the results as the new baseline')
+    parser.add_argument(
+        'benchmark',
+        nargs='*',
+        help='Benchmarks to run (default: all of {0})'.format(', '.join(BENCHMARKS)),
+    )
+    args = parser.parse_args(argv)
+
+    unknown = set(args.benchmark) - set(BENCHMARKS)
+    if unknown:
+        parser.error('Unknown benchmarks: {0}'.format(', '.join(sorted(unknown))))
+
+    parameters = {
+        'categories': args.categories,
+        'services': args.services,
+        'depth': args.depth,
+        'reports': args.reports,
+    }
+
+    try:
+        with open(args.baseline) as f:
+            stored = json.load(f)
+    except IOError:
+        stored = {}
+
+    # GOTCHA: A baseline without a calibration was recorded before the times were compared across hosts. It cannot be
+    #         scaled to this host, so it is ignored.
+    if stored.get('parameters') == parameters and stored.get('calibration'):
+        baseline = stored.get('results', {})
+    else:
+        baseline = {}
+        if not args.save:
+            print('No baseline for these parameters. Nothing to compare to.', file=sys.stderr)
+
+    calibration = _calibrate(args.repeat)
+    scale = calibration / stored['calibration'] if baseline else 1.0
+    print('Calibration: {0:.4f}s ({1:.2f}x the baseline host)'.format(calibration, scale))
+
+    _CONTEXT['api_call'] = generate_api_call(args.categories, args.services, args.depth)
+    _CONTEXT['reports'] = args.reports
+
+    results = OrderedDict()
+    regressions = []
+    with PayloadServer(_CONTEXT['api_call']) as server:
+        _CONTEXT['url'] = server.url
+        print('Payload: {0:.1f} MB'.format(server.size / 1024.0 / 1024.0))
+
+        for name in args.benchmark or BENCHMARKS:
+            seconds, peak_kb = _fork_benchmark(name, args.repeat)
+
+            reports = BENCHMARKS[name][1]
+            cells = args.categories * args.services * (args.reports if reports is None else reports)
+            results[name] = {'seconds': seconds, 'peak_kb': peak_kb}
+
+            print('{0:<20} {1:>10.4f}s {2:>12.0f} cells/s {3:>10} KB'.format(name, seconds, cells / seconds, peak_kb))
+            regressions += _get_regressions(name, results[name], baseline, args.tolerance, scale)
+
+    if args.save:
+        # The results kept from the previous baseline are scaled to the calibration of this host.
+        kept = dict(
+            (name, dict(result, seconds=result['seconds'] * scale))
+            for name, result in baseline.items()
+            if name not in results
+        )
+        stored = {'parameters': parameters, 'calibration': calibration, 'results': dict(kept, **results)}
+        with open(args.baseline, 'w') as f:
+            json.dump(stored, f, indent=2, separators=(',', ': '), sort_keys=True)
+            f.write('\n')
+
+    for regression in regressions:
+        print('REGRESSION ' + regression, file=sys.stderr)
+
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
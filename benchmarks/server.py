@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+#
+# © 2016-2018 Salesforce.com, inc.
+#
+"""
+Local stand-in for Cloud Health Tech API
+"""
+
+#
+# Standard libraries
+#
+
+from __future__ import absolute_import
+import json
+import threading
+
+#
+# Third party libraries
+#
+
+from six.moves.BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from six.moves.socketserver import ThreadingMixIn
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class PayloadServer(object):
+    """
+    HTTP server on localhost answering every GET with the same JSON payload.
+    """
+
+    def __init__(self, payload):
+        """
+        :argument payload: Object returned as JSON for every request
+        """
+        # Encode once so that the server is not part of what is measured.
+        body = json.dumps(payload).encode('utf-8')
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.size = len(body)
+        self._server = _ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+
+    @property
+    def url(self):
+        return 'http://{0}:{1}/'.format(*self._server.server_address)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+#
+# © 2016-2018 Salesforce.com, inc.
+#
+"""
+CLI tool reporting the changes of Cloud Health Tech costs since the last run
+"""
+
+#
+# Standard libraries
+#
+
+from __future__ import absolute_import, print_function
+
+#
+# Internal libraries
+#
+
+from krux.cli import get_group
+from krux_cloud_health import __version__
+from krux_cloud_health.options import Interval
+from krux_cloud_health.delta import compute_delta, SORT_KEYS
+from krux_cloud_health.snapshot import DEFAULT_SNAPSHOT_DIR, SnapshotStore
+import krux_cloud_health.cli
+
+
+class Application(krux_cloud_health.cli.Application):
+    NAME = 'cloud-health-delta'
+
+    # Name of the snapshots of the current month's costs
+    _COST_CURRENT = 'cost_current'
+
+    def __init__(self, name=NAME):
+        self._VERSIONS[self.NAME] = __version__
+
+        # Call to the superclass to bootstrap.
+        super(Application, self).__init__(name=name)
+
+        self.interval = Interval[self.args.interval] if self.args.report_id is not None else None
+        self.snapshot_store = SnapshotStore(directory=self.args.snapshot_dir)
+
+    def add_cli_arguments(self, parser):
+        """
+        Add the delta-related command-line arguments to the given parser.
+
+        :argument parser: parser instance to which the arguments will be added
+        """
+        # Call to the superclass first
+        super(Application, self).add_cli_arguments(parser)
+
+        group = get_group(parser, self.name)
+
+        group.add_argument(
+            'report_id',
+            type=long,
+            nargs='?',
+            default=None,
+            help="ID of the custom report to compare (default: the current month's costs per AWS account)",
+        )
+
+        group.add_argument(
+            '--interval',
+            type=str,
+            choices=[interval.name for interval in Interval],
+            default=Interval.daily.name,
+            help="Time interval of the custom report (default: %(default)s)",
+        )
+
+        group.add_argument(
+            '--snapshot-dir',
+            type=str,
+            default=DEFAULT_SNAPSHOT_DIR,
+            help="Directory where the costs of the last run are kept (default: %(default)s)",
+        )
+
+        group.add_argument(
+            '--top',
+            type=int,
+            default=10,
+            help="Number of the costs that moved the most to report (default: %(default)s)",
+        )
+
+        group.add_argument(
+            '--sort-by',
+            type=str,
+            choices=SORT_KEYS,
+            default=SORT_KEYS[0],
+            help="Whether the costs are ranked by absolute or relative change (default: %(default)s)",
+        )
+
+        group.add_argument(
+            '--rollup',
+            action='store_true',
+            default=False,
+            help="Sum the leaf services into the top of their tree before comparing them",
+        )
+
+        group.add_argument(
+            '--alert-percent',
+            type=float,
+            default=None,
+            help="Exit with 1 when the total of a category changed by more than this percentage, or appeared or "
+                 "disappeared (optional)",
+        )
+
+    def run(self):
+        if self.args.report_id is None:
+            report = self._COST_CURRENT
+            after = self.cloud_health.cost_current()
+        else:
+            report = self.args.report_id
+            after = self.cloud_health.get_custom_report(report_id=report, time_interval=self.interval)
+
+        before = self.snapshot_store.load(report, self.interval)
+        alerts = 0 if before is None else self._print_delta(before, after)
+
+        # GOTCHA: Only replace the previous costs once they were compared, so that a failed run is compared again.
+        self.snapshot_store.save(report, self.interval, after)
+
+        if before is None:
+            self.logger.info('No previous costs of %s. Saved the current ones for the next run', report)
+        elif alerts:
+            self.logger.error('%s categories changed by more than %s%%', alerts, self.args.alert_percent)
+            self.exit(1)
+
+    def _print_delta(self, before, after):
+        """
+        Prints the change of the total of each category and the costs that moved the most.
+
+        Returns the number of categories whose total changed by more than --alert-percent.
+        """
+        delta = compute_delta(before, after)
+        if self.args.rollup:
+            delta = delta.rollup()
+
+        alerts = 0
+        print('Totals:')
+        for change in delta.total().top_movers(len(delta.categories)):
+            print(self._format_change(change))
+            if self.args.alert_percent is not None and self._exceeds(change, self.args.alert_percent):
+                alerts += 1
+
+        print('Top movers:')
+        for change in delta.top_movers(self.args.top, by=self.args.sort_by):
+            print(self._format_change(change))
+
+        return alerts
+
+    @staticmethod
+    def _exceeds(change, alert_percent):
+        """
+        Returns whether the given change is larger than alert_percent.
+
+        GOTCHA: The percent is None when there was no earlier cost. A category that appeared, or whose cost grew from
+                nothing, changed by more than any percentage.
+        """
+        if change.percent is None:
+            return bool(change.change)
+
+        return abs(change.percent) > alert_percent
+
+    @staticmethod
+    def _format_change(change):
+        return '{category}\t{service}\t{before}\t{after}\t{change:+.2f}\t{percent}'.format(
+            category=change.category,
+            service=change.service,
+            before='-' if change.before is None else '{0:.2f}'.format(change.before),
+            after='-' if change.after is None else '{0:.2f}'.format(change.after),
+            change=change.change,
+            percent='-' if change.percent is None else '{0:+.1f}%'.format(change.percent),
+        )
+
+
+def main():
+    app = Application()
+    with app.context():
+        app.run()
+
+
+# Run the application stand alone
+if __name__ == '__main__':
+    main()
@@ -11,16 +11,19 @@ CLI tools for accessing Krux Cloud Health Tech
 #
 
 from __future__ import absolute_import
+import logging
+import os
 import pprint
-from datetime import datetime
-import calendar
-import re
+import signal
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
 
 #
 # Third party libraries
 #
 
-from six import iteritems
+from six import iteritems, string_types
 
 #
 # Internal libraries
@@ -28,14 +31,43 @@ from six import iteritems
 
 from krux.cli import get_group
 from krux_cloud_health import __version__
-from krux_cloud_health.cloud_health import Interval
+from krux_cloud_health.options import Interval, DEFAULT_MAX_WORKERS
+from krux_cloud_health.query import parse_filter, Query
+from krux_cloud_health.scheduler import DEFAULT_JITTER, load_jobs, Scheduler
+from krux_cloud_health.graphite import (
+    add_graphite_cli_arguments,
+    get_graphite_sender,
+    MetricPathBuilder,
+    sanitize_stats,
+    TimestampParser,
+)
+from krux_cloud_health.state import DEFAULT_STATE_DIR, ExportState
 import krux_cloud_health.cli
 
 
+def parse_report(value):
+    """
+    Returns the ID of a report given on the command line, or its name if it is not a number.
+    """
+    try:
+        return long(value)
+    except ValueError:
+        return value
+
+
 class Application(krux_cloud_health.cli.Application):
     NAME = 'cloud-health-to-graphite'
 
-    _INVALID_STATS_PATTERN = re.compile('[ \.]+')
+    # Step between the dates of the intervals that can be limited to the dates after the last export.
+    # GOTCHA: The weeks and months of the API do not start on a fixed day. Always retrieve them whole.
+    _INCREMENTAL_STEPS = {
+        Interval.hourly: timedelta(hours=1),
+        Interval.daily: timedelta(days=1),
+    }
+
+    # Maximum number of dates selected through the query string. A week of hourly labels stays well under the
+    # 8KB URLs servers commonly accept. Longer selections retrieve the whole reports instead.
+    _MAX_TIME_SELECT = 7 * 24
 
     def __init__(self, name=NAME):
         self._VERSIONS[self.NAME] = __version__
@@ -48,6 +80,26 @@ class Application(krux_cloud_health.cli.Application):
 
         self.interval = Interval[self.args.interval]
 
+        query = Query(filters=self.args.filter, dimensions=self.args.dimension, measures=self.args.measure)
+        self.query = query if query else None
+
+        if self.args.daemon:
+            if self.args.jobs_file is None:
+                self.parser.error('--daemon requires --jobs-file')
+            self.reports = OrderedDict()
+            self.jobs = self._get_jobs()
+        else:
+            self.reports = self._get_reports()
+            self.jobs = []
+
+        self.sender = get_graphite_sender(args=self.args, logger=self.logger)
+        # GOTCHA: The senders are not thread-safe. In daemon mode, the reports are retrieved concurrently but sent
+        #         one at a time.
+        self._sender_lock = threading.Lock()
+
+        self.timestamp_parser = TimestampParser(self.args.date_format)
+        self._timestamp_parsers = {self.args.date_format: self.timestamp_parser}
+
     def add_cli_arguments(self, parser):
         """
         Add CloudHealth-related command-line arguments to the given parser.
@@ -57,26 +109,44 @@ class Application(krux_cloud_health.cli.Application):
         # Call to the superclass first
         super(Application, self).add_cli_arguments(parser)
 
+        add_graphite_cli_arguments(parser)
+
         group = get_group(parser, self.name)
 
         group.add_argument(
             'report_id',
-            type=long,
-            help='ID of the report to export to graphite',
+            type=parse_report,
+            nargs='*',
+            help='IDs or names of the custom reports to export to graphite',
         )
 
         group.add_argument(
             '-n', '--report-name',
             type=str,
             default='',
-            help="Name of the report for stats (default: %(default)s)",
+            help="Name of the report for stats. Only valid with a single report ID (default: %(default)s)",
+        )
+
+        group.add_argument(
+            '--report-file',
+            type=str,
+            default=None,
+            help="File listing the reports to export to graphite, one '<report ID or name> [<report name>]' per line",
+        )
+
+        group.add_argument(
+            '--concurrency',
+            type=int,
+            default=DEFAULT_MAX_WORKERS,
+            help="Number of reports retrieved from Cloud Health at the same time (default: %(default)s)",
         )
 
         group.add_argument(
             '--set-date',
             type=str,
             default=None,
-            help="Retrieve cost history data for specific date, depending on interval. (ex: 'YYYY-MM-DD' for daily)",
+            help="Retrieve cost history data for specific date, depending on interval, or for the dates matching "
+            "a glob pattern. (ex: 'YYYY-MM-DD' for daily, 'YYYY-MM-*' for a month)",
         )
 
         group.add_argument(
@@ -94,41 +164,360 @@ class Application(krux_cloud_health.cli.Application):
             help="Time interval to be used in report (default: %(default)s)",
         )
 
+        group.add_argument(
+            '--incremental',
+            action='store_true',
+            default=False,
+            help="Only export the dates that are new or whose values changed since the last run",
+        )
+
+        group.add_argument(
+            '--state-dir',
+            type=str,
+            default=DEFAULT_STATE_DIR,
+            help="Directory where the state of the incremental exports is kept (default: %(default)s)",
+        )
+
+        group.add_argument(
+            '--incremental-lookback',
+            type=int,
+            default=0,
+            help="With --incremental and an hourly or daily interval, only retrieve the dates from this many "
+                 "intervals before the last exported date. 0 retrieves the whole report (default: %(default)s)",
+        )
+
+        group.add_argument(
+            '--filter',
+            type=parse_filter,
+            action='append',
+            default=[],
+            help="Filter applied by the API to the reports, as DIMENSION:select:MEMBER[,MEMBER] or "
+                 "DIMENSION:reject:MEMBER[,MEMBER]. Can be repeated (ex: 'AWS-Account:select:1234')",
+        )
+
+        group.add_argument(
+            '--dimension',
+            type=str,
+            action='append',
+            default=[],
+            help="Dimension of the reports, the dates first and the services second. Can be repeated "
+                 "(default: the dimensions of the reports)",
+        )
+
+        group.add_argument(
+            '--measure',
+            type=str,
+            action='append',
+            default=[],
+            help="Measure of the reports. Can be repeated (default: the measures of the reports)",
+        )
+
+        group.add_argument(
+            '--hierarchy',
+            action='store_true',
+            default=False,
+            help="Nest the metric of each service under the ones of its parents, which are the sums of their "
+                 "children",
+        )
+
+        group.add_argument(
+            '--daemon',
+            action='store_true',
+            default=False,
+            help="Keep running and export the reports of --jobs-file on their schedule. SIGHUP reloads the jobs",
+        )
+
+        group.add_argument(
+            '--jobs-file',
+            type=str,
+            default=None,
+            help="JSON file of the jobs run in daemon mode, i.e. "
+                 "{\"jobs\": [{\"report_id\": 1234, \"interval\": \"daily\", \"report_name\": \"EC2\", "
+                 "\"schedule\": \"1h\"}]}",
+        )
+
+        group.add_argument(
+            '--jitter',
+            type=float,
+            default=DEFAULT_JITTER,
+            help="Fraction of the schedule of a job by which each of its runs is randomly delayed in daemon mode "
+                 "(default: %(default)s)",
+        )
+
     @staticmethod
     def _sanitize_stats(stat_name):
-        return re.sub(Application._INVALID_STATS_PATTERN, '_', stat_name)
+        return sanitize_stats(stat_name)
+
+    def _get_reports(self):
+        """
+        Returns an ordered dictionary of the sanitized report names keyed by the IDs of the reports to export.
+        """
+        reports = OrderedDict()
+        for report in self.args.report_id:
+            report_id, report_name = self._get_report_id(report)
+            reports[report_id] = report_name
+
+        if self.args.report_file is not None:
+            with open(self.args.report_file) as report_file:
+                for line in report_file:
+                    line = line.strip()
+                    if not line or line.startswith('#'):
+                        continue
+
+                    fields = line.split(None, 1)
+                    report_id, report_name = self._get_report_id(parse_report(fields[0]))
+                    reports[report_id] = Application._sanitize_stats(fields[1]) if len(fields) > 1 else report_name
+
+        if not reports:
+            self.parser.error('At least one report ID or --report-file must be given')
+
+        if len(reports) > 1 and self.report_name:
+            self.parser.error('--report-name can only be used with a single report ID')
+
+        for report_id, report_name in iteritems(reports):
+            if len(reports) == 1 and self.report_name:
+                # --report-name overrides the name of a report given by name as well
+                reports[report_id] = self.report_name
+            elif report_name is None:
+                # GOTCHA: Multiple reports cannot share the same stats path. Default to the ID of the report
+                #         to tell them apart.
+                reports[report_id] = self.report_name if len(reports) == 1 else str(report_id)
+
+        return reports
+
+    def _get_report_id(self, report):
+        """
+        Returns the ID of the given report and its sanitized name if it was given by name, exiting with an error
+        if no report or several reports have that name.
+
+        :argument report: ID or name of a custom report, as returned by parse_report()
+        """
+        if not isinstance(report, string_types):
+            return report, None
 
-    def run(self):
         try:
-            report_data = self.cloud_health.get_custom_report(
-                report_id=self.args.report_id,
-                category=self.args.set_date,
-                time_interval=self.interval,
+            return long(self.cloud_health.find_report(report)), Application._sanitize_stats(report)
+        except ValueError as e:
+            self.parser.error('Invalid report {0}: {1}'.format(report, e))
+
+    def _get_jobs(self):
+        """
+        Returns the jobs of the jobs file, exiting with an error if it is invalid.
+        """
+        try:
+            return load_jobs(self.args.jobs_file, interval=self.interval, date_format=self.args.date_format)
+        except (IOError, ValueError) as e:
+            self.parser.error('Invalid jobs file {0}: {1}'.format(self.args.jobs_file, e))
+
+    def _get_timestamp_parser(self, date_format):
+        parser = self._timestamp_parsers.get(date_format)
+        if parser is None:
+            parser = self._timestamp_parsers.setdefault(date_format, TimestampParser(date_format))
+        return parser
+
+    def _get_state_path(self, report_id, interval=None):
+        return os.path.join(
+            self.args.state_dir,
+            '{report_id}-{interval}.json'.format(report_id=report_id, interval=(interval or self.interval).name),
+        )
+
+    def _get_time_select(self, states, interval=None, date_format=None):
+        """
+        Returns the dates to retrieve in incremental mode, or None to retrieve the whole reports. The whole reports
+        are also retrieved when there are more dates than the query string can hold.
+
+        :argument states: ExportState of each report
+        :argument interval: Interval of the reports (default: --interval)
+        :argument date_format: Format of the dates of the reports (default: --date-format)
+        """
+        date_format = date_format or self.args.date_format
+        step = self._INCREMENTAL_STEPS.get(interval or self.interval)
+        if step is None or self.args.incremental_lookback <= 0 or self.args.set_date is not None or not states:
+            return None
+
+        high_water_marks = [state.high_water_mark for state in states]
+        if None in high_water_marks:
+            # A report was never exported. Retrieve it whole.
+            return None
+
+        date = datetime.utcfromtimestamp(min(high_water_marks)) - step * self.args.incremental_lookback
+        now = datetime.utcnow()
+        time_select = []
+        while date <= now:
+            label = date.strftime(date_format)
+            # GOTCHA: Several steps may share a label, like the hours of a day with a date format without the time.
+            if not time_select or time_select[-1] != label:
+                time_select.append(label)
+            date += step
+
+        if len(time_select) > self._MAX_TIME_SELECT:
+            self.logger.info(
+                'Retrieving the whole reports, as %s dates were not exported since the last run', len(time_select),
             )
-            self.logger.debug(pprint.pformat(report_data))
-        except (ValueError, IndexError) as e:
-            self.logger.error(e.message)
+            return None
+
+        return time_select
+
+    def run(self):
+        if self.args.daemon:
+            self._run_daemon()
+        elif not self._export_reports(self.reports, self.interval, self.args.date_format):
             self.exit(1)
 
+    def _run_daemon(self):
+        """
+        Runs the jobs on their schedule until SIGTERM or SIGINT, with a single client whose connections and cache
+        are reused across the runs.
+        """
+        scheduler = Scheduler(
+            run_job=self._run_job,
+            get_jobs=lambda: load_jobs(self.args.jobs_file, interval=self.interval, date_format=self.args.date_format),
+            max_concurrency=self.args.concurrency,
+            jitter=self.args.jitter,
+            logger=self.logger,
+        )
+        scheduler.set_jobs(self.jobs)
+
+        signal.signal(signal.SIGHUP, lambda signum, frame: scheduler.reload())
+        signal.signal(signal.SIGTERM, lambda signum, frame: scheduler.stop())
+        signal.signal(signal.SIGINT, lambda signum, frame: scheduler.stop())
+
+        self.logger.info('Running %s jobs from %s', len(self.jobs), self.args.jobs_file)
+        scheduler.run()
+
+    def _run_job(self, job):
+        """
+        Exports the report of the given job.
+        """
+        report_name = Application._sanitize_stats(job.report_name) if job.report_name else str(job.report_id)
+
+        if not self._export_reports(OrderedDict([(job.report_id, report_name)]), job.interval, job.date_format):
+            self.logger.error('Failed to export report %s', job.report_id)
+
+    def _export_reports(self, reports, interval, date_format):
+        """
+        Exports the given reports to graphite.
+
+        Returns False if some reports could not be retrieved.
+
+        :argument reports: Ordered dictionary of the sanitized report names keyed by the IDs of the reports
+        :argument interval: Interval of the reports
+        :argument date_format: Format of the dates of the reports
+        """
+        failed = False
+        timestamp_parser = self._get_timestamp_parser(date_format)
+
+        if self.args.incremental:
+            states = dict(
+                (report_id, ExportState.load(self._get_state_path(report_id, interval)))
+                for report_id in reports
+            )
+        else:
+            states = {}
+
+        report_data_list = self.cloud_health.get_custom_reports(
+            report_ids=list(reports),
+            category=self.args.set_date,
+            time_interval=interval,
+            max_workers=self.args.concurrency,
+            return_exceptions=True,
+            time_select=self._get_time_select(list(states.values()), interval, date_format),
+            query=self.query,
+        )
+
+        # GOTCHA: The reports are retrieved as the results are iterated over. Only hold the lock of the sender
+        #         while sending, so that the jobs of the daemon retrieve their reports at the same time.
+        try:
+            for report_id, report_data in report_data_list:
+                if isinstance(report_data, (ValueError, IndexError)):
+                    self.logger.error(str(report_data))
+                    failed = True
+                    continue
+                elif isinstance(report_data, Exception):
+                    # GOTCHA: Like the connection errors once the retries are exhausted. Only this report is lost.
+                    self.logger.error('Failed to retrieve report %s: %r', report_id, report_data)
+                    failed = True
+                    continue
+
+                # GOTCHA: Formatting a whole report is expensive. Only do it when it is going to be logged.
+                #         The repr of a CostReport is a single line. Format its nested dictionaries instead.
+                if self.logger.isEnabledFor(logging.DEBUG):
+                    self.logger.debug(pprint.pformat(
+                        report_data.to_dict() if hasattr(report_data, 'to_dict') else report_data
+                    ))
+
+                report_name = reports[report_id]
+                with self._sender_lock, self.stats.timer('{0}.{1}.export'.format(report_name, interval.name)):
+                    lines = self._export_report(
+                        report_name, report_data, states.get(report_id), timestamp_parser,
+                    )
+                self.stats.incr('{0}.{1}.lines'.format(report_name, interval.name), lines)
+        finally:
+            with self._sender_lock, self.stats.timer('graphite.flush'):
+                self.sender.flush()
+
+        # GOTCHA: Only save the states once the datapoints are sent, so that they are sent again if it failed.
+        for state in states.values():
+            state.save()
+
+        return not failed
+
+    def _export_report(self, report_name, report_data, state=None, timestamp_parser=None):
+        """
+        Sends the data of a report to graphite.
+
+        :argument report_name: Sanitized name of the report for stats
+        :argument report_data: Data of the report as returned by CloudHealth.get_custom_report()
+        :argument state: ExportState of the report in incremental mode. Only the new and changed dates are sent.
+        :argument timestamp_parser: TimestampParser of the dates of the report (default: the one of --date-format)
+
+        Returns the number of datapoints sent.
+        """
         # API always returns a set of dates and a total for the keys of the dictionary. We don't need the total
         # value. Ignore it here.
         if 'Total' in report_data:
             del report_data['Total']
 
+        # The categories repeat for every date. Build the path of each of them once.
+        metric_paths = MetricPathBuilder('cloud_health.{env}.{report_name}'.format(
+            env=self.args.stats_environment,
+            report_name=report_name,
+        ))
+
+        nested_paths = None
+        if self.args.hierarchy:
+            # GOTCHA: Imported here rather than at startup, as it loads numpy.
+            from krux_cloud_health.report import CostReport
+
+            if isinstance(report_data, CostReport):
+                # Every service of the tree, the parents rolled up from the leaves in a single pass
+                report_data = report_data.get_hierarchy()
+                nested_paths = dict(
+                    (service, metric_paths.get_nested_path(report_data.get_service_path(service)))
+                    for service in report_data.services
+                )
+
+        timestamp_parser = timestamp_parser or self.timestamp_parser
+
+        lines = 0
         for date, values in iteritems(report_data):
-            posix_date = int(calendar.timegm(datetime.strptime(date, self.args.date_format).utctimetuple()))
+            posix_date = timestamp_parser.parse(date)
+
+            if state is not None:
+                if not state.is_changed(posix_date, values):
+                    continue
+                state.update(posix_date, values)
 
             for category, cost in iteritems(values):
-                # XXX: Empty space and period causes issues with graphite. Replace it with underscore.
-                category = Application._sanitize_stats(category)
                 if cost is not None:
-                    print('cloud_health.{env}.{report_name}.{category} {cost} {date}'.format(
-                        env=self.args.stats_environment,
-                        report_name=self.report_name,
-                        category=category,
-                        cost=cost,
-                        date=posix_date,
-                    ))
+                    if nested_paths is not None:
+                        path = nested_paths[category]
+                    else:
+                        path = metric_paths.get_path(category)
+                    self.sender.send(path, cost, posix_date)
+                    lines += 1
+
+        return lines
 
 
 def main():
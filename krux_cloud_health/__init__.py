@@ -1 +1 @@
-__version__ = '0.4.3'
+__version__ = '0.29.0'
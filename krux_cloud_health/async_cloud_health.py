@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+#
+# © 2016-2018 Salesforce.com, inc.
+#
+"""
+Non-blocking client of Cloud Health Tech API
+"""
+
+#
+# Standard libraries
+#
+
+from __future__ import absolute_import
+
+#
+# Third party libraries
+#
+
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import asyncio
+except ImportError:
+    asyncio = None
+
+#
+# Internal libraries
+#
+
+from krux_cloud_health.cloud_health import DEFAULT_MAX_WORKERS, DEFAULT_TIME_CHUNK, get_cloud_health, Interval
+
+
+def get_async_cloud_health(args=None, logger=None, stats=None, max_concurrency=None, loop=None):
+    """
+    Returns an AsyncCloudHealth on top of the CloudHealth configured by the given arguments.
+
+    :argument max_concurrency: Maximum number of API calls in flight (default: the pool size of CloudHealth)
+    :argument loop: asyncio event loop the returned futures are bound to (optional)
+    """
+    cloud_health = get_cloud_health(args=args, logger=logger, stats=stats)
+
+    return AsyncCloudHealth(
+        cloud_health=cloud_health,
+        max_concurrency=max_concurrency or cloud_health.pool_size,
+        loop=loop,
+    )
+
+
+class AsyncCloudHealth(object):
+    """
+    Mirrors the API of CloudHealth, but each method returns a future instead of blocking.
+
+    The calls run on a bounded pool of threads sharing the pooled session of the wrapped CloudHealth, so at most
+    max_concurrency calls are in flight. When a loop is given, the futures are asyncio futures of that loop that
+    can be awaited alongside the rest of its I/O. Otherwise they are concurrent.futures.Future.
+
+    GOTCHA: Cancelling a future only cancels the call if it has not started yet. A call already waiting for the API
+            runs to completion and its result is discarded.
+    """
+
+    def __init__(self, cloud_health, max_concurrency=DEFAULT_MAX_WORKERS, loop=None):
+        """
+        :argument cloud_health: CloudHealth to make the calls with
+        :argument max_concurrency: Maximum number of API calls in flight
+        :argument loop: asyncio event loop the returned futures are bound to (optional)
+        """
+        if loop is not None and asyncio is None:
+            raise ValueError('asyncio is not available on this version of Python')
+
+        self.cloud_health = cloud_health
+        self.max_concurrency = max_concurrency
+        self.loop = loop
+
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency)
+
+    def cost_history(self, time_interval, time_input=None, query=None):
+        """
+        Non-blocking version of CloudHealth.cost_history().
+        """
+        return self._submit(self.cloud_health.cost_history, time_interval, time_input, query=query)
+
+    def cost_history_range(
+        self,
+        start,
+        end,
+        time_interval=Interval.daily,
+        chunk=DEFAULT_TIME_CHUNK,
+        max_workers=DEFAULT_MAX_WORKERS,
+        date_format=None,
+        query=None,
+    ):
+        """
+        Non-blocking version of CloudHealth.cost_history_range().
+
+        GOTCHA: The future holds the list of all the (date, {service: value}) tuples. Iterate over
+                CloudHealth.cost_history_range() instead to only hold a few windows at once.
+        """
+        return self._submit(
+            lambda: list(self.cloud_health.cost_history_range(
+                start,
+                end,
+                time_interval=time_interval,
+                chunk=chunk,
+                max_workers=max_workers,
+                date_format=date_format,
+                query=query,
+            )),
+        )
+
+    def cost_current(self, aws_account_input=None, query=None):
+        """
+        Non-blocking version of CloudHealth.cost_current().
+        """
+        return self._submit(self.cloud_health.cost_current, aws_account_input, query=query)
+
+    def get_custom_report(self, report_id, category=None, time_interval=Interval.hourly, time_select=None, query=None):
+        """
+        Non-blocking version of CloudHealth.get_custom_report().
+        """
+        return self._submit(
+            self.cloud_health.get_custom_report,
+            report_id=report_id,
+            category=category,
+            time_interval=time_interval,
+            time_select=time_select,
+            query=query,
+        )
+
+    def get_custom_reports(
+        self,
+        report_ids,
+        category=None,
+        time_interval=Interval.hourly,
+        time_select=None,
+        query=None,
+    ):
+        """
+        Retrieves several custom reports at once.
+
+        Returns a dictionary of the futures of the reports keyed by their ID.
+        """
+        return dict(
+            (report_id, self.get_custom_report(
+                report_id,
+                category=category,
+                time_interval=time_interval,
+                time_select=time_select,
+                query=query,
+            ))
+            for report_id in report_ids
+        )
+
+    def close(self, wait=True):
+        """
+        Stops accepting calls and releases the threads once the pending calls are done.
+
+        :argument wait: Whether to block until the pending calls are done
+        """
+        self._executor.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _submit(self, fn, *args, **kwargs):
+        future = self._executor.submit(fn, *args, **kwargs)
+
+        if self.loop is not None:
+            return asyncio.wrap_future(future, loop=self.loop)
+
+        return future
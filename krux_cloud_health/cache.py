@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+#
+# © 2016-2018 Salesforce.com, inc.
+#
+"""
+Caches of the responses of Cloud Health Tech API
+"""
+
+#
+# Standard libraries
+#
+
+from __future__ import absolute_import
+from collections import namedtuple
+import hashlib
+import json
+import os
+
+#
+# Internal libraries
+#
+
+from krux_cloud_health.files import atomic_write
+
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'krux-cloud-health')
+DEFAULT_CACHE_MAX_SIZE = 256 * 1024 * 1024
+
+
+class CacheEntry(namedtuple('CacheEntry', ['body', 'stored_at', 'etag', 'last_modified'])):
+    """
+    Decoded response of the API along with the time it was stored and its validators.
+    """
+    __slots__ = ()
+
+    def get_validators(self):
+        """
+        Returns the headers to send to revalidate this entry with the API.
+        """
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+def get_cache_key(report, api_key, params):
+    """
+    Returns the cache key of an API call.
+
+    GOTCHA: The API key is hashed separately so that it never appears in the cache, while responses
+            of different keys are still kept apart.
+
+    :argument report: Report of the API call
+    :argument api_key: API key used for the API call
+    :argument params: Parameters of the API call, except the API key
+    """
+    api_key_hash = hashlib.sha256(api_key.encode('utf-8')).hexdigest()
+    normalized = json.dumps([api_key_hash, report, sorted(params.items())], separators=(',', ':'))
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+class ResponseCache(object):
+    """
+    Base class of the stores of API responses. Subclass it to plug another store into CloudHealth.
+    """
+
+    def get(self, key):
+        """
+        Returns the CacheEntry stored under the given key or None if there is none.
+
+        :argument key: Key returned by get_cache_key()
+        """
+        raise NotImplementedError()
+
+    def set(self, key, entry):
+        """
+        Stores the given CacheEntry under the given key.
+
+        :argument key: Key returned by get_cache_key()
+        :argument entry: CacheEntry to store
+        """
+        raise NotImplementedError()
+
+
+class FileResponseCache(ResponseCache):
+    """
+    Stores each response as a JSON file in a directory. The least recently used files are removed once
+    the directory grows over max_size bytes.
+    """
+    _SUFFIX = '.json'
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_size=DEFAULT_CACHE_MAX_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+
+    def _get_path(self, key):
+        return os.path.join(self.directory, key + self._SUFFIX)
+
+    def get(self, key):
+        path = self._get_path(key)
+
+        try:
+            with open(path) as f:
+                entry = CacheEntry(**json.load(f))
+        except (IOError, OSError, ValueError, TypeError):
+            # GOTCHA: A missing or corrupted entry is a cache miss.
+            return None
+
+        # The modification time is used as the access time for the LRU eviction,
+        # as the access time is not updated on all file systems.
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+
+        return entry
+
+    def set(self, key, entry):
+        with atomic_write(self._get_path(key)) as temp_path:
+            with open(temp_path, 'w') as f:
+                json.dump(entry._asdict(), f)
+
+        self._evict()
+
+    def _evict(self):
+        """
+        Removes the least recently used entries until the cache fits within max_size.
+        """
+        entries = []
+        total_size = 0
+        for file_name in os.listdir(self.directory):
+            if not file_name.endswith(self._SUFFIX):
+                continue
+
+            path = os.path.join(self.directory, file_name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                # Removed by another process in the meantime
+                continue
+
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total_size += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total_size <= self.max_size:
+                break
+
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total_size -= size
+
@@ -19,7 +19,7 @@ import pprint
 
 import krux.cli
 from krux_cloud_health import __version__
-from krux_cloud_health.cloud_health import Interval, NAME, add_cloud_health_cli_arguments, get_cloud_health
+from krux_cloud_health.options import Interval, NAME, add_cloud_health_cli_arguments
 
 
 class Application(krux.cli.Application):
@@ -30,6 +30,9 @@ class Application(krux.cli.Application):
         # Call to the superclass to bootstrap.
         super(Application, self).__init__(name=name)
 
+        # GOTCHA: Imported once the arguments are parsed, so that --help does not load requests and numpy.
+        from krux_cloud_health.cloud_health import get_cloud_health
+
         self.cloud_health = get_cloud_health(args=self.args, logger=self.logger, stats=self.stats)
 
     def add_cli_arguments(self, parser):
@@ -40,6 +43,9 @@ class Application(krux.cli.Application):
 
     def run(self):
         cost_history = self.cloud_health.cost_history(Interval.weekly)
+        # GOTCHA: The repr of a CostReport is a single line. Format its nested dictionaries instead.
+        if hasattr(cost_history, 'to_dict'):
+            cost_history = cost_history.to_dict()
         self.logger.info(pprint.pformat(cost_history, indent=2, width=20))
 
 
@@ -11,44 +11,58 @@ Class to retrieve data from Cloud Health Tech API
 #
 
 from __future__ import absolute_import
+import logging
 import urlparse
 import pprint
+import random
+import time
+from collections import deque
+from datetime import date, datetime, timedelta
+from email.utils import parsedate_tz, mktime_tz
 
 #
 # Third party libraries
 #
 
 import requests
-from enum import Enum
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from six import string_types
 
 #
 # Internal libraries
 #
 
-from krux.cli import get_parser, get_group
+from krux.cli import get_parser
 from krux.logging import get_logger
 from krux.stats import get_stats
-
-
-NAME = "cloud-health-tech"
-
-
-class Interval(Enum):
-    hourly = 1
-    daily = 2
-    weekly = 3
-    monthly = 4
-
-
-def add_cloud_health_cli_arguments(parser):
-    # Add those specific to the application
-    group = get_group(parser, NAME)
-
-    group.add_argument(
-        'api_key',
-        type=str,
-        help="API key to retrieve data",
-    )
+from krux_cloud_health.cache import CacheEntry, FileResponseCache, get_cache_key
+from krux_cloud_health.options import (
+    add_cloud_health_cli_arguments,
+    DEFAULT_BACKOFF_FACTOR,
+    DEFAULT_BACKOFF_MAX,
+    DEFAULT_CONNECT_TIMEOUT,
+    DEFAULT_MAX_RETRIES,
+    DEFAULT_MAX_WORKERS,
+    DEFAULT_METADATA_TTL,
+    DEFAULT_POOL_SIZE,
+    DEFAULT_READ_TIMEOUT,
+    DEFAULT_TIME_CHUNK,
+    Interval,
+    NAME,
+)
+from krux_cloud_health.rate_limit import get_rate_limiter
+from krux_cloud_health.report import (
+    build_cost_report,
+    get_category_matcher,
+    get_service_mask,
+    is_category_pattern,
+    parse_cost_report,
+    parse_report_metadata,
+)
+from krux_cloud_health.paging import DEFAULT_PER_PAGE, PageIterator
+from krux_cloud_health.query import format_filter
+from krux_cloud_health.stream import DEFAULT_CHUNK_SIZE, IterStream, ijson, iter_api_call_rows
 
 
 def get_cloud_health(args=None, logger=None, stats=None):
@@ -63,126 +77,787 @@ def get_cloud_health(args=None, logger=None, stats=None):
     if not stats:
         stats = get_stats(prefix=NAME)
 
+    if args.no_cache:
+        cache = None
+    else:
+        cache = FileResponseCache(directory=args.cache_dir, max_size=args.cache_max_size * 1024 * 1024)
+
     return CloudHealth(
         api_key=args.api_key,
         logger=logger,
         stats=stats,
-        )
+        pool_size=args.pool_size,
+        connect_timeout=args.connect_timeout,
+        read_timeout=args.read_timeout,
+        max_retries=args.max_retries,
+        backoff_factor=args.backoff_factor,
+        backoff_max=args.backoff_max,
+        cache=cache,
+        rate_limiter=get_rate_limiter(
+            api_key=args.api_key,
+            rate=args.rate_limit,
+            capacity=args.rate_limit_burst,
+            directory=args.rate_limit_dir,
+        ),
+        parse_processes=args.parse_processes,
+        metadata_ttl=args.metadata_ttl,
+    )
 
 
 class CloudHealth(object):
     _API_ENDPOINT = "https://chapi.cloudhealthtech.com/"
     _CATEGORY_DIMENSION_INDEX = 0
     _SERVICE_DIMENSION_INDEX = 1
-
-    def __init__(self, api_key, logger, stats):
+    # GOTCHA: 429 is what the API returns when the rate limit of the key is exceeded. The 5xx are transient
+    #         errors of the API or its load balancer.
+    _RETRY_STATUS_CODES = frozenset([429, 500, 502, 503, 504])
+    # Number of seconds a cached response is used without asking the API, per interval of the report.
+    # GOTCHA: Reports without an interval, like the current month's costs, use the None entry.
+    _CACHE_TTL = {
+        Interval.hourly: 5 * 60,
+        Interval.daily: 60 * 60,
+        Interval.weekly: 60 * 60,
+        Interval.monthly: 60 * 60,
+        None: 15 * 60,
+    }
+
+    # Header in which the paginated endpoints report the total number of records
+    _TOTAL_COUNT_HEADER = 'X-Total-Count'
+
+    # Format of the labels of the time dimension, per interval, used to select dates
+    _TIME_LABEL_FORMATS = {
+        Interval.hourly: '%Y-%m-%dT%H:00',
+        Interval.daily: '%Y-%m-%d',
+        Interval.weekly: '%Y-%m-%d',
+        Interval.monthly: '%Y-%m',
+    }
+
+    def __init__(
+        self,
+        api_key,
+        logger,
+        stats,
+        pool_size=DEFAULT_POOL_SIZE,
+        connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+        read_timeout=DEFAULT_READ_TIMEOUT,
+        max_retries=DEFAULT_MAX_RETRIES,
+        backoff_factor=DEFAULT_BACKOFF_FACTOR,
+        backoff_max=DEFAULT_BACKOFF_MAX,
+        cache=None,
+        cache_ttl=None,
+        rate_limiter=None,
+        parse_processes=0,
+        metadata_ttl=DEFAULT_METADATA_TTL,
+    ):
         self.api_key = api_key
         self.logger = logger
         self.stats = stats
 
-    def cost_history(self, time_interval, time_input=None):
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+
+        self.cache = cache
+        self.cache_ttl = dict(self._CACHE_TTL)
+        if cache_ttl is not None:
+            self.cache_ttl.update(cache_ttl)
+
+        self.rate_limiter = rate_limiter
+        self.parse_processes = parse_processes
+        self.metadata_ttl = metadata_ttl
+
+        self._session = self._get_session(pool_size)
+
+    def _get_session(self, pool_size):
+        """
+        Returns a requests session that keeps up to pool_size connections to the API alive.
+
+        :argument pool_size: Maximum number of connections kept in the pool
+        """
+        # GOTCHA: Retries are handled by _get_response() so that Retry-After and the jitter can be honored.
+        #         Disable the ones of urllib3 to avoid retrying twice.
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+
+        session = requests.Session()
+        session.mount(self._API_ENDPOINT, adapter)
+
+        return session
+
+    def cost_history(self, time_interval, time_input=None, query=None):
         """
         Cost history for specified time interval and input.
 
         :argument time_interval: time interval for which data is retrieved
-        :argument time_input: date for which data is retrieved (optional) - if not specified, returns 'total'
+        :argument time_input: date, glob pattern, compiled regular expression or list of them for which data is
+                              retrieved (optional) - if not specified, returns 'total'
+        :argument query: Query selecting the dimensions, members and measures the API returns (optional)
         """
         report = "olap_reports/cost/history"
         params = {'interval': time_interval.name}
 
-        if time_input is not None:
-            params['filters[]'] = 'time:select:{0}'.format(time_input)
+        time_select = self._get_time_select(time_input)
+        if time_select:
+            params['filters[]'] = self._get_time_filter(time_select)
+
+        if query is not None:
+            params = query.get_params(params)
 
         api_call = self._get_api_call(report, self.api_key, params)
 
-        return self._get_data(api_call, 'time', time_input)
+        return self._get_report_data(report, params, api_call, 'time', time_input)
+
+    def cost_history_range(
+        self,
+        start,
+        end,
+        time_interval=Interval.daily,
+        chunk=DEFAULT_TIME_CHUNK,
+        max_workers=DEFAULT_MAX_WORKERS,
+        date_format=None,
+        query=None,
+    ):
+        """
+        Cost history between two dates, retrieved as concurrent windows of dates.
+
+        Yields a (date, {service: value}) tuple for each date, in chronological order. Only max_workers windows
+        are held in memory at once.
+
+        :argument start: First date to retrieve, as a date or datetime
+        :argument end: Last date to retrieve, as a date or datetime
+        :argument time_interval: time interval for which data is retrieved
+        :argument chunk: Number of dates retrieved by each API call
+        :argument max_workers: Maximum number of windows retrieved at the same time
+        :argument date_format: Format of the labels of the time dimension (default: depends on the interval)
+        :argument query: Query selecting the dimensions, members and measures the API returns (optional)
 
-    def cost_current(self, aws_account_input=None):
+        Raises ValueError for the weekly interval. The weeks of the API do not start on a fixed day, so their labels
+        cannot be computed.
+        """
+        if time_interval == Interval.weekly:
+            raise ValueError('The weeks of the API do not start on a fixed day. Use cost_history() instead.')
+
+        dates = self._get_time_range(start, end, time_interval, date_format)
+        windows = [dates[i:i + chunk] for i in range(0, len(dates), chunk)]
+
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        futures = deque()
+        try:
+            for window in windows:
+                futures.append((window, executor.submit(self._get_cost_history_window, time_interval, window, query)))
+
+                # GOTCHA: Keep submitting while the first windows are retrieved, but no more than max_workers
+                #         windows ahead of the one being yielded, to bound the memory.
+                if len(futures) < max_workers:
+                    continue
+
+                for row in self._iter_window(*futures.popleft()):
+                    yield row
+
+            while futures:
+                for row in self._iter_window(*futures.popleft()):
+                    yield row
+        finally:
+            for _, future in futures:
+                future.cancel()
+            executor.shutdown(wait=True)
+
+    def _get_cost_history_window(self, time_interval, dates, query=None):
+        """
+        Retrieves the cost history for the given dates in a single API call.
+        """
+        report = "olap_reports/cost/history"
+        params = {
+            'interval': time_interval.name,
+            'filters[]': self._get_time_filter(dates),
+        }
+
+        if query is not None:
+            params = query.get_params(params)
+
+        api_call = self._get_api_call(report, self.api_key, params)
+
+        return self._get_report_data(report, params, api_call, 'time')
+
+    @staticmethod
+    def _iter_window(dates, future):
+        """
+        Yields the (date, {service: value}) tuples of a window in the order of its dates.
+        """
+        data = future.result()
+        for date in dates:
+            if date in data:
+                yield date, data[date]
+
+    def _get_time_range(self, start, end, time_interval, date_format=None):
+        """
+        Returns the labels of the dates of the given interval between start and end, both included.
+        """
+        date_format = date_format or self._TIME_LABEL_FORMATS[time_interval]
+
+        # GOTCHA: Adding hours to a date gives back the same date. Step through the hours of datetimes instead.
+        if not isinstance(start, datetime) and isinstance(start, date):
+            start = datetime.combine(start, datetime.min.time())
+        if not isinstance(end, datetime) and isinstance(end, date):
+            end = datetime.combine(end, datetime.max.time())
+
+        dates = []
+        current = start
+        while current <= end:
+            label = current.strftime(date_format)
+            # GOTCHA: Several dates may share a label, like the days of a month in the monthly format.
+            if not dates or dates[-1] != label:
+                dates.append(label)
+
+            if time_interval == Interval.hourly:
+                current += timedelta(hours=1)
+            elif time_interval == Interval.daily:
+                current += timedelta(days=1)
+            elif time_interval == Interval.weekly:
+                current += timedelta(weeks=1)
+            else:
+                # Move to the first day of the next month
+                current = current.replace(year=current.year + current.month // 12, month=current.month % 12 + 1, day=1)
+
+        return dates
+
+    @staticmethod
+    def _get_time_select(time_input):
+        """
+        Returns the dates of the given time input the API can filter on, or None if it selects them by pattern.
+        """
+        if time_input is None:
+            return None
+
+        dates = [time_input] if isinstance(time_input, string_types) else list(time_input)
+        if any(is_category_pattern(date) for date in dates):
+            # GOTCHA: The API only selects exact dates. The patterns are matched once the report is retrieved.
+            return None
+
+        return dates
+
+    @staticmethod
+    def _get_time_filter(dates):
+        """
+        Returns the value of the filters[] parameter that selects the given dates.
+        """
+        return format_filter('time', 'select', dates)
+
+    def cost_current(self, aws_account_input=None, query=None):
         """
         Current month's costs for AWS accounts.
 
-        :argument aws_account_input: AWS account for which data is retrieved (optional)
+        :argument aws_account_input: AWS account, glob pattern, compiled regular expression or list of them for
+                                     which data is retrieved (optional)
                                      - if not specified, will return information for all AWS accounts
+        :argument query: Query selecting the dimensions, members and measures the API returns (optional)
         """
         report = "olap_reports/cost/current"
-        api_call = self._get_api_call(report, self.api_key)
+        params = {}
 
-        return self._get_data(api_call, 'AWS-Account', aws_account_input)
+        if query is not None:
+            params = query.get_params(params)
 
-    def get_custom_report(self, report_id, category=None, time_interval=Interval.hourly):
+        api_call = self._get_api_call(report, self.api_key, params)
+
+        return self._get_report_data(report, params, api_call, 'AWS-Account', aws_account_input)
+
+    def get_custom_report(self, report_id, category=None, time_interval=Interval.hourly, time_select=None, query=None):
+        """
+        Custom report for specified time interval.
+
+        :argument report_id: ID of the custom report to retrieve
+        :argument category: Label, glob pattern, compiled regular expression or list of them selecting the categories
+                            to retrieve (optional)
+        :argument time_interval: time interval for which data is retrieved
+        :argument time_select: Dates to which the API limits the report (optional)
+        :argument query: Query selecting the dimensions, members and measures the API returns (optional)
+        """
         report = 'olap_reports/custom/{report_id}'.format(report_id=report_id)
         params = {'interval': time_interval.name}
 
+        if time_select:
+            params['filters[]'] = self._get_time_filter(time_select)
+
+        if query is not None:
+            params = query.get_params(params)
+
         api_call = self._get_api_call(report, self.api_key, params)
 
         self.logger.debug(api_call)
 
-        return self._get_data(api_call, category_name=category, exclude_summary=False)
+        return self._get_report_data(report, params, api_call, category_name=category, exclude_summary=False)
+
+    def get_custom_reports(
+        self,
+        report_ids,
+        category=None,
+        time_interval=Interval.hourly,
+        max_workers=DEFAULT_MAX_WORKERS,
+        return_exceptions=False,
+        time_select=None,
+        query=None,
+    ):
+        """
+        Retrieves several custom reports concurrently and yields a (report_id, report_data) tuple
+        for each of them as soon as it is retrieved.
+
+        :argument report_ids: IDs of the custom reports to retrieve
+        :argument category: Label, glob pattern, compiled regular expression or list of them selecting the categories
+                            to retrieve from each report (optional)
+        :argument time_interval: time interval for which data is retrieved
+        :argument max_workers: Maximum number of reports retrieved at the same time
+        :argument return_exceptions: If True, the exception raised while retrieving a report is yielded in place
+                                     of its data. Otherwise, it is raised and the remaining reports are cancelled.
+        :argument time_select: Dates to which the API limits the reports (optional)
+        :argument query: Query selecting the dimensions, members and measures the API returns (optional)
+        """
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        futures = {}
+        try:
+            for report_id in report_ids:
+                future = executor.submit(
+                    self.get_custom_report,
+                    report_id=report_id,
+                    category=category,
+                    time_interval=time_interval,
+                    time_select=time_select,
+                    query=query,
+                )
+                futures[future] = report_id
+
+            for future in as_completed(futures):
+                try:
+                    report_data = future.result()
+                except Exception as e:
+                    if not return_exceptions:
+                        raise
+                    report_data = e
+
+                yield futures[future], report_data
+        finally:
+            # GOTCHA: Do not wait for the reports that were not started yet when the caller stops early or fails.
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=True)
+
+    def list_reports(self, topic='custom'):
+        """
+        Returns the reports of the given topic, as dictionaries with their 'id' and 'name' among others.
+
+        The list is cached for metadata_ttl seconds.
+
+        :argument topic: Topic of the reports (i.e. 'custom' or 'cost')
+        """
+        report = 'olap_reports/{topic}'.format(topic=topic)
+        api_call = self._get_api_call(report, self.api_key, {}, cache_ttl=self.metadata_ttl)
+
+        return api_call.get('reports', [])
+
+    def find_report(self, name, topic='custom'):
+        """
+        Returns the ID of the report of the given topic with the given name.
+
+        Raises ValueError if no report or several reports have that name.
+
+        :argument name: Name of the report
+        :argument topic: Topic of the report (i.e. 'custom' or 'cost')
+        """
+        report_ids = [report.get('id') for report in self.list_reports(topic) if report.get('name') == name]
+
+        if not report_ids:
+            raise ValueError('No {0} report is named {1}'.format(topic, name))
+        if len(report_ids) > 1:
+            raise ValueError('Several {0} reports are named {1}: {2}'.format(
+                topic, name, ', '.join(str(report_id) for report_id in report_ids),
+            ))
+
+        return report_ids[0]
+
+    def describe_report(self, report_id):
+        """
+        Returns the ReportMetadata of a custom report: the members of its dimensions and its measures, retrieved
+        without its data.
+
+        The metadata is cached for metadata_ttl seconds.
+
+        :argument report_id: ID of the custom report to describe
+        """
+        report = 'olap_reports/custom/{report_id}'.format(report_id=report_id)
+        api_call = self._get_api_call(report + '/new', self.api_key, {}, cache_ttl=self.metadata_ttl)
+
+        return parse_report_metadata(report, api_call)
+
+    def iter_cost_history(self, time_interval, time_input=None, query=None):
+        """
+        Streaming version of cost_history(). Yields a (category, {service: value}) tuple for each category.
+
+        :argument time_interval: time interval for which data is retrieved
+        :argument time_input: date, glob pattern, compiled regular expression or list of them for which data is
+                              retrieved (optional) - if not specified, returns 'total'
+        :argument query: Query selecting the dimensions, members and measures the API returns (optional)
+        """
+        report = "olap_reports/cost/history"
+        params = {'interval': time_interval.name}
+
+        time_select = self._get_time_select(time_input)
+        if time_select:
+            params['filters[]'] = self._get_time_filter(time_select)
+
+        if query is not None:
+            params = query.get_params(params)
+
+        return self._iter_data(report, self.api_key, params, 'time', time_input)
+
+    def iter_cost_current(self, aws_account_input=None, query=None):
+        """
+        Streaming version of cost_current(). Yields a (category, {service: value}) tuple for each AWS account.
+
+        :argument aws_account_input: AWS account, glob pattern, compiled regular expression or list of them for
+                                     which data is retrieved (optional)
+                                     - if not specified, will return information for all AWS accounts
+        :argument query: Query selecting the dimensions, members and measures the API returns (optional)
+        """
+        report = "olap_reports/cost/current"
+        params = {}
+
+        if query is not None:
+            params = query.get_params(params)
+
+        return self._iter_data(report, self.api_key, params, 'AWS-Account', aws_account_input)
+
+    def iter_custom_report(self, report_id, category=None, time_interval=Interval.hourly, query=None):
+        """
+        Streaming version of get_custom_report(). Yields a (category, {service: value}) tuple for each category.
+
+        :argument report_id: ID of the custom report to retrieve
+        :argument category: Label, glob pattern, compiled regular expression or list of them selecting the categories
+                            to retrieve (optional)
+        :argument time_interval: time interval for which data is retrieved
+        :argument query: Query selecting the dimensions, members and measures the API returns (optional)
+        """
+        report = 'olap_reports/custom/{report_id}'.format(report_id=report_id)
+        params = {'interval': time_interval.name}
+
+        if query is not None:
+            params = query.get_params(params)
+
+        return self._iter_data(report, self.api_key, params, category_name=category, exclude_summary=False)
 
-    def _get_api_call(self, report, api_key, params={}):
+    def iter_records(self, path, params=None, records_key=None, per_page=DEFAULT_PER_PAGE, prefetch=True):
+        """
+        Returns a PageIterator over the records of a paginated endpoint of the API, like the assets, the perspectives
+        or the list of the reports. The pages are retrieved as the records are consumed, the next one in the
+        background, and their total number is available as its total attribute.
+
+        GOTCHA: The pages are not cached, as the records are never held as a whole.
+
+        :argument path: Path of the endpoint (i.e. 'api/search')
+        :argument params: Parameters of the API calls, except the page (optional)
+        :argument records_key: Key of the list of records in each page (default: each page is the list of records)
+        :argument per_page: Number of records retrieved by each API call
+        :argument prefetch: Whether the next page is retrieved while the current one is consumed
+        """
+        uri = urlparse.urljoin(self._API_ENDPOINT, path)
+
+        def get_page(page):
+            uri_args = {'api_key': self.api_key}
+            uri_args.update(params or {})
+            uri_args.update({'page': page, 'per_page': per_page})
+
+            r = self._get_response(uri, uri_args)
+            body = r.json()
+
+            if isinstance(body, dict) and body.get('error'):
+                raise ValueError(body['error'])
+
+            records = body if records_key is None else body.get(records_key, [])
+            return records, self._get_total_count(r, body)
+
+        return PageIterator(get_page, per_page=per_page, prefetch=prefetch)
+
+    def _get_total_count(self, response, body):
+        """
+        Returns the total number of records of a paginated endpoint, from its header or its body, or None.
+        """
+        total = response.headers.get(self._TOTAL_COUNT_HEADER)
+        if total is None and isinstance(body, dict):
+            total = body.get('total')
+
+        try:
+            return int(total) if total is not None else None
+        except ValueError:
+            return None
+
+    def _iter_data(self, report, api_key, params, category_type='time', category_name=None, exclude_summary=True):
+        """
+        Retrieves the given report and yields a (category, {service: value}) tuple for each category,
+        parsing the response as it is downloaded.
+
+        GOTCHA: The response is not cached, as it is never held as a whole. If ijson is not installed,
+                falls back to _get_api_call().
+
+        :argument report: Filters data from API call for specific report
+        :argument api_key: API allows data to be retrieved
+        :argument params: Filters data from API call for specific time interval
+        :argument category_type: Key of the first dimension (i.e. 'time' or 'AWS-Account')
+        :argument category_name: Label, glob pattern, compiled regular expression or list of them selecting the
+                                 categories to retrieve (optional)
+                                 - if not specified, retrieves info from all categories
+        :argument exclude_summary: Whether the summary services, that have no parent, are excluded
+        """
+        r = None
+        if ijson is None:
+            api_call = self._get_api_call(report, api_key, params)
+            rows = (
+                (api_call.get('dimensions', [{}, {}]), index, row)
+                for index, row in enumerate(api_call.get('data', []))
+            )
+        else:
+            uri_args = {'api_key': api_key}
+            uri_args.update(params)
+            uri = urlparse.urljoin(self._API_ENDPOINT, report)
+
+            r = self._get_response(uri, uri_args, stream=True)
+            rows = iter_api_call_rows(IterStream(r.iter_content(chunk_size=DEFAULT_CHUNK_SIZE)))
+
+        matches = get_category_matcher(category_name)
+        categories = None
+        labels = None
+        try:
+            for dimensions, index, row in rows:
+                if categories is None:
+                    # Dimensions are the same for all the rows. Resolve the labels once.
+                    categories = dimensions[self._CATEGORY_DIMENSION_INDEX].get(category_type, [])
+                    services_list = list(dimensions[self._SERVICE_DIMENSION_INDEX].values())
+                    services = services_list[0] if len(services_list) > 0 else []
+                    labels = [
+                        (i, str(services[i]['label']))
+                        for i, keep in enumerate(get_service_mask(services, exclude_summary))
+                        if keep
+                    ]
+
+                category = categories[index].get('label') if index < len(categories) else None
+                if category is None or not matches(category):
+                    continue
+
+                data_list = [data for sublist in row for data in sublist]
+                yield str(category), dict(
+                    (label, float("%.2f" % data_list[i]) if isinstance(data_list[i], float) else data_list[i])
+                    for i, label in labels
+                )
+        finally:
+            # GOTCHA: The connection is only released back to the pool once the response is closed,
+            #         which does not happen by itself when the caller stops iterating early.
+            if r is not None:
+                r.close()
+
+    def _get_api_call(self, report, api_key, params={}, cache_ttl=None):
         """
         Returns API call for specified report and time interval using API Key.
 
         :argument report: Filters data from API call for specific report
         :argument api_key: API allows data to be retrieved
         :argument params: Filters data from API call for specific time interval
+        :argument cache_ttl: Number of seconds a cached response stays fresh (default: depends on the interval)
         """
         uri_args = {'api_key': api_key}
         uri_args.update(params)
 
         uri = urlparse.urljoin(self._API_ENDPOINT, report)
 
-        r = requests.get(uri, params=uri_args)
-        api_call = r.json()
+        cache_key = None
+        cache_entry = None
+        headers = {}
+        if self.cache is not None:
+            cache_key = get_cache_key(report, api_key, params)
+            cache_entry = self.cache.get(cache_key)
+
+            if cache_entry is not None:
+                if cache_ttl is None:
+                    cache_ttl = self._get_cache_ttl(params)
+                if time.time() - cache_entry.stored_at < cache_ttl:
+                    self.logger.debug('Using cached response for %s', report)
+                    self.stats.incr(self._get_stat_name(report, params, 'cache.hit'))
+                    return cache_entry.body
+
+                # Expired. Ask the API whether the response changed since it was cached.
+                headers = cache_entry.get_validators()
+
+        r = self._get_response(uri, uri_args, headers)
+
+        if r.status_code == 304 and cache_entry is not None:
+            self.logger.debug('Cached response for %s is still valid', report)
+            self.stats.incr(self._get_stat_name(report, params, 'cache.revalidated'))
+            self.cache.set(cache_key, cache_entry._replace(stored_at=time.time()))
+            return cache_entry.body
+
+        if self.cache is not None:
+            self.stats.incr(self._get_stat_name(report, params, 'cache.miss'))
+
+        self.stats.incr(self._get_stat_name(report, params, 'bytes'), len(r.content))
+        with self.stats.timer(self._get_stat_name(report, params, 'json')):
+            api_call = r.json()
 
         if api_call.get('error'):
             raise ValueError(api_call['error'])
 
-        self.logger.debug(pprint.pformat(api_call))
+        if cache_key is not None and r.status_code == 200:
+            self.cache.set(cache_key, CacheEntry(
+                body=api_call,
+                stored_at=time.time(),
+                etag=r.headers.get('ETag'),
+                last_modified=r.headers.get('Last-Modified'),
+            ))
+
+        # GOTCHA: Formatting a whole report is expensive. Only do it when it is going to be logged.
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(pprint.pformat(api_call))
 
         return api_call
 
-    def _get_data(self, api_call, category_type='time', category_name=None, exclude_summary=True):
+    def _get_report_data(self, report, params, api_call, *args, **kwargs):
         """
-        Retrieves data from API call for
+        Retrieves data from the API call of the given report with _get_data(), timing the parsing and counting the
+        cells parsed.
 
+        :argument report: Report of the API call
+        :argument params: Parameters of the API call
         :argument api_call: API call with information
-        :argument category_type: Key of the first dimension (i.e. 'time' or 'AWS-Account')
-        :argument category_name: Specifies category_name to retrieve from category_list (optional)
-                                 - if not specified, retrieves info from all categories
         """
-        # GOTCHA: Default with two empty dictionaries so lists can be retrieved
-        dimensions = api_call.get('dimensions', [{}, {}])
+        with self.stats.timer(self._get_stat_name(report, params, 'parse')):
+            data = self._get_data(api_call, *args, **kwargs)
+
+        self.stats.incr(self._get_stat_name(report, params, 'cells'), len(data) * len(getattr(data, 'services', ())))
+
+        return data
+
+    @staticmethod
+    def _get_stat_name(report, params, stat):
+        """
+        Returns the name of a stat of the given report and interval, i.e. 'custom.1234.hourly.parse'.
+
+        :argument report: Report of the API call
+        :argument params: Parameters of the API call
+        :argument stat: Name of the stat
+        """
+        report = report.strip('/')
+        if report.startswith('olap_reports/'):
+            report = report[len('olap_reports/'):]
+
+        return '.'.join((report.replace('/', '.'), params.get('interval') or 'none', stat))
+
+    def _get_cache_ttl(self, params):
+        """
+        Returns the number of seconds a cached response of an API call with the given parameters stays fresh.
 
-        categories = [
-            str(category.get('label'))
-            for category in dimensions[self._CATEGORY_DIMENSION_INDEX].get(category_type, {})
-            if category_name is None or category_name == category.get('label')
-        ]
+        :argument params: Parameters of the API call
+        """
+        interval = params.get('interval')
+        return self.cache_ttl[Interval[interval] if interval is not None else None]
+
+    def _get_response(self, uri, params, headers=None, stream=False):
+        """
+        GETs the given URI through the pooled session, retrying connection errors, timeouts and
+        throttled or failed responses with an exponential backoff.
+
+        :argument uri: URI to retrieve
+        :argument params: Query string parameters of the request
+        :argument headers: Additional headers of the request (optional)
+        :argument stream: If True, the body of the response is downloaded as it is read
+        """
+        report = urlparse.urlparse(uri).path
+
+        attempt = 0
+        while True:
+            if self.rate_limiter is not None:
+                # GOTCHA: Retries count against the rate limit of the API key as well.
+                self.rate_limiter.acquire()
+
+            start = time.time()
+            try:
+                r = self._session.get(uri, params=params, headers=headers, timeout=self.timeout, stream=stream)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self.stats.incr(self._get_stat_name(report, params, 'http.error'))
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._get_backoff(attempt)
+                self.logger.warning('Request to %s failed: %s. Retrying in %.2f seconds', uri, e, delay)
+            else:
+                # GOTCHA: With stream, this is the time until the headers are received.
+                self.stats.timing(self._get_stat_name(report, params, 'http.latency'), (time.time() - start) * 1000)
+                self.stats.incr(self._get_stat_name(report, params, 'http.{0}'.format(r.status_code)))
+
+                if r.status_code not in self._RETRY_STATUS_CODES or attempt >= self.max_retries:
+                    return r
+                # Release the connection back to the pool
+                r.close()
+                delay = self._get_retry_after(r)
+                if delay is None:
+                    delay = self._get_backoff(attempt)
+                else:
+                    # GOTCHA: The API may ask for a longer delay than the caller is willing to wait between retries.
+                    delay = min(delay, self.backoff_max)
+                self.logger.warning(
+                    'Request to %s returned %s. Retrying in %.2f seconds', uri, r.status_code, delay
+                )
+
+            self.stats.incr(self._get_stat_name(report, params, 'http.retry'))
+            attempt += 1
+            time.sleep(delay)
+
+    def _get_backoff(self, attempt):
+        """
+        Returns the number of seconds to wait before the given retry attempt.
 
-        services_list = dimensions[self._SERVICE_DIMENSION_INDEX].values()
-        services = services_list[0] if len(services_list) > 0 else []
+        Doubles the delay on each attempt, up to backoff_max, and randomizes the upper half of it so that
+        concurrent clients do not retry in lockstep.
 
-        total_data = {}
-        for index in range(len(categories)):
-            category = categories[index]
-            category_info = self._get_data_info(api_call, services, category, index, exclude_summary)
-            total_data.update(category_info)
+        :argument attempt: Number of attempts already made, starting at 0
+        """
+        delay = min(self.backoff_max, self.backoff_factor * (2 ** attempt))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    @staticmethod
+    def _get_retry_after(response):
+        """
+        Returns the number of seconds requested by the Retry-After header of the response
+        or None if the header is absent or invalid.
+
+        :argument response: Response of the API
+        """
+        retry_after = response.headers.get('Retry-After')
+        if not retry_after:
+            return None
 
-        return total_data
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            pass
+
+        # The header can also be an HTTP date
+        date = parsedate_tz(retry_after)
+        if date is None:
+            return None
+
+        return max(0.0, mktime_tz(date) - time.time())
+
+    def _get_data(self, api_call, category_type='time', category_name=None, exclude_summary=True):
+        """
+        Retrieves data from API call as a CostReport, which behaves like nested dictionaries keyed by category
+        then service.
+
+        :argument api_call: API call with information
+        :argument category_type: Key of the first dimension (i.e. 'time' or 'AWS-Account')
+        :argument category_name: Label, glob pattern, compiled regular expression or list of them selecting the
+                                 categories to retrieve (optional)
+                                 - if not specified, retrieves info from all categories
+        """
+        return parse_cost_report(api_call, category_type, category_name, exclude_summary, self.parse_processes)
 
     def _get_data_info(self, api_call, items_list, category_input, index, exclude_summary=True):
         """
         Retrieves information for specific entry in category_list.
         """
-        # TODO: Refactor this to be cleaner
-        info = {category_input: {}}
-        data_nested = api_call["data"][index]
-        data_list = [data for sublist in data_nested for data in sublist]
-        data_list = [float("%.2f" % data) if isinstance(data, float) else data for data in data_list]
-        for i in range(len(items_list)):
-            item = items_list[i]
-            if ((not exclude_summary or item.get("parent") >= 0) and
-               item["label"].lower() != "total"):
-                info[category_input][str(item["label"])] = data_list[i]
-        return info
+        return build_cost_report(api_call["data"], [(category_input, index)], items_list, exclude_summary)
@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+#
+# © 2016-2018 Salesforce.com, inc.
+#
+"""
+Changes of the costs between two snapshots of a Cloud Health Tech report
+"""
+
+#
+# Standard libraries
+#
+
+from __future__ import absolute_import
+from collections import namedtuple
+
+#
+# Third party libraries
+#
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+#
+# Internal libraries
+#
+
+from krux_cloud_health.report import CostReport
+
+
+SORT_KEYS = ('change', 'percent')
+
+
+class Change(namedtuple('Change', ['category', 'service', 'before', 'after', 'change', 'percent'])):
+    """
+    Change of the cost of a service for a category. The costs are None when missing and percent is None when there
+    was no cost before.
+    """
+    __slots__ = ()
+
+
+def compute_delta(before, after):
+    """
+    Returns the CostDelta between two CostReport, aligned on the union of their categories and services.
+
+    :argument before: CostReport of the earlier snapshot
+    :argument after: CostReport of the later snapshot
+    """
+    if numpy is None:
+        raise ImportError('numpy is required to compute the changes of the costs')
+
+    categories = _get_union(after.categories, before.categories)
+    services = _get_union(after.services, before.services)
+
+    parents = dict(before.parents)
+    parents.update(after.parents)
+
+    return CostDelta(
+        categories=categories,
+        services=services,
+        before=_align(before, categories, services),
+        after=_align(after, categories, services),
+        parents=parents,
+    )
+
+
+def _get_union(labels, other_labels):
+    """
+    Returns the labels followed by the other labels that are not among them.
+    """
+    known = set(labels)
+    return list(labels) + [label for label in other_labels if label not in known]
+
+
+def _align(report, categories, services):
+    """
+    Returns the values of the report as a categories x services numpy array, with NaN where the report has none.
+    """
+    values = numpy.full((len(categories), len(services)), numpy.nan)
+    if not report.categories or not report.services:
+        return values
+
+    category_index = dict((category, row) for row, category in enumerate(categories))
+    service_index = dict((service, column) for column, service in enumerate(services))
+
+    rows = [category_index[category] for category in report.categories]
+    columns = [service_index[service] for service in report.services]
+    values[numpy.ix_(rows, columns)] = report.to_numpy()
+
+    return values
+
+
+class CostDelta(object):
+    """
+    Costs of two snapshots of a report as categories x services matrices, with the change of each cost between them.
+
+    A cost missing from one of the snapshots counts as 0 in the change, so that new and removed services show up
+    as movers. The change is NaN only when the cost is missing from both.
+    """
+
+    def __init__(self, categories, services, before, after, parents=None):
+        """
+        :argument categories: Labels of the rows of the matrices (i.e. dates or AWS accounts)
+        :argument services: Labels of the columns of the matrices
+        :argument before: Costs of the earlier snapshot as a 2D numpy array, with NaN for the missing costs
+        :argument after: Costs of the later snapshot as a 2D numpy array, with NaN for the missing costs
+        :argument parents: Dictionary of the label of the parent of each service that has one (optional)
+        """
+        self.categories = list(categories)
+        self.services = list(services)
+        self.before = before
+        self.after = after
+        self.parents = dict(parents or {})
+
+    @property
+    def change(self):
+        """
+        Absolute change of each cost, as a categories x services numpy array.
+        """
+        change = numpy.nan_to_num(self.after) - numpy.nan_to_num(self.before)
+        change[numpy.isnan(self.before) & numpy.isnan(self.after)] = numpy.nan
+        return change
+
+    @property
+    def percent(self):
+        """
+        Change of each cost in percent of its earlier value, as a categories x services numpy array.
+        NaN where there was no cost before.
+        """
+        before = numpy.where(numpy.nan_to_num(self.before) != 0, self.before, numpy.nan)
+        with numpy.errstate(invalid='ignore', divide='ignore'):
+            return self.change / numpy.abs(before) * 100
+
+    def get_change(self, category, service):
+        """
+        Returns the Change of the given service for the given category.
+
+        Raises ValueError if the category or the service is not in the snapshots.
+        """
+        return self._get_change(self.categories.index(category), self.services.index(service))
+
+    def _get_change(self, row, column, change=None, percent=None):
+        change = self.change if change is None else change
+        percent = self.percent if percent is None else percent
+
+        return Change(
+            category=self.categories[row],
+            service=self.services[column],
+            before=_to_float(self.before[row, column]),
+            after=_to_float(self.after[row, column]),
+            change=_to_float(change[row, column]),
+            percent=_to_float(percent[row, column]),
+        )
+
+    def top_movers(self, count=10, by='change'):
+        """
+        Returns the Change of the costs that moved the most, in either direction, largest first.
+
+        :argument count: Maximum number of changes to return
+        :argument by: Either 'change' to rank by absolute change or 'percent' to rank by relative change
+        """
+        if by not in SORT_KEYS:
+            raise ValueError('Unknown sort key: {0}'.format(by))
+
+        if count <= 0:
+            return []
+
+        change = self.change
+        percent = self.percent
+        magnitude = numpy.abs(change if by == 'change' else percent).ravel()
+
+        # GOTCHA: Only sort the candidates. NaN and unchanged costs never are movers.
+        candidates = numpy.flatnonzero(~numpy.isnan(magnitude) & (magnitude > 0))
+        if len(candidates) > count:
+            candidates = candidates[numpy.argpartition(-magnitude[candidates], count - 1)[:count]]
+        candidates = candidates[numpy.argsort(-magnitude[candidates], kind='mergesort')]
+
+        width = len(self.services)
+        return [self._get_change(index // width, index % width, change, percent) for index in candidates]
+
+    def rollup(self, parents=None):
+        """
+        Returns the CostDelta of the services rolled up to the top of the tree of the services. The cost of a service
+        with children is the sum of the leaf services under it, so that the costs the API reports for both a service
+        and its children are not counted twice. The services without a parent are kept as they are.
+
+        :argument parents: Dictionary of the label of the parent of each service (default: the parents of the
+                           snapshots)
+        """
+        before, after = self._get_reports(parents)
+        return compute_delta(before.get_rollup(level=0), after.get_rollup(level=0))
+
+    def total(self):
+        """
+        Returns the CostDelta of the total of the leaf services of each category.
+        """
+        before, after = self._get_reports()
+        return compute_delta(before.get_total(), after.get_total())
+
+    def _get_reports(self, parents=None):
+        """
+        Returns the CostReport of the earlier and the later snapshots, aligned on the categories and services.
+        """
+        parents = self.parents if parents is None else parents
+
+        return (
+            CostReport(categories=self.categories, services=self.services, values=self.before, parents=parents),
+            CostReport(categories=self.categories, services=self.services, values=self.after, parents=parents),
+        )
+
+
+def _to_float(value):
+    value = float(value)
+    return None if value != value else value
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+#
+# © 2016-2018 Salesforce.com, inc.
+#
+"""
+Local files of the state, cache, snapshots and rate limits of Cloud Health Tech reports
+"""
+
+#
+# Standard libraries
+#
+
+from __future__ import absolute_import
+from contextlib import contextmanager
+import errno
+import os
+import tempfile
+
+
+def makedirs(directory):
+    """
+    Creates the given directory and its parents, unless it already exists.
+
+    :argument directory: Path of the directory
+    """
+    try:
+        os.makedirs(directory)
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            raise
+
+
+@contextmanager
+def atomic_write(path):
+    """
+    Yields the path of a temporary file that replaces the given file once the block completes.
+
+    The file is written next to its destination first, so that a crash never leaves a partial file behind and
+    concurrent readers see either the previous file or the new one. The temporary file is removed if the block fails.
+
+    :argument path: Path of the file to write. Its directory is created if needed.
+    """
+    directory = os.path.dirname(path) or '.'
+    makedirs(directory)
+
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    os.close(fd)
+    try:
+        yield temp_path
+        os.rename(temp_path, path)
+    except Exception:
+        os.remove(temp_path)
+        raise
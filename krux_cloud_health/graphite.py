@@ -0,0 +1,388 @@
+# -*- coding: utf-8 -*-
+#
+# © 2016-2018 Salesforce.com, inc.
+#
+"""
+Helpers to build and send datapoints to Graphite
+"""
+
+#
+# Standard libraries
+#
+
+from __future__ import absolute_import
+from datetime import datetime
+import calendar
+import os
+import re
+import socket
+import struct
+import sys
+
+#
+# Third party libraries
+#
+
+from six.moves import cPickle as pickle
+
+#
+# Internal libraries
+#
+
+from krux.cli import get_group
+from krux.logging import get_logger
+
+
+NAME = 'graphite'
+
+MODE_STDOUT = 'stdout'
+MODE_PLAINTEXT = 'plaintext'
+MODE_PICKLE = 'pickle'
+
+DEFAULT_HOST = 'localhost'
+DEFAULT_PORTS = {
+    MODE_PLAINTEXT: 2003,
+    MODE_PICKLE: 2004,
+}
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_TIMEOUT = 10.0
+
+
+# Formats parsed by slicing instead of strptime(), with the length of the dates they match.
+# GOTCHA: All of them share the positions of their fields, which are listed in _FIXED_DATE_FIELDS.
+_FIXED_DATE_FORMATS = {
+    '%Y-%m-%d': 10,
+    '%Y-%m-%d %H:%M': 16,
+    '%Y-%m-%dT%H:%M': 16,
+    '%Y-%m-%d %H:%M:%S': 19,
+    '%Y-%m-%dT%H:%M:%S': 19,
+}
+_FIXED_DATE_FIELDS = [(0, 4), (5, 7), (8, 10), (11, 13), (14, 16), (17, 19)]
+
+_INVALID_STATS_PATTERN = re.compile(r'[ \.]+')
+
+
+def sanitize_stats(stat_name):
+    """
+    Returns the given name with the characters Graphite cannot handle in a path replaced by underscores.
+    """
+    # XXX: Empty space and period causes issues with graphite. Replace it with underscore.
+    return _INVALID_STATS_PATTERN.sub('_', stat_name)
+
+
+def add_graphite_cli_arguments(parser):
+    group = get_group(parser, NAME)
+
+    group.add_argument(
+        '--graphite-mode',
+        type=str,
+        choices=[MODE_STDOUT, MODE_PLAINTEXT, MODE_PICKLE],
+        default=MODE_STDOUT,
+        help="How the datapoints are sent to graphite: printed to stdout in the plaintext format, "
+             "or sent to Carbon over TCP with the plaintext or pickle protocol (default: %(default)s)",
+    )
+
+    group.add_argument(
+        '--graphite-host',
+        type=str,
+        default=DEFAULT_HOST,
+        help="Host of the Carbon daemon (default: %(default)s)",
+    )
+
+    group.add_argument(
+        '--graphite-port',
+        type=int,
+        default=None,
+        help="Port of the Carbon daemon (default: {plaintext} for plaintext, {pickle} for pickle)".format(
+            **DEFAULT_PORTS
+        ),
+    )
+
+    group.add_argument(
+        '--graphite-batch-size',
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help="Number of datapoints sent to Carbon at once (default: %(default)s)",
+    )
+
+    group.add_argument(
+        '--graphite-spool-file',
+        type=str,
+        default=None,
+        help="File where the datapoints are kept while Carbon is unreachable. They are sent on the next run.",
+    )
+
+
+def get_graphite_sender(args, logger=None):
+    """
+    Returns the sender of datapoints configured by the given command-line arguments.
+
+    :argument args: Arguments parsed by a parser given to add_graphite_cli_arguments()
+    :argument logger: Logger to report the errors with (optional)
+    """
+    if args.graphite_mode == MODE_STDOUT:
+        return StdoutSender()
+
+    if not logger:
+        logger = get_logger(name=NAME)
+
+    sender_class = PickleSender if args.graphite_mode == MODE_PICKLE else PlaintextSender
+
+    return sender_class(
+        host=args.graphite_host,
+        port=args.graphite_port or DEFAULT_PORTS[args.graphite_mode],
+        batch_size=args.graphite_batch_size,
+        spool_file=args.graphite_spool_file,
+        logger=logger,
+    )
+
+
+def format_plaintext(path, value, timestamp):
+    """
+    Returns the line of the given datapoint in the plaintext protocol of Carbon.
+    """
+    return '{0} {1} {2}\n'.format(path, value, timestamp)
+
+
+class MetricPathBuilder(object):
+    """
+    Builds the paths of the metrics under a prefix, sanitizing each name only once.
+    """
+
+    def __init__(self, prefix):
+        """
+        :argument prefix: Already sanitized prefix of the paths
+        """
+        self.prefix = prefix + '.'
+        self._paths = {}
+
+    def get_path(self, name):
+        """
+        Returns the path of the metric of the given name.
+
+        :argument name: Name of the metric, to be sanitized
+        """
+        path = self._paths.get(name)
+        if path is None:
+            path = self._paths[name] = self.prefix + sanitize_stats(name)
+        return path
+
+    def get_nested_path(self, names):
+        """
+        Returns the path of the metric nested under the given names, i.e. the ancestors of a service then its name.
+
+        :argument names: Names of the nodes of the path, each to be sanitized
+        """
+        names = tuple(names)
+        path = self._paths.get(names)
+        if path is None:
+            path = self._paths[names] = self.prefix + '.'.join(sanitize_stats(name) for name in names)
+        return path
+
+
+class TimestampParser(object):
+    """
+    Parses the dates of the reports into POSIX timestamps, parsing each date only once.
+    """
+
+    def __init__(self, date_format):
+        """
+        :argument date_format: strptime() format of the dates. The dates are assumed to be in UTC.
+        """
+        self.date_format = date_format
+        self._length = _FIXED_DATE_FORMATS.get(date_format)
+        self._timestamps = {}
+
+    def parse(self, date):
+        """
+        Returns the POSIX timestamp of the given date.
+
+        :argument date: Date in the format of the parser
+        """
+        timestamp = self._timestamps.get(date)
+        if timestamp is None:
+            timestamp = self._timestamps[date] = self._parse(date)
+        return timestamp
+
+    def _parse(self, date):
+        if self._length is not None and len(date) == self._length and date[4] == '-' and date[7] == '-':
+            try:
+                dt = datetime(*[int(date[start:end]) for start, end in _FIXED_DATE_FIELDS if end <= self._length])
+            except ValueError:
+                # Let strptime() report the error
+                pass
+            else:
+                return calendar.timegm(dt.utctimetuple())
+
+        return int(calendar.timegm(datetime.strptime(date, self.date_format).utctimetuple()))
+
+
+class GraphiteSender(object):
+    """
+    Base class of the senders of datapoints to Graphite.
+    """
+
+    def send(self, path, value, timestamp):
+        """
+        Sends a datapoint. It may be buffered until flush() is called.
+
+        :argument path: Path of the metric
+        :argument value: Value of the datapoint
+        :argument timestamp: POSIX timestamp of the datapoint
+        """
+        raise NotImplementedError()
+
+    def flush(self):
+        """
+        Sends the buffered datapoints.
+        """
+        pass
+
+    def close(self):
+        """
+        Sends the buffered datapoints and releases the resources of the sender.
+        """
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class StdoutSender(GraphiteSender):
+    """
+    Prints the datapoints to stdout in the plaintext protocol, to be piped to Carbon.
+    """
+
+    def send(self, path, value, timestamp):
+        sys.stdout.write(format_plaintext(path, value, timestamp))
+
+    def flush(self):
+        sys.stdout.flush()
+
+
+class SocketSender(GraphiteSender):
+    """
+    Base class of the senders that keep a TCP connection to Carbon open and send the datapoints in batches.
+
+    The batches that cannot be sent are appended to the spool file, if any, and are sent again before the next batch.
+    """
+
+    def __init__(self, host, port, batch_size=DEFAULT_BATCH_SIZE, spool_file=None, timeout=DEFAULT_TIMEOUT,
+                 logger=None):
+        self.host = host
+        self.port = port
+        self.batch_size = batch_size
+        self.spool_file = spool_file
+        self.timeout = timeout
+        self.logger = logger or get_logger(name=NAME)
+
+        self._socket = None
+        self._batch = []
+
+    def _serialize(self, batch):
+        """
+        Returns the bytes to send to Carbon for the given list of (path, value, timestamp) tuples.
+        """
+        raise NotImplementedError()
+
+    def send(self, path, value, timestamp):
+        self._batch.append((path, value, timestamp))
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        # GOTCHA: Send the spooled datapoints even without new ones, so that a run with nothing to export still
+        #         catches up once Carbon is back.
+        if not self._batch and not self._has_spool():
+            return
+
+        batch, self._batch = self._batch, []
+
+        try:
+            self._send_spool()
+            self._send_batch(batch)
+        except (socket.error, IOError) as e:
+            self._disconnect()
+            if self.spool_file is None:
+                self.logger.error('Failed to send %s datapoints to %s:%s: %s', len(batch), self.host, self.port, e)
+                raise
+
+            self.logger.warning(
+                'Failed to send datapoints to %s:%s: %s. Spooling %s datapoints to %s',
+                self.host, self.port, e, len(batch), self.spool_file,
+            )
+            if batch:
+                with open(self.spool_file, 'a') as spool:
+                    spool.writelines(format_plaintext(*datapoint) for datapoint in batch)
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self._disconnect()
+
+    def _send_batch(self, batch):
+        for start in range(0, len(batch), self.batch_size):
+            data = self._serialize(batch[start:start + self.batch_size])
+
+            if self._socket is None:
+                self._socket = socket.create_connection((self.host, self.port), self.timeout)
+
+            self._socket.sendall(data)
+
+    def _send_spool(self):
+        """
+        Sends the datapoints of the spool file, then empties it.
+        """
+        if not self._has_spool():
+            return
+
+        with open(self.spool_file) as spool:
+            batch = []
+            for line in spool:
+                fields = line.split()
+                if len(fields) == 3:
+                    batch.append((fields[0], fields[1], fields[2]))
+
+        if batch:
+            self.logger.info('Sending %s spooled datapoints to %s:%s', len(batch), self.host, self.port)
+            self._send_batch(batch)
+
+        os.remove(self.spool_file)
+
+    def _has_spool(self):
+        return self.spool_file is not None and os.path.exists(self.spool_file)
+
+    def _disconnect(self):
+        if self._socket is not None:
+            try:
+                self._socket.close()
+            except socket.error:
+                pass
+            self._socket = None
+
+
+class PlaintextSender(SocketSender):
+    """
+    Sends the datapoints with the plaintext protocol of Carbon (default port 2003).
+    """
+
+    def _serialize(self, batch):
+        return ''.join(format_plaintext(*datapoint) for datapoint in batch).encode('utf-8')
+
+
+class PickleSender(SocketSender):
+    """
+    Sends the datapoints with the pickle protocol of Carbon (default port 2004).
+    """
+    _HEADER_FORMAT = '!L'
+
+    def _serialize(self, batch):
+        payload = pickle.dumps(
+            [(path, (int(timestamp), float(value))) for path, value, timestamp in batch],
+            protocol=2,
+        )
+        return struct.pack(self._HEADER_FORMAT, len(payload)) + payload
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+#
+# © 2016-2018 Salesforce.com, inc.
+#
+"""
+Command line options of the Cloud Health Tech client
+
+GOTCHA: The entry points build their parser from this module before anything else is needed. Keep it free of
+        requests, numpy and the other modules that are slow to import, so that --help and invalid arguments
+        return without loading them.
+"""
+
+#
+# Standard libraries
+#
+
+from __future__ import absolute_import
+
+#
+# Third party libraries
+#
+
+from enum import Enum
+
+#
+# Internal libraries
+#
+
+from krux.cli import get_group
+from krux_cloud_health.cache import DEFAULT_CACHE_DIR, DEFAULT_CACHE_MAX_SIZE
+
+
+NAME = "cloud-health-tech"
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_CONNECT_TIMEOUT = 3.05
+DEFAULT_READ_TIMEOUT = 60.0
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF_FACTOR = 0.5
+DEFAULT_BACKOFF_MAX = 30.0
+DEFAULT_MAX_WORKERS = DEFAULT_POOL_SIZE
+DEFAULT_TIME_CHUNK = 31
+# Number of seconds the cached list of the reports and their dimensions stay fresh
+DEFAULT_METADATA_TTL = 24 * 60 * 60
+
+
+class Interval(Enum):
+    hourly = 1
+    daily = 2
+    weekly = 3
+    monthly = 4
+
+
+def add_cloud_health_cli_arguments(parser):
+    # Add those specific to the application
+    group = get_group(parser, NAME)
+
+    group.add_argument(
+        'api_key',
+        type=str,
+        help="API key to retrieve data",
+    )
+
+    group.add_argument(
+        '--pool-size',
+        type=int,
+        default=DEFAULT_POOL_SIZE,
+        help="Number of keep-alive connections to keep open to the API (default: %(default)s)",
+    )
+
+    group.add_argument(
+        '--connect-timeout',
+        type=float,
+        default=DEFAULT_CONNECT_TIMEOUT,
+        help="Seconds to wait for a connection to the API (default: %(default)s)",
+    )
+
+    group.add_argument(
+        '--read-timeout',
+        type=float,
+        default=DEFAULT_READ_TIMEOUT,
+        help="Seconds to wait for the API to send a response (default: %(default)s)",
+    )
+
+    group.add_argument(
+        '--max-retries',
+        type=int,
+        default=DEFAULT_MAX_RETRIES,
+        help="Number of times a failed or throttled API call is retried (default: %(default)s)",
+    )
+
+    group.add_argument(
+        '--backoff-factor',
+        type=float,
+        default=DEFAULT_BACKOFF_FACTOR,
+        help="Base delay in seconds of the exponential backoff between retries (default: %(default)s)",
+    )
+
+    group.add_argument(
+        '--backoff-max',
+        type=float,
+        default=DEFAULT_BACKOFF_MAX,
+        help="Maximum delay in seconds between retries, including the one requested by Retry-After "
+             "(default: %(default)s)",
+    )
+
+    group.add_argument(
+        '--rate-limit',
+        type=float,
+        default=0,
+        help="Maximum number of API calls per second made with the API key. 0 disables the limit "
+             "(default: %(default)s)",
+    )
+
+    group.add_argument(
+        '--rate-limit-burst',
+        type=int,
+        default=None,
+        help="Number of API calls that can be made at once after a period of inactivity "
+             "(default: the rate limit, at least 1)",
+    )
+
+    group.add_argument(
+        '--rate-limit-dir',
+        type=str,
+        default=None,
+        help="Directory through which the processes of this host share the rate limit of the API key "
+             "(default: the limit only applies within the process)",
+    )
+
+    group.add_argument(
+        '--parse-processes',
+        type=int,
+        default=0,
+        help="Number of processes parsing each large report in parallel. 0 parses the reports in the calling "
+             "process (default: %(default)s)",
+    )
+
+    group.add_argument(
+        '--cache-dir',
+        type=str,
+        default=DEFAULT_CACHE_DIR,
+        help="Directory where the responses of the API are cached (default: %(default)s)",
+    )
+
+    group.add_argument(
+        '--cache-max-size',
+        type=int,
+        default=DEFAULT_CACHE_MAX_SIZE // (1024 * 1024),
+        help="Size in MB over which the least recently used responses are removed from the cache "
+             "(default: %(default)s)",
+    )
+
+    group.add_argument(
+        '--metadata-ttl',
+        type=int,
+        default=DEFAULT_METADATA_TTL,
+        help="Seconds the cached list of the reports and their dimensions are used without asking the API "
+             "(default: %(default)s)",
+    )
+
+    group.add_argument(
+        '--no-cache',
+        action='store_true',
+        default=False,
+        help="Always retrieve the responses from the API, bypassing the cache",
+    )
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+#
+# © 2016-2018 Salesforce.com, inc.
+#
+"""
+Lazy iteration over the paginated endpoints of Cloud Health Tech API
+"""
+
+#
+# Standard libraries
+#
+
+from __future__ import absolute_import
+
+#
+# Third party libraries
+#
+
+from concurrent.futures import ThreadPoolExecutor
+
+
+DEFAULT_PER_PAGE = 100
+
+
+class PageIterator(object):
+    """
+    Iterates over the records of a paginated endpoint, retrieving the next page in the background while the records
+    of the current one are consumed. At most two pages are held in memory, whatever the number of records.
+
+    The iteration stops at the first page that is empty or not full, or once the total number of records is reached.
+    """
+
+    def __init__(self, get_page, per_page=DEFAULT_PER_PAGE, first_page=1, prefetch=True):
+        """
+        :argument get_page: Function returning the (records, total number of records or None) tuple of a page
+        :argument per_page: Number of records of a full page
+        :argument first_page: Number of the first page
+        :argument prefetch: Whether the next page is retrieved while the current one is consumed
+        """
+        self.get_page = get_page
+        self.per_page = per_page
+        self.first_page = first_page
+        self.prefetch = prefetch
+
+        self._total = None
+        self._first = None
+
+    @property
+    def total(self):
+        """
+        Total number of records reported by the API, or None if it does not report it.
+
+        GOTCHA: Retrieves the first page if the iteration has not started yet. It is reused by the iteration.
+        """
+        if self._first is None and self._total is None:
+            self._first = self._get_page(self.first_page)
+
+        return self._total
+
+    def _get_page(self, page):
+        records, total = self.get_page(page)
+        if total is not None:
+            self._total = total
+        return records, total
+
+    def _is_last_page(self, page, records):
+        if len(records) < self.per_page:
+            return True
+
+        return self._total is not None and (page - self.first_page + 1) * self.per_page >= self._total
+
+    def __iter__(self):
+        executor = ThreadPoolExecutor(max_workers=1) if self.prefetch else None
+        future = None
+        try:
+            page = self.first_page
+            if self._first is not None:
+                records, _ = self._first
+                self._first = None
+            else:
+                records, _ = self._get_page(page)
+
+            while True:
+                last = self._is_last_page(page, records)
+                if not last and executor is not None:
+                    future = executor.submit(self._get_page, page + 1)
+
+                for record in records:
+                    yield record
+
+                if last:
+                    return
+
+                page += 1
+                if future is not None:
+                    records, _ = future.result()
+                    future = None
+                else:
+                    records, _ = self._get_page(page)
+        finally:
+            # GOTCHA: Do not wait for the prefetched page when the caller stops early.
+            if future is not None:
+                future.cancel()
+            if executor is not None:
+                executor.shutdown(wait=False)
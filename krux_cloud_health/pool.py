@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+#
+# © 2016-2018 Salesforce.com, inc.
+#
+"""
+Clients of several Cloud Health Tech tenants, called concurrently
+"""
+
+#
+# Standard libraries
+#
+
+from __future__ import absolute_import
+import copy
+from collections import OrderedDict
+
+#
+# Third party libraries
+#
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from six import iteritems
+
+#
+# Internal libraries
+#
+
+from krux_cloud_health.cloud_health import DEFAULT_MAX_WORKERS, get_cloud_health, Interval
+
+
+def get_cloud_health_pool(api_keys, args, logger=None, stats=None, max_workers=DEFAULT_MAX_WORKERS):
+    """
+    Returns a CloudHealthPool of a CloudHealth per tenant, each configured by the given arguments but for its API key.
+
+    :argument api_keys: Dictionary of the API keys keyed by tenant
+    :argument args: Parsed arguments of add_cloud_health_cli_arguments(). Their api_key is ignored.
+    :argument max_workers: Maximum number of tenants called at the same time
+    """
+    clients = OrderedDict()
+    for tenant, api_key in sorted(iteritems(api_keys)):
+        tenant_args = copy.copy(args)
+        tenant_args.api_key = api_key
+
+        # GOTCHA: Each client gets its own connections and the rate limiter of its API key. The cache is shared
+        #         through its directory, as its keys already tell the API keys apart.
+        clients[tenant] = get_cloud_health(args=tenant_args, logger=logger, stats=stats)
+
+    return CloudHealthPool(clients, max_workers=max_workers)
+
+
+class CloudHealthPool(object):
+    """
+    Fans the same call out to the CloudHealth clients of several tenants and returns the results keyed by tenant.
+
+    Each client keeps its own API key, connection pool and rate limit, so a throttled tenant only slows its own calls.
+    The clients are called on a bounded pool of threads, at most max_workers tenants at once.
+    """
+
+    def __init__(self, clients, max_workers=DEFAULT_MAX_WORKERS):
+        """
+        :argument clients: Dictionary of the CloudHealth clients keyed by tenant
+        :argument max_workers: Maximum number of tenants called at the same time
+        """
+        self.clients = OrderedDict(clients)
+        self.max_workers = max_workers
+
+    @property
+    def tenants(self):
+        return list(self.clients)
+
+    def __getitem__(self, tenant):
+        return self.clients[tenant]
+
+    def __len__(self):
+        return len(self.clients)
+
+    def iter_results(self, fn, tenants=None, return_exceptions=False):
+        """
+        Calls fn with the client of each tenant concurrently and yields a (tenant, result) tuple for each of them
+        as soon as it is done.
+
+        :argument fn: Function called with a CloudHealth, i.e. lambda cloud_health: cloud_health.cost_current()
+        :argument tenants: Tenants to call (default: all of them)
+        :argument return_exceptions: If True, the exception raised for a tenant is yielded in place of its result.
+                                     Otherwise, it is raised and the remaining calls are cancelled.
+        """
+        tenants = self.tenants if tenants is None else list(tenants)
+
+        executor = ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(tenants))))
+        futures = {}
+        try:
+            for tenant in tenants:
+                futures[executor.submit(fn, self.clients[tenant])] = tenant
+
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    if not return_exceptions:
+                        raise
+                    result = e
+
+                yield futures[future], result
+        finally:
+            # GOTCHA: Do not wait for the tenants that were not started yet when the caller stops early or fails.
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=True)
+
+    def map(self, fn, tenants=None, return_exceptions=False):
+        """
+        Calls fn with the client of each tenant concurrently and returns the results keyed by tenant.
+
+        Takes the same arguments as iter_results().
+        """
+        return dict(self.iter_results(fn, tenants=tenants, return_exceptions=return_exceptions))
+
+    def cost_history(self, time_interval, time_input=None, query=None, tenants=None, return_exceptions=False):
+        """
+        CloudHealth.cost_history() of each tenant, keyed by tenant.
+        """
+        return self.map(
+            lambda cloud_health: cloud_health.cost_history(time_interval, time_input, query=query),
+            tenants=tenants,
+            return_exceptions=return_exceptions,
+        )
+
+    def cost_current(self, aws_account_input=None, query=None, tenants=None, return_exceptions=False):
+        """
+        CloudHealth.cost_current() of each tenant, keyed by tenant.
+        """
+        return self.map(
+            lambda cloud_health: cloud_health.cost_current(aws_account_input, query=query),
+            tenants=tenants,
+            return_exceptions=return_exceptions,
+        )
+
+    def get_custom_report(
+        self,
+        report_id,
+        category=None,
+        time_interval=Interval.hourly,
+        time_select=None,
+        query=None,
+        tenants=None,
+        return_exceptions=False,
+    ):
+        """
+        CloudHealth.get_custom_report() of each tenant, keyed by tenant.
+
+        GOTCHA: The IDs of the custom reports are specific to a tenant. Use map() to retrieve a different report
+                from each tenant.
+        """
+        return self.map(
+            lambda cloud_health: cloud_health.get_custom_report(
+                report_id=report_id,
+                category=category,
+                time_interval=time_interval,
+                time_select=time_select,
+                query=query,
+            ),
+            tenants=tenants,
+            return_exceptions=return_exceptions,
+        )
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+#
+# © 2016-2018 Salesforce.com, inc.
+#
+"""
+Server-side selection of the dimensions, members and measures of Cloud Health Tech reports
+"""
+
+#
+# Standard libraries
+#
+
+from __future__ import absolute_import
+
+#
+# Third party libraries
+#
+
+from six import string_types
+
+
+FILTER_OPERATIONS = ('select', 'reject')
+
+FILTERS_PARAM = 'filters[]'
+DIMENSIONS_PARAM = 'dimensions[]'
+MEASURES_PARAM = 'measures[]'
+
+
+def format_filter(dimension, operation, members):
+    """
+    Returns the value of a filters[] parameter, i.e. 'AWS-Account:select:1234,5678'.
+
+    :argument dimension: Name of the filtered dimension (i.e. 'time' or 'AWS-Account')
+    :argument operation: Either 'select' to keep only the members or 'reject' to drop them
+    :argument members: Member or list of members of the dimension
+    """
+    if operation not in FILTER_OPERATIONS:
+        raise ValueError('Invalid filter operation: {0}'.format(operation))
+
+    if isinstance(members, string_types):
+        members = [members]
+    members = [str(member) for member in members]
+    if not dimension or not members:
+        raise ValueError('A filter needs a dimension and at least one member')
+
+    return '{0}:{1}:{2}'.format(dimension, operation, ','.join(members))
+
+
+def parse_filter(value):
+    """
+    Returns the (dimension, operation, members) tuple of a filter written as 'DIMENSION:OPERATION:MEMBER[,MEMBER]'.
+
+    Raises ValueError if the filter is invalid, so that it can be used as the type of a command line argument.
+
+    :argument value: Filter to parse
+    """
+    fields = value.split(':', 2)
+    if len(fields) != 3:
+        raise ValueError('Invalid filter: {0}'.format(value))
+
+    dimension, operation, members = fields
+    members = [member for member in members.split(',') if member]
+
+    # Validate it the same way the query will format it
+    format_filter(dimension, operation, members)
+
+    return dimension, operation, members
+
+
+class Query(object):
+    """
+    Parameters of an API call limiting a report to some members of its dimensions and to some measures, so that
+    the API does not send what would be thrown away. The methods return the query so that they can be chained:
+
+        Query().select('AWS-Account', ['1234', '5678']).reject('AWS-Service-Category', 'ec2-other')
+
+    GOTCHA: The reports are parsed with the first dimension as the categories and the second one as the services.
+            When dimensions are given, list them in that order.
+    """
+
+    def __init__(self, filters=None, dimensions=None, measures=None):
+        """
+        :argument filters: List of (dimension, operation, members) tuples (optional)
+        :argument dimensions: Names of the dimensions of the report, in order (optional)
+        :argument measures: Names of the measures of the report (optional)
+        """
+        self.filters = []
+        self.dimensions = list(dimensions or [])
+        self.measures = list(measures or [])
+
+        for dimension, operation, members in filters or []:
+            self.add_filter(dimension, operation, members)
+
+    def add_filter(self, dimension, operation, members):
+        """
+        Adds a filter on the members of a dimension.
+
+        :argument dimension: Name of the filtered dimension (i.e. 'time' or 'AWS-Account')
+        :argument operation: Either 'select' to keep only the members or 'reject' to drop them
+        :argument members: Member or list of members of the dimension
+        """
+        self.filters.append(format_filter(dimension, operation, members))
+        return self
+
+    def select(self, dimension, members):
+        """
+        Keeps only the given members of a dimension.
+        """
+        return self.add_filter(dimension, 'select', members)
+
+    def reject(self, dimension, members):
+        """
+        Drops the given members of a dimension.
+        """
+        return self.add_filter(dimension, 'reject', members)
+
+    def add_dimensions(self, *dimensions):
+        """
+        Adds dimensions to the report, after the ones already added.
+        """
+        self.dimensions.extend(dimensions)
+        return self
+
+    def add_measures(self, *measures):
+        """
+        Adds measures to the report.
+        """
+        self.measures.extend(measures)
+        return self
+
+    def get_params(self, params=None):
+        """
+        Returns a copy of the given parameters of an API call with the ones of the query added.
+
+        GOTCHA: A parameter already set, like the filters[] selecting the dates, is kept along with the ones
+                of the query. requests sends each item of a list as a repeated parameter.
+
+        :argument params: Parameters of the API call (optional)
+        """
+        params = dict(params or {})
+
+        for name, values in ((FILTERS_PARAM, self.filters), (DIMENSIONS_PARAM, self.dimensions),
+                             (MEASURES_PARAM, self.measures)):
+            if not values:
+                continue
+
+            current = params.get(name, [])
+            if isinstance(current, string_types):
+                current = [current]
+            params[name] = list(current) + list(values)
+
+        return params
+
+    def __nonzero__(self):
+        return bool(self.filters or self.dimensions or self.measures)
+
+    __bool__ = __nonzero__
+
+    def __eq__(self, other):
+        return isinstance(other, Query) and self.get_params() == other.get_params()
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return '{0}({1!r})'.format(type(self).__name__, self.get_params())
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+#
+# © 2016-2018 Salesforce.com, inc.
+#
+"""
+Client-side rate limiting of the calls to Cloud Health Tech API
+"""
+
+#
+# Standard libraries
+#
+
+from __future__ import absolute_import
+import fcntl
+import hashlib
+import os
+import threading
+import time
+
+#
+# Internal libraries
+#
+
+from krux_cloud_health.files import makedirs
+
+
+# Token buckets of this process, keyed by the hash of their API key and their file, so that all the clients
+# of an API key share its limit.
+_BUCKETS = {}
+_BUCKETS_LOCK = threading.Lock()
+
+
+def get_rate_limiter(api_key, rate, capacity=None, directory=None):
+    """
+    Returns the token bucket limiting the calls made with the given API key, or None if rate is not positive.
+
+    :argument api_key: API key whose calls are limited
+    :argument rate: Number of calls per second allowed for the API key
+    :argument capacity: Number of calls that can be made at once after a period of inactivity (default: rate)
+    :argument directory: Directory of the file through which the processes of this host share the limit (optional)
+                         - if not specified, the limit is only shared within this process
+    """
+    if not rate or rate <= 0:
+        return None
+
+    # GOTCHA: Never write the API key itself to disk.
+    key = hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:32]
+    path = os.path.join(directory, key + '.bucket') if directory else None
+
+    with _BUCKETS_LOCK:
+        bucket = _BUCKETS.get((key, path))
+        if bucket is None:
+            if path is None:
+                bucket = TokenBucket(rate, capacity)
+            else:
+                bucket = FileTokenBucket(path, rate, capacity)
+            _BUCKETS[(key, path)] = bucket
+
+    return bucket
+
+
+class TokenBucket(object):
+    """
+    Token bucket shared by the threads of this process.
+
+    Each call reserves its tokens immediately, even when the bucket is empty, then sleeps until they are refilled.
+    The callers are thus spaced evenly at the sustainable rate instead of all retrying at once.
+    """
+
+    def __init__(self, rate, capacity=None):
+        """
+        :argument rate: Number of tokens added to the bucket per second
+        :argument capacity: Maximum number of tokens in the bucket (default: rate, at least 1)
+        """
+        self.rate = float(rate)
+        self.capacity = float(capacity) if capacity else max(1.0, self.rate)
+
+        self._lock = threading.Lock()
+        self._tokens = self.capacity
+        self._updated_at = None
+
+    def acquire(self, tokens=1):
+        """
+        Blocks until the given number of tokens is available and takes them.
+
+        Returns the number of seconds waited.
+
+        :argument tokens: Number of tokens to take
+        """
+        with self._lock:
+            wait = self._reserve(tokens)
+
+        if wait > 0:
+            time.sleep(wait)
+
+        return wait
+
+    def _reserve(self, tokens):
+        """
+        Takes the given number of tokens, possibly going in debt, and returns the number of seconds until
+        the debt is paid back.
+        """
+        now = time.time()
+        available, updated_at = self._get_state()
+
+        if updated_at is None:
+            available = self.capacity
+        else:
+            available = min(self.capacity, available + max(0.0, now - updated_at) * self.rate)
+
+        available -= tokens
+        self._set_state(available, now)
+
+        return max(0.0, -available / self.rate)
+
+    def _get_state(self):
+        return self._tokens, self._updated_at
+
+    def _set_state(self, tokens, updated_at):
+        self._tokens = tokens
+        self._updated_at = updated_at
+
+
+class FileTokenBucket(TokenBucket):
+    """
+    Token bucket shared by all the processes of this host through a locked file.
+    """
+
+    def __init__(self, path, rate, capacity=None):
+        """
+        :argument path: Path of the file holding the state of the bucket
+        :argument rate: Number of tokens added to the bucket per second
+        :argument capacity: Maximum number of tokens in the bucket (default: rate, at least 1)
+        """
+        super(FileTokenBucket, self).__init__(rate, capacity)
+
+        self.path = path
+        self._file = None
+
+    def acquire(self, tokens=1):
+        with self._lock:
+            makedirs(os.path.dirname(self.path))
+
+            with open(self.path, 'a+') as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    self._file = f
+                    wait = self._reserve(tokens)
+                finally:
+                    self._file = None
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+        if wait > 0:
+            time.sleep(wait)
+
+        return wait
+
+    def _get_state(self):
+        self._file.seek(0)
+        try:
+            tokens, updated_at = self._file.read().split()
+            return float(tokens), float(updated_at)
+        except ValueError:
+            # New or corrupted file. Start with a full bucket.
+            return self.capacity, None
+
+    def _set_state(self, tokens, updated_at):
+        self._file.seek(0)
+        self._file.truncate()
+        self._file.write('{0!r} {1!r}'.format(tokens, updated_at))
+        self._file.flush()
@@ -0,0 +1,629 @@
+# -*- coding: utf-8 -*-
+#
+# © 2016-2018 Salesforce.com, inc.
+#
+"""
+Compact representation of the data returned by Cloud Health Tech API
+"""
+
+#
+# Standard libraries
+#
+
+from __future__ import absolute_import
+import multiprocessing
+import re
+from array import array
+from collections import namedtuple, OrderedDict
+from fnmatch import fnmatchcase
+
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
+#
+# Third party libraries
+#
+
+from six import string_types
+from six.moves import intern
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+CATEGORY_DIMENSION_INDEX = 0
+SERVICE_DIMENSION_INDEX = 1
+
+# Minimum number of values (categories x services) of a report parsed in parallel. Smaller reports are parsed in this
+# process, as starting the pool costs more than it saves.
+# GOTCHA: Measured with CPython 2.7 on a single core: the parse takes ~0.3us per value and starting a pool ~0.11s plus
+#         ~10ms per process, i.e. the parse of ~500k values. Scaling over several cores could not be measured there.
+MIN_PARALLEL_VALUES = 500000
+
+_NAN = float('nan')
+
+# Label of the service of the total of each category
+TOTAL_SERVICE = 'Total'
+
+_GLOB_CHARACTERS = re.compile(r'[*?[]')
+
+# Data of the report being parsed by this worker process, set once by _init_shard_worker()
+_SHARD_DATA = {}
+
+
+class CostReport(Mapping):
+    """
+    Costs of a report as a categories x services matrix.
+
+    The labels are interned once and the values are stored in a single buffer of doubles, a 2D numpy array when numpy
+    is installed or a flat array('d') otherwise, with NaN for the missing values. The report behaves like the nested
+    dictionaries {category: {service: value}} CloudHealth used to return, with None for the missing values.
+    """
+    __slots__ = ('categories', 'services', 'values', 'parents', '_category_index', '_service_index', '_hierarchy')
+
+    def __init__(self, categories, services, values, parents=None):
+        """
+        :argument categories: Labels of the rows of values (i.e. dates or AWS accounts)
+        :argument services: Labels of the columns of values
+        :argument values: 2D numpy array, or flat array('d') in row-major order, of the costs
+        :argument parents: Dictionary of the label of the parent of each service that has one (optional)
+        """
+        self.categories = list(categories)
+        self.services = list(services)
+        self.values = values
+        self.parents = dict(parents or {})
+
+        self._category_index = dict((category, row) for row, category in enumerate(self.categories))
+        self._service_index = dict((service, column) for column, service in enumerate(self.services))
+        self._hierarchy = None
+
+    def get_value(self, category, service):
+        """
+        Returns the cost of the given service for the given category, or None if it is missing.
+
+        Raises KeyError if the category or the service is not in the report.
+        """
+        return self._get_value(self._category_index[category], self._service_index[service])
+
+    def _get_value(self, row, column):
+        if numpy is not None and isinstance(self.values, numpy.ndarray):
+            value = float(self.values[row, column])
+        else:
+            value = self.values[row * len(self.services) + column]
+
+        return None if value != value else value
+
+    def _get_row(self, row):
+        """
+        Returns the values of the given row as a list, with None for the missing values.
+        """
+        if numpy is not None and isinstance(self.values, numpy.ndarray):
+            values = self.values[row].tolist()
+        else:
+            width = len(self.services)
+            values = self.values[row * width:(row + 1) * width].tolist()
+
+        return [None if value != value else value for value in values]
+
+    def __getitem__(self, category):
+        return CostRow(self, self._category_index[category])
+
+    def __delitem__(self, category):
+        # GOTCHA: The values stay in the buffer. Only the category is forgotten.
+        del self._category_index[category]
+        self.categories.remove(category)
+        self._hierarchy = None
+
+    def __contains__(self, category):
+        return category in self._category_index
+
+    def __iter__(self):
+        return iter(self.categories)
+
+    def __len__(self):
+        return len(self.categories)
+
+    def __repr__(self):
+        return '{0}({1!r})'.format(type(self).__name__, self.to_dict())
+
+    def to_dict(self):
+        """
+        Returns the costs as nested dictionaries keyed by category then service.
+        """
+        return dict(
+            (category, dict(zip(self.services, self._get_row(self._category_index[category]))))
+            for category in self.categories
+        )
+
+    def to_numpy(self):
+        """
+        Returns the costs as a categories x services numpy array, in the order of categories and services.
+        """
+        if numpy is None:
+            raise ImportError('numpy is required to convert a CostReport to an array')
+
+        if not self.services:
+            # GOTCHA: A flat buffer without services cannot tell how many rows it has.
+            return numpy.full((len(self.categories), 0), numpy.nan)
+
+        values = numpy.asarray(self.values, dtype=float).reshape(-1, len(self.services))
+        return values[[self._category_index[category] for category in self.categories]]
+
+    @property
+    def levels(self):
+        """
+        Number of levels of the tree of the services, 1 when no service has a parent.
+        """
+        nodes, depths, _, _ = self._get_hierarchy()
+        return max(depths[node] for node in nodes) + 1 if nodes else 0
+
+    def get_service_path(self, service):
+        """
+        Returns the labels of the ancestors of the given service, from the top of the tree, followed by its own.
+        """
+        path = [service]
+        while path[-1] in self.parents and self.parents[path[-1]] not in path:
+            path.append(self.parents[path[-1]])
+
+        return tuple(reversed(path))
+
+    def get_rollup(self, level=None):
+        """
+        Returns a CostReport of the costs rolled up to the given level of the tree of the services.
+
+        The cost of a service with children is the sum of the costs of the leaf services under it, whether or not
+        the API reported it. The leaves above the level are kept as they are, so that every level sums to the same
+        total.
+
+        :argument level: Depth of the services to roll up to, 0 for the top of the tree (default: the leaves)
+        """
+        nodes, depths, children, _ = self._get_hierarchy()
+
+        if level is None:
+            selected = [node for node in nodes if not children.get(node)]
+        else:
+            selected = [
+                node for node in nodes
+                if depths[node] == level or (depths[node] < level and not children.get(node))
+            ]
+
+        return self._get_hierarchy_report(selected)
+
+    def get_hierarchy(self):
+        """
+        Returns a CostReport of the costs of every service of the tree, the ones with children included, in the
+        order of a depth-first walk of the tree.
+        """
+        nodes, _, _, _ = self._get_hierarchy()
+        return self._get_hierarchy_report(nodes)
+
+    def get_total(self):
+        """
+        Returns a CostReport of the total of the leaf services of each category, as a single 'Total' service.
+        """
+        nodes, depths, _, columns = self._get_hierarchy()
+        total = _sum_columns([columns[node] for node in nodes if depths[node] == 0], len(self.categories))
+
+        return _get_report_of_columns(self.categories, [TOTAL_SERVICE], [total])
+
+    def _get_hierarchy_report(self, selected):
+        _, _, _, columns = self._get_hierarchy()
+
+        return _get_report_of_columns(
+            self.categories,
+            selected,
+            [columns[node] for node in selected],
+            dict((node, self.parents[node]) for node in selected if node in self.parents),
+        )
+
+    def _get_hierarchy(self):
+        """
+        Returns the services of the tree in depth-first order, their depth, their children and the column of
+        costs of each of them, built once in a single bottom-up pass and cached.
+        """
+        if self._hierarchy is not None:
+            return self._hierarchy
+
+        # The parents that are not among the services, like the summaries excluded by the parser, are part of
+        # the tree as well.
+        labels = list(_unique(label for service in self.services for label in self.get_service_path(service)))
+
+        children = {}
+        roots = []
+        for label in labels:
+            parent = self.parents.get(label)
+            if parent is None or label in self.get_service_path(parent):
+                roots.append(label)
+            else:
+                children.setdefault(parent, []).append(label)
+
+        nodes = []
+        depths = {}
+        stack = [(root, 0) for root in reversed(roots)]
+        while stack:
+            node, depth = stack.pop()
+            nodes.append(node)
+            depths[node] = depth
+            stack.extend((child, depth + 1) for child in reversed(children.get(node, [])))
+
+        # Bottom-up: the leaves are read from the values and each parent sums the columns of its children.
+        columns = {}
+        for node in sorted(nodes, key=lambda label: -depths[label]):
+            if node in children:
+                columns[node] = _sum_columns([columns[child] for child in children[node]], len(self.categories))
+            elif node in self._service_index:
+                columns[node] = self._get_column(self._service_index[node])
+            else:
+                columns[node] = _sum_columns([], len(self.categories))
+
+        self._hierarchy = (nodes, depths, children, columns)
+        return self._hierarchy
+
+    def _get_column(self, column):
+        """
+        Returns the values of the given column, in the order of categories, as a numpy array or a list.
+        """
+        rows = [self._category_index[category] for category in self.categories]
+
+        if numpy is not None and isinstance(self.values, numpy.ndarray):
+            return self.values[rows, column]
+
+        width = len(self.services)
+        return [self.values[row * width + column] for row in rows]
+
+
+def _unique(labels):
+    seen = set()
+    for label in labels:
+        if label not in seen:
+            seen.add(label)
+            yield label
+
+
+def _sum_columns(columns, length):
+    """
+    Returns the sum of the given columns of values, NaN where all of them are missing.
+    """
+    if numpy is not None and all(isinstance(column, numpy.ndarray) for column in columns):
+        if not columns:
+            return numpy.full(length, numpy.nan)
+
+        stacked = numpy.vstack(columns)
+        total = numpy.nansum(stacked, axis=0)
+        total[numpy.isnan(stacked).all(axis=0)] = numpy.nan
+        return total
+
+    total = []
+    for row in range(length):
+        cells = [column[row] for column in columns if column[row] == column[row]]
+        total.append(sum(cells) if cells else _NAN)
+    return total
+
+
+def _get_report_of_columns(categories, services, columns, parents=None):
+    """
+    Returns a CostReport of the given columns of values, in the representation of the values.
+    """
+    if numpy is not None and all(isinstance(column, numpy.ndarray) for column in columns):
+        if columns:
+            values = numpy.round(numpy.column_stack(columns), 2)
+        else:
+            values = numpy.full((len(categories), 0), numpy.nan)
+    else:
+        values = array('d')
+        for row in range(len(categories)):
+            values.extend(round(column[row], 2) for column in columns)
+
+    return CostReport(categories=categories, services=services, values=values, parents=parents)
+
+
+class CostRow(Mapping):
+    """
+    Read-only view of the costs of a category of a CostReport, keyed by service.
+    """
+    __slots__ = ('report', 'row')
+
+    def __init__(self, report, row):
+        self.report = report
+        self.row = row
+
+    def __getitem__(self, service):
+        return self.report._get_value(self.row, self.report._service_index[service])
+
+    def __contains__(self, service):
+        return service in self.report._service_index
+
+    def __iter__(self):
+        return iter(self.report.services)
+
+    def __len__(self):
+        return len(self.report.services)
+
+    def __repr__(self):
+        return repr(self.to_dict())
+
+    def to_dict(self):
+        return dict(zip(self.report.services, self.report._get_row(self.row)))
+
+
+class ReportMetadata(namedtuple('ReportMetadata', ['report', 'dimensions', 'measures'])):
+    """
+    Shape of a report, known without retrieving its data: the labels of the members of each dimension, in the
+    order of the data, and the labels of its measures.
+    """
+    __slots__ = ()
+
+    @property
+    def shape(self):
+        """
+        Number of members of each dimension, i.e. (categories, services) for most reports.
+        """
+        return tuple(len(members) for members in self.dimensions.values())
+
+
+def parse_report_metadata(report, api_call):
+    """
+    Parses the dimensions and measures of an API call into a ReportMetadata.
+
+    :argument report: Report described by the API call
+    :argument api_call: API call with the dimensions and measures of the report
+    """
+    dimensions = OrderedDict()
+    for dimension in api_call.get('dimensions', []):
+        for name, members in dimension.items():
+            dimensions[name] = [member.get('label') for member in members]
+
+    measures = [measure.get('label') for measure in api_call.get('measures', [])]
+
+    return ReportMetadata(report=report, dimensions=dimensions, measures=measures)
+
+
+def get_service_mask(services, exclude_summary=True):
+    """
+    Returns a list of booleans telling which services are kept in the report.
+
+    :argument services: Items of the service dimension
+    :argument exclude_summary: Whether the summary services, that have no parent, are excluded
+    """
+    return [
+        (not exclude_summary or item.get('parent', -1) >= 0) and item['label'].lower() != 'total'
+        for item in services
+    ]
+
+
+def get_service_parents(services, columns=None):
+    """
+    Returns a dictionary of the label of the parent of each service that has one.
+
+    :argument services: Items of the service dimension
+    :argument columns: Indexes of the services to include (optional) - if not specified, includes all of them
+    """
+    parents = {}
+    for index in range(len(services)) if columns is None else columns:
+        parent = services[index].get('parent', -1)
+        if 0 <= parent < len(services):
+            parents[intern(str(services[index]['label']))] = intern(str(services[parent]['label']))
+
+    return parents
+
+
+def is_category_pattern(category_name):
+    """
+    Returns whether the given category name selects the categories by pattern rather than by label.
+
+    :argument category_name: Label, glob pattern or compiled regular expression
+    """
+    if isinstance(category_name, string_types):
+        return _GLOB_CHARACTERS.search(category_name) is not None
+
+    return hasattr(category_name, 'match')
+
+
+def _get_category_names(category_name):
+    if isinstance(category_name, string_types) or hasattr(category_name, 'match'):
+        return [category_name]
+
+    return list(category_name)
+
+
+def get_category_matcher(category_name=None):
+    """
+    Returns a function telling whether a label is selected by the given category name.
+
+    :argument category_name: Label, glob pattern, compiled regular expression or list of them (optional)
+                             - if not specified, every label is selected
+    """
+    if category_name is None:
+        return lambda label: True
+
+    names = _get_category_names(category_name)
+
+    labels = set(name for name in names if isinstance(name, string_types))
+    patterns = [name for name in names if is_category_pattern(name)]
+
+    def matches(label):
+        if label in labels:
+            return True
+
+        for pattern in patterns:
+            if isinstance(pattern, string_types):
+                if fnmatchcase(label, pattern):
+                    return True
+            elif pattern.match(label):
+                return True
+
+        return False
+
+    return matches
+
+
+def select_categories(categories, category_name=None):
+    """
+    Returns the (label, index) tuples of the selected categories, in the order of the dimension.
+
+    The labels are looked up in a map of the labels to their index in the dimension, which is also their index in
+    the data, built in a single pass. A string is a glob pattern if it contains *, ? or [ and is not a label itself.
+
+    :argument categories: Items of the category dimension
+    :argument category_name: Label, glob pattern, compiled regular expression or list of them (optional)
+                             - if not specified, every category is selected
+    """
+    if category_name is None:
+        return [(category.get('label'), index) for index, category in enumerate(categories)]
+
+    names = _get_category_names(category_name)
+
+    positions = dict((category.get('label'), index) for index, category in enumerate(categories))
+
+    indexes = set()
+    patterns = []
+    for name in names:
+        index = positions.get(name) if isinstance(name, string_types) else None
+        if index is not None:
+            indexes.add(index)
+        elif is_category_pattern(name):
+            patterns.append(name)
+
+    if patterns:
+        matches = get_category_matcher(patterns)
+        indexes.update(index for label, index in positions.items() if label is not None and matches(label))
+
+    return [(categories[index].get('label'), index) for index in sorted(indexes)]
+
+
+def build_cost_report(data, rows, services, exclude_summary=True, processes=None):
+    """
+    Builds a CostReport out of the given rows of the data of an API call.
+
+    :argument data: Data of the API call, indexed by category, service, then measure
+    :argument rows: List of (category label, index of the category in the data) tuples to keep
+    :argument services: Items of the service dimension
+    :argument exclude_summary: Whether the summary services, that have no parent, are excluded
+    :argument processes: Number of processes parsing the rows in parallel (optional)
+                         - if not specified, the rows are parsed in this process
+    """
+    columns = [index for index, keep in enumerate(get_service_mask(services, exclude_summary)) if keep]
+
+    if processes is not None and processes > 1 and len(rows) > 1 and len(rows) * len(columns) >= MIN_PARALLEL_VALUES:
+        values = _build_values_in_pool(data, rows, columns, processes)
+    else:
+        values = _build_values(data, rows, columns)
+
+    return CostReport(
+        categories=[intern(str(label)) for label, _ in rows],
+        services=[intern(str(services[index]['label'])) for index in columns],
+        values=values,
+        parents=get_service_parents(services, columns),
+    )
+
+
+def _build_values(data, rows, columns):
+    """
+    Returns the values of the given rows and columns as a 2D numpy array if possible, or a flat array('d').
+    """
+    values = None
+    if numpy is not None:
+        values = _build_numpy_values(data, rows, columns)
+    if values is None:
+        values = _build_array_values(data, rows, columns)
+
+    return values
+
+
+def _build_values_in_pool(data, rows, columns, processes):
+    """
+    Returns the values of the given rows and columns, parsed by a pool of processes, each parsing a shard of rows.
+    The rows are split evenly into one shard per process.
+
+    GOTCHA: The data is handed to each process once, when it starts, instead of being pickled with every shard.
+            With fork, it is not pickled at all. Only the rows of each shard and their values are.
+    """
+    shard_size = -(-len(rows) // processes)
+    shards = [rows[start:start + shard_size] for start in range(0, len(rows), shard_size)]
+
+    pool = multiprocessing.Pool(min(processes, len(shards)), initializer=_init_shard_worker, initargs=(data, columns))
+    try:
+        shard_values = pool.map(_build_shard_values, shards)
+    finally:
+        pool.close()
+        pool.join()
+
+    if all(numpy is not None and isinstance(values, numpy.ndarray) for values in shard_values):
+        return numpy.vstack(shard_values)
+
+    # Some shards were not rectangular. Fall back to a flat array for the whole report.
+    merged = array('d')
+    for values in shard_values:
+        if isinstance(values, array):
+            merged.extend(values)
+        else:
+            merged.extend(values.ravel().tolist())
+
+    return merged
+
+
+def _init_shard_worker(data, columns):
+    _SHARD_DATA['data'] = data
+    _SHARD_DATA['columns'] = columns
+
+
+def _build_shard_values(rows):
+    return _build_values(_SHARD_DATA['data'], rows, _SHARD_DATA['columns'])
+
+
+def _build_numpy_values(data, rows, columns):
+    """
+    Returns the values of the given rows and columns as a 2D numpy array, or None if the data is not rectangular.
+    """
+    if not rows:
+        return numpy.full((0, len(columns)), numpy.nan)
+
+    try:
+        # GOTCHA: None is converted to NaN. The measures of each service are flattened like the columns are.
+        values = numpy.array([data[index] for _, index in rows], dtype=float)
+    except ValueError:
+        return None
+
+    values = values.reshape(len(rows), -1)[:, numpy.array(columns, dtype=int)]
+    return numpy.round(values, 2)
+
+
+def _build_array_values(data, rows, columns):
+    """
+    Returns the values of the given rows and columns as a flat array('d') in row-major order.
+    """
+    values = array('d')
+    for _, index in rows:
+        cells = [cell for sublist in data[index] for cell in sublist]
+        for column in columns:
+            cell = cells[column]
+            values.append(_NAN if cell is None else round(cell, 2))
+
+    return values
+
+
+def parse_cost_report(api_call, category_type='time', category_name=None, exclude_summary=True, processes=None):
+    """
+    Parses the data of an API call into a CostReport.
+
+    :argument api_call: API call with information
+    :argument category_type: Key of the first dimension (i.e. 'time' or 'AWS-Account')
+    :argument category_name: Label, glob pattern, compiled regular expression or list of them selecting the
+                             categories to retrieve (optional) - if not specified, retrieves info from all categories
+    :argument exclude_summary: Whether the summary services, that have no parent, are excluded
+    :argument processes: Number of processes parsing the data in parallel (optional)
+                         - if not specified, the data is parsed in this process
+    """
+    # GOTCHA: Default with two empty dictionaries so lists can be retrieved
+    dimensions = api_call.get('dimensions', [{}, {}])
+
+    rows = select_categories(dimensions[CATEGORY_DIMENSION_INDEX].get(category_type, []), category_name)
+
+    services_list = list(dimensions[SERVICE_DIMENSION_INDEX].values())
+    services = services_list[0] if len(services_list) > 0 else []
+
+    return build_cost_report(api_call.get('data', []), rows, services, exclude_summary, processes)
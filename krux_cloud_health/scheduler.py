@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+#
+# © 2016-2018 Salesforce.com, inc.
+#
+"""
+Periodic jobs of the long-running exports of Cloud Health Tech reports
+"""
+
+#
+# Standard libraries
+#
+
+from __future__ import absolute_import
+import heapq
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from collections import namedtuple
+
+#
+# Third party libraries
+#
+
+from concurrent.futures import ThreadPoolExecutor
+
+#
+# Internal libraries
+#
+
+from krux_cloud_health.options import DEFAULT_MAX_WORKERS, Interval
+
+
+# Fraction of the period of a job by which each of its runs is randomly delayed
+DEFAULT_JITTER = 0.1
+
+# Maximum number of seconds the scheduler sleeps before checking for a reload or a stop request
+_POLL_INTERVAL = 1.0
+
+_PERIOD_UNITS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+_PERIOD_PATTERN = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*([smhd]?)\s*$')
+
+
+class Job(namedtuple('Job', ['report_id', 'interval', 'report_name', 'period', 'date_format'])):
+    """
+    Export of a report, run every period seconds.
+    """
+    __slots__ = ()
+
+
+def parse_period(value):
+    """
+    Returns the number of seconds of the given period, either a number of seconds or a string like '90s', '15m',
+    '1h' or '1d'.
+
+    :argument value: Period to parse
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        period = float(value)
+    else:
+        match = _PERIOD_PATTERN.match(str(value))
+        if match is None:
+            raise ValueError('Invalid schedule: {0}'.format(value))
+        period = float(match.group(1)) * _PERIOD_UNITS[match.group(2) or 's']
+
+    if period <= 0:
+        raise ValueError('Invalid schedule: {0}'.format(value))
+
+    return period
+
+
+def load_jobs(path, interval=Interval.hourly, date_format='%Y-%m-%d'):
+    """
+    Returns the jobs listed in the given JSON file.
+
+    The file is an object whose 'jobs' key lists objects with a 'report_id', a 'schedule' and optionally
+    an 'interval', a 'report_name' and a 'date_format'. For example:
+
+        {"jobs": [{"report_id": 1234, "interval": "daily", "report_name": "EC2", "schedule": "1h"}]}
+
+    Raises ValueError if the file is invalid.
+
+    :argument path: Path of the file
+    :argument interval: Interval of the jobs that do not specify one
+    :argument date_format: Format of the dates of the jobs that do not specify one
+    """
+    with open(path) as f:
+        config = json.load(f)
+
+    jobs = []
+    for item in config.get('jobs', []):
+        try:
+            report_id = long(item['report_id'])
+            schedule = item['schedule']
+        except (KeyError, TypeError, ValueError):
+            raise ValueError('Invalid job in {0}: {1}'.format(path, item))
+
+        try:
+            job_interval = Interval[item['interval']] if 'interval' in item else interval
+        except KeyError:
+            raise ValueError('Invalid interval in {0}: {1}'.format(path, item['interval']))
+
+        jobs.append(Job(
+            report_id=report_id,
+            interval=job_interval,
+            report_name=item.get('report_name'),
+            period=parse_period(schedule),
+            date_format=item.get('date_format', date_format),
+        ))
+
+    return jobs
+
+
+class Scheduler(object):
+    """
+    Runs jobs periodically on a bounded pool of threads. The jobs are given with set_jobs() before calling run().
+
+    Each run of a job is delayed by a random fraction of its period, up to jitter, so that the jobs sharing a period
+    do not hit the API at once. A job is never run again while its previous run is still going: that run is skipped.
+
+    reload() and stop() only set a flag and are safe to call from a signal handler.
+    """
+
+    def __init__(self, run_job, get_jobs, max_concurrency=DEFAULT_MAX_WORKERS, jitter=DEFAULT_JITTER, logger=None):
+        """
+        :argument run_job: Function called with each job to run
+        :argument get_jobs: Function returning the list of jobs, called on each reload
+        :argument max_concurrency: Maximum number of jobs running at once
+        :argument jitter: Fraction of the period of a job by which each of its runs is randomly delayed
+        :argument logger: Logger of the errors of the jobs (optional)
+        """
+        self.run_job = run_job
+        self.get_jobs = get_jobs
+        self.max_concurrency = max_concurrency
+        self.jitter = jitter
+        self.logger = logger
+
+        self._lock = threading.Lock()
+        self._queue = []
+        self._sequence = itertools.count()
+        self._running = set()
+
+        self._reload_requested = False
+        self._stop_requested = False
+
+    def reload(self):
+        """
+        Asks the scheduler to call get_jobs() again. The jobs that are still listed keep their schedule.
+        """
+        self._reload_requested = True
+
+    def stop(self):
+        """
+        Asks the scheduler to stop scheduling jobs. run() returns once the running jobs are done.
+        """
+        self._stop_requested = True
+
+    def run(self):
+        """
+        Runs the jobs until stop() is called.
+        """
+        executor = ThreadPoolExecutor(max_workers=self.max_concurrency)
+        try:
+            while not self._stop_requested:
+                if self._reload_requested:
+                    self._reload_requested = False
+                    self._reload()
+
+                delay = self._dispatch(executor)
+                time.sleep(max(0.0, min(delay, _POLL_INTERVAL)))
+        finally:
+            executor.shutdown(wait=True)
+
+    def _reload(self):
+        try:
+            jobs = self.get_jobs()
+        except Exception:
+            # GOTCHA: A broken configuration must not stop a running daemon. Keep the current jobs.
+            if self.logger is not None:
+                self.logger.exception('Failed to reload the jobs. Keeping the current ones')
+            return
+
+        self.set_jobs(jobs)
+
+    def set_jobs(self, jobs):
+        """
+        Replaces the scheduled jobs. The jobs that were already scheduled keep their next run.
+
+        :argument jobs: Jobs to schedule, each with a period attribute in seconds
+        """
+        now = time.time()
+        with self._lock:
+            scheduled = dict((job, (due, base)) for due, _, base, job in self._queue)
+
+            self._queue = []
+            for job in jobs:
+                due, base = scheduled.get(job, (None, None))
+                if due is None:
+                    base = now
+                    due = now + self._get_jitter(job)
+                self._queue.append((due, next(self._sequence), base, job))
+            heapq.heapify(self._queue)
+
+    def _dispatch(self, executor):
+        """
+        Submits the jobs that are due and returns the number of seconds until the next one is.
+        """
+        now = time.time()
+        with self._lock:
+            while self._queue and self._queue[0][0] <= now:
+                _, _, base, job = heapq.heappop(self._queue)
+
+                if job in self._running:
+                    if self.logger is not None:
+                        self.logger.warning('Skipping %s: its previous run is not done', job)
+                else:
+                    self._running.add(job)
+                    executor.submit(self._run, job)
+
+                # GOTCHA: Schedule from the undelayed time of the run so that the jitter does not accumulate.
+                base += job.period
+                if base < now:
+                    base = now
+                heapq.heappush(self._queue, (base + self._get_jitter(job), next(self._sequence), base, job))
+
+            return self._queue[0][0] - now if self._queue else _POLL_INTERVAL
+
+    def _run(self, job):
+        try:
+            self.run_job(job)
+        except Exception:
+            if self.logger is not None:
+                self.logger.exception('Job %s failed', job)
+        finally:
+            with self._lock:
+                self._running.discard(job)
+
+    def _get_jitter(self, job):
+        return random.uniform(0, self.jitter * job.period)
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+#
+# © 2016-2018 Salesforce.com, inc.
+#
+"""
+Local columnar snapshots of the reports of Cloud Health Tech API
+"""
+
+#
+# Standard libraries
+#
+
+from __future__ import absolute_import
+import json
+import os
+
+#
+# Third party libraries
+#
+
+from six.moves import intern
+
+try:
+    import numpy
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    numpy = None
+    pyarrow = None
+
+#
+# Internal libraries
+#
+
+from krux_cloud_health.files import atomic_write
+from krux_cloud_health.report import CostReport
+
+
+DEFAULT_SNAPSHOT_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'krux-cloud-health', 'snapshots')
+
+FORMAT_ARROW = 'arrow'
+FORMAT_PARQUET = 'parquet'
+FORMATS = (FORMAT_ARROW, FORMAT_PARQUET)
+
+# Name of the column holding the categories (i.e. dates or AWS accounts). Every other column is a service.
+CATEGORY_COLUMN = '__category__'
+
+# Key of the schema metadata holding the parents of the services, as a JSON object
+PARENTS_METADATA = b'krux_cloud_health.parents'
+
+
+class SnapshotStore(object):
+    """
+    Saves CostReport to columnar files partitioned by report and interval, and loads them back.
+
+    A snapshot is a table with a column of categories and a column of costs per service, with NaN for the missing
+    costs. Arrow IPC files are memory-mapped on load, so only the pages of the selected services are read.
+    Parquet files are smaller, but decoded on load.
+    """
+
+    def __init__(self, directory=DEFAULT_SNAPSHOT_DIR, file_format=FORMAT_ARROW):
+        """
+        :argument directory: Directory the snapshots are saved to
+        :argument file_format: Format of the snapshot files, either 'arrow' or 'parquet'
+        """
+        if pyarrow is None:
+            raise ImportError('pyarrow is required to store snapshots')
+
+        if file_format not in FORMATS:
+            raise ValueError('Unknown snapshot format: {0}'.format(file_format))
+
+        self.directory = directory
+        self.file_format = file_format
+
+    def get_path(self, report, interval):
+        """
+        Returns the path of the snapshot of the given report and interval.
+
+        :argument report: ID of the custom report, or name of the report (i.e. 'cost_history')
+        :argument interval: Interval of the report
+        """
+        return os.path.join(
+            self.directory,
+            'report={0}'.format(report),
+            'interval={0}'.format(getattr(interval, 'name', interval)),
+            'snapshot.{0}'.format(self.file_format),
+        )
+
+    def save(self, report, interval, cost_report):
+        """
+        Saves the given CostReport as the snapshot of the given report and interval, replacing the previous one.
+
+        :argument report: ID of the custom report, or name of the report (i.e. 'cost_history')
+        :argument interval: Interval of the report
+        :argument cost_report: CostReport to save
+        """
+        values = cost_report.to_numpy()
+        table = pyarrow.Table.from_arrays(
+            [pyarrow.array(cost_report.categories, type=pyarrow.string())] +
+            [pyarrow.array(values[:, column]) for column in range(values.shape[1])],
+            names=[CATEGORY_COLUMN] + cost_report.services,
+        )
+        # The tree of the services is kept along the costs, so that the loaded report rolls up the same way.
+        table = table.replace_schema_metadata({PARENTS_METADATA: json.dumps(cost_report.parents)})
+
+        with atomic_write(self.get_path(report, interval)) as temp_path:
+            if self.file_format == FORMAT_PARQUET:
+                pyarrow.parquet.write_table(table, temp_path)
+            else:
+                with pyarrow.OSFile(temp_path, 'wb') as sink:
+                    writer = pyarrow.ipc.RecordBatchFileWriter(sink, table.schema)
+                    writer.write_table(table)
+                    writer.close()
+
+    def load(self, report, interval, start=None, end=None, services=None):
+        """
+        Returns the snapshot of the given report and interval as a CostReport, or None if there is none.
+
+        :argument report: ID of the custom report, or name of the report (i.e. 'cost_history')
+        :argument interval: Interval of the report
+        :argument start: Earliest category to load, inclusive (optional)
+        :argument end: Latest category to load, inclusive (optional)
+        :argument services: Services to load (optional) - if not specified, loads all the services
+        """
+        path = self.get_path(report, interval)
+        if not os.path.exists(path):
+            return None
+
+        # GOTCHA: Only the selected columns are read. The others are never decoded nor paged in.
+        columns = None if services is None else [CATEGORY_COLUMN] + list(services)
+
+        if self.file_format == FORMAT_PARQUET:
+            table = pyarrow.parquet.read_table(path, columns=columns, memory_map=True)
+            metadata = table.schema.metadata
+        else:
+            table = pyarrow.ipc.open_file(pyarrow.memory_map(path, 'r')).read_all()
+            metadata = table.schema.metadata
+            if columns is not None:
+                table = table.select(columns) if hasattr(table, 'select') else pyarrow.Table.from_arrays(
+                    [table.column(name) for name in columns], names=columns,
+                )
+
+        names = [name for name in table.schema.names if name != CATEGORY_COLUMN]
+        categories = table.column(CATEGORY_COLUMN).to_pylist()
+
+        # Time predicate. The labels of the dates sort chronologically.
+        rows = [
+            row for row, category in enumerate(categories)
+            if (start is None or category >= start) and (end is None or category <= end)
+        ]
+
+        if names:
+            values = numpy.column_stack([_to_numpy(table.column(name)) for name in names])[rows]
+        else:
+            values = numpy.full((len(rows), 0), numpy.nan)
+
+        return CostReport(
+            categories=[intern(str(categories[row])) for row in rows],
+            services=[intern(str(name)) for name in names],
+            values=values,
+            parents=_get_parents(metadata),
+        )
+
+
+def _get_parents(metadata):
+    """
+    Returns the parents of the services kept in the given schema metadata, empty for the snapshots saved without.
+    """
+    parents = (metadata or {}).get(PARENTS_METADATA)
+    if parents is None:
+        return {}
+
+    return dict((intern(str(service)), intern(str(parent))) for service, parent in json.loads(parents).items())
+
+
+def _to_numpy(column):
+    """
+    Returns the given column of costs as a numpy array, without copying it when it is made of a single chunk.
+    """
+    chunks = [chunk.to_numpy() for chunk in column.chunks]
+    if len(chunks) == 1:
+        return chunks[0]
+
+    return numpy.concatenate(chunks) if chunks else numpy.array([], dtype=float)
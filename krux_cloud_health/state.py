@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+#
+# © 2016-2018 Salesforce.com, inc.
+#
+"""
+State of the incremental exports of Cloud Health Tech reports
+"""
+
+#
+# Standard libraries
+#
+
+from __future__ import absolute_import
+import errno
+import hashlib
+import json
+import os
+
+#
+# Internal libraries
+#
+
+from krux_cloud_health.files import atomic_write
+
+
+DEFAULT_STATE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'krux-cloud-health', 'state')
+# Number of seconds before the high-water mark for which the hashes of the exported series are kept
+DEFAULT_RETENTION = 62 * 24 * 60 * 60
+
+
+def get_values_hash(values):
+    """
+    Returns a hash of the content of a series.
+
+    :argument values: Dictionary of the values of the series
+    """
+    content = json.dumps(sorted(values.items()), separators=(',', ':'))
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+
+class ExportState(object):
+    """
+    Remembers the last exported timestamp of a report and the hash of each exported series, so that only
+    the new and changed series are exported again.
+
+    The series older than the retention before the high-water mark are forgotten and considered unchanged.
+    """
+
+    def __init__(self, path, high_water_mark=None, hashes=None, retention=DEFAULT_RETENTION):
+        """
+        :argument path: Path of the file the state is saved to
+        :argument high_water_mark: Latest exported timestamp
+        :argument hashes: Dictionary of the hashes of the exported series keyed by their timestamp
+        :argument retention: Number of seconds before the high-water mark for which the hashes are kept
+        """
+        self.path = path
+        self.high_water_mark = high_water_mark
+        self.hashes = hashes if hashes is not None else {}
+        self.retention = retention
+
+    @classmethod
+    def load(cls, path, retention=DEFAULT_RETENTION):
+        """
+        Returns the state saved in the given file, or an empty state if there is none.
+
+        :argument path: Path of the file the state is saved to
+        :argument retention: Number of seconds before the high-water mark for which the hashes are kept
+        """
+        try:
+            with open(path) as f:
+                state = json.load(f)
+        except IOError as e:
+            if e.errno != errno.ENOENT:
+                raise
+            return cls(path, retention=retention)
+
+        return cls(
+            path,
+            high_water_mark=state.get('high_water_mark'),
+            # GOTCHA: JSON keys are strings. Convert the timestamps back.
+            hashes=dict((int(timestamp), value) for timestamp, value in state.get('hashes', {}).items()),
+            retention=retention,
+        )
+
+    def save(self):
+        """
+        Saves the state to its file, forgetting the series older than the retention.
+        """
+        if self.high_water_mark is not None:
+            oldest = self.high_water_mark - self.retention
+            self.hashes = dict(
+                (timestamp, value) for timestamp, value in self.hashes.items() if timestamp >= oldest
+            )
+
+        with atomic_write(self.path) as temp_path:
+            with open(temp_path, 'w') as f:
+                json.dump({'high_water_mark': self.high_water_mark, 'hashes': self.hashes}, f)
+
+    def is_changed(self, timestamp, values):
+        """
+        Returns whether the series of the given timestamp is new or changed since it was last exported.
+
+        :argument timestamp: POSIX timestamp of the series
+        :argument values: Dictionary of the values of the series
+        """
+        if self.high_water_mark is None or timestamp > self.high_water_mark:
+            return True
+
+        previous_hash = self.hashes.get(timestamp)
+        if previous_hash is None:
+            # Only the series too old to be remembered are unknown
+            return timestamp >= self.high_water_mark - self.retention
+
+        return previous_hash != get_values_hash(values)
+
+    def update(self, timestamp, values):
+        """
+        Records the series of the given timestamp as exported.
+
+        :argument timestamp: POSIX timestamp of the series
+        :argument values: Dictionary of the values of the series
+        """
+        self.hashes[timestamp] = get_values_hash(values)
+        if self.high_water_mark is None or timestamp > self.high_water_mark:
+            self.high_water_mark = timestamp
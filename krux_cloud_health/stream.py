@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+#
+# © 2016-2018 Salesforce.com, inc.
+#
+"""
+Incremental parsing of the responses of Cloud Health Tech API
+"""
+
+#
+# Standard libraries
+#
+
+from __future__ import absolute_import
+from decimal import Decimal
+
+#
+# Third party libraries
+#
+
+try:
+    import ijson
+    from ijson.common import ObjectBuilder
+except ImportError:
+    ijson = None
+
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+class IterStream(object):
+    """
+    Read-only file-like object over an iterator of byte chunks, such as requests' Response.iter_content().
+    """
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buffer = b''
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            try:
+                self._buffer += next(self._chunks)
+            except StopIteration:
+                break
+
+        if size < 0:
+            size = len(self._buffer)
+
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+def _to_float(value):
+    """
+    Converts the decimals returned by ijson in a data row to floats, like json does.
+    """
+    if isinstance(value, list):
+        return [_to_float(item) for item in value]
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def _parse(fileobj):
+    """
+    Yields the ijson events of the given file-like object, raising ValueError on invalid JSON like json does.
+    """
+    try:
+        for event in ijson.parse(fileobj):
+            yield event
+    except ijson.JSONError as e:
+        raise ValueError(str(e))
+
+
+def iter_api_call_rows(fileobj):
+    """
+    Parses an API call incrementally and yields a (dimensions, index, row) tuple for each row of its data,
+    without ever holding the whole document.
+
+    GOTCHA: The rows can only be yielded once the dimensions are known. If the API sends the data before
+            the dimensions, the rows are buffered until the dimensions are parsed.
+
+    :argument fileobj: File-like object of the JSON document of the API call
+    """
+    if ijson is None:
+        raise ImportError('ijson is required to parse an API call incrementally')
+
+    dimensions = None
+    pending_rows = []
+    index = 0
+
+    builder = None
+    target = None
+    for prefix, event, value in _parse(fileobj):
+        if builder is not None:
+            builder.event(event, value)
+            if prefix != target or event not in ('end_array', 'end_map'):
+                continue
+
+            if target == 'dimensions':
+                dimensions = builder.value
+                for pending_index, row in pending_rows:
+                    yield dimensions, pending_index, row
+                pending_rows = []
+            else:
+                row = _to_float(builder.value)
+                if dimensions is None:
+                    pending_rows.append((index, row))
+                else:
+                    yield dimensions, index, row
+                index += 1
+
+            builder = None
+        elif prefix in ('dimensions', 'data.item') and event in ('start_array', 'start_map'):
+            builder = ObjectBuilder()
+            builder.event(event, value)
+            target = prefix
+        elif prefix == 'error' and value:
+            raise ValueError(value)
+
+    # Data without dimensions. Yield it with the default dimensions of CloudHealth._get_data().
+    for pending_index, row in pending_rows:
+        yield [{}, {}], pending_index, row
@@ -32,11 +32,12 @@ setup(
     url=REPO_URL,
     download_url=DOWNLOAD_URL,
     license='All Rights Reserved.',
-    packages=find_packages(exclude=['tests']),
+    packages=find_packages(exclude=['tests', 'benchmarks']),
     # dependencies are named in Pipfile
     install_requires=[],
     entry_points={
         'console_scripts': [
+            'cloud-health-delta=bin.cloud_health_delta:main',
             'cloud-health-to-graphite=bin.cloud_health_to_graphite:main',
             'krux-cloud-health-test=krux_cloud_health.cli:main',
         ],
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+#
+# © 2016-2018 Salesforce.com, inc.
+#
+
+#
+# Standard libraries
+#
+
+from __future__ import absolute_import
+import shutil
+import tempfile
+import unittest
+from StringIO import StringIO
+
+#
+# Third party libraries
+#
+
+from mock import MagicMock, patch
+
+#
+# Internal libraries
+#
+
+from krux_cloud_health.report import parse_cost_report
+from krux_cloud_health.snapshot import pyarrow
+from bin.cloud_health_delta import Application
+
+
+@unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+class CloudHealthDeltaTest(unittest.TestCase):
+
+    API_KEY = '12345'
+
+    @staticmethod
+    def _get_cost_current(ec2, s3):
+        return parse_cost_report(
+            {
+                'dimensions': [
+                    {'AWS-Account': [{'label': 'account1'}]},
+                    {'AWS-Service-Category': [
+                        {'label': 'compute', 'parent': -1},
+                        {'label': 'ec2', 'parent': 0},
+                        {'label': 's3', 'parent': -1},
+                    ]},
+                ],
+                'data': [[[None], [ec2], [s3]]],
+            },
+            category_type='AWS-Account',
+            exclude_summary=False,
+        )
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def _get_app(self, *args):
+        argv = ['prog', CloudHealthDeltaTest.API_KEY, '--snapshot-dir', self.directory] + list(args)
+        with patch('sys.argv', argv):
+            app = Application()
+        app.logger = MagicMock()
+        app.cloud_health.cost_current = MagicMock()
+        return app
+
+    @patch('sys.stdout', new_callable=StringIO)
+    def test_run(self, mock_stdout):
+        """
+        Cloud Health Delta: The first run saves the costs and the next one reports their changes
+        """
+        app = self._get_app()
+        app.cloud_health.cost_current.return_value = CloudHealthDeltaTest._get_cost_current(100.0, 10.0)
+        app.run()
+
+        self.assertEqual('', mock_stdout.getvalue())
+
+        app.cloud_health.cost_current.return_value = CloudHealthDeltaTest._get_cost_current(150.0, 10.0)
+        app.run()
+
+        self.assertEqual(
+            'Totals:\n'
+            'account1\tTotal\t110.00\t160.00\t+50.00\t+45.5%\n'
+            'Top movers:\n'
+            'account1\tec2\t100.00\t150.00\t+50.00\t+50.0%\n',
+            mock_stdout.getvalue(),
+        )
+
+    @patch('sys.stdout', new_callable=StringIO)
+    def test_run_alert(self, mock_stdout):
+        """
+        Cloud Health Delta: The run fails when a total changed more than --alert-percent
+        """
+        app = self._get_app('--alert-percent', '20', '--rollup')
+        app.cloud_health.cost_current.return_value = CloudHealthDeltaTest._get_cost_current(100.0, 10.0)
+        app.run()
+
+        app.cloud_health.cost_current.return_value = CloudHealthDeltaTest._get_cost_current(150.0, 10.0)
+        with self.assertRaises(SystemExit) as cm:
+            app.run()
+
+        self.assertEqual(1, cm.exception.code)
+        self.assertIn('account1\tcompute\t100.00\t150.00', mock_stdout.getvalue())
+
+    @patch('sys.stdout', new_callable=StringIO)
+    def test_run_alert_new_cost(self, mock_stdout):
+        """
+        Cloud Health Delta: The run fails when a category appeared, as the change of its total has no percentage
+        """
+        app = self._get_app('--alert-percent', '20')
+        app.cloud_health.cost_current.return_value = CloudHealthDeltaTest._get_cost_current(100.0, 10.0)
+        app.run()
+
+        app.cloud_health.cost_current.return_value = parse_cost_report(
+            {
+                'dimensions': [
+                    {'AWS-Account': [{'label': 'account1'}, {'label': 'account2'}]},
+                    {'AWS-Service-Category': [{'label': 'ec2', 'parent': -1}, {'label': 's3', 'parent': -1}]},
+                ],
+                'data': [[[100.0], [10.0]], [[5.0], [None]]],
+            },
+            category_type='AWS-Account',
+            exclude_summary=False,
+        )
+        with self.assertRaises(SystemExit) as cm:
+            app.run()
+
+        self.assertEqual(1, cm.exception.code)
+        self.assertIn('account2\tTotal\t-\t5.00\t+5.00\t-', mock_stdout.getvalue())
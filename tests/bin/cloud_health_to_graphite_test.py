@@ -8,6 +8,12 @@
 #
 
 from __future__ import absolute_import
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
 import unittest
 import pprint
 from datetime import datetime, timedelta
@@ -19,7 +25,8 @@ import re
 # Third party libraries
 #
 
-from mock import MagicMock, patch
+import requests
+from mock import call, MagicMock, patch
 from six import iteritems
 
 #
@@ -28,6 +35,10 @@ from six import iteritems
 
 from krux_cloud_health import __version__
 from krux_cloud_health.cloud_health import Interval
+from krux_cloud_health.graphite import PlaintextSender, StdoutSender
+from krux_cloud_health.query import Query
+from krux_cloud_health.report import parse_cost_report
+from krux_cloud_health.scheduler import Job
 from bin.cloud_health_to_graphite import Application, main
 
 
@@ -53,6 +64,8 @@ class CloudHealthAPITest(unittest.TestCase):
         category=None,
         date_format=_DEFAULT_DATE_FORMAT,
         time_interval=_DEFAULT_TIME_INTERVAL,
+        time_select=None,
+        query=None,
     ):
         """
         Creates a fake data to mock Cloud Health API
@@ -114,11 +127,32 @@ class CloudHealthAPITest(unittest.TestCase):
         self.assertIn('date_format', self.app.args)
 
         self.assertEqual(self.API_KEY, self.app.args.api_key)
-        self.assertEqual(self.REPORT_ID, self.app.args.report_id)
+        self.assertEqual([self.REPORT_ID], self.app.args.report_id)
         self.assertEqual(self.REPORT_NAME_ARG, self.app.args.report_name)
         self.assertIsNone(self.app.args.set_date)
         self.assertEqual(self._DEFAULT_DATE_FORMAT, self.app.args.date_format)
 
+    @patch('sys.argv', [
+        'prog', API_KEY, REPORT_ID_ARG, '--filter', 'AWS-Account:select:1234,5678', '--measure', 'cost',
+    ])
+    def test_run_query(self):
+        """
+        Cloud Health to Graphite: The filters and measures of the command line are sent to the API
+        """
+        app = Application()
+        app.cloud_health.get_custom_report = MagicMock(side_effect=CloudHealthAPITest._get_cloud_health_return)
+
+        app.run()
+
+        query = app.cloud_health.get_custom_report.call_args[1]['query']
+        self.assertEqual(Query(filters=[('AWS-Account', 'select', ['1234', '5678'])], measures=['cost']), query)
+
+    def test_no_query(self):
+        """
+        Cloud Health to Graphite: Without filters, dimensions or measures, the reports are retrieved whole
+        """
+        self.assertIsNone(self.app.query)
+
     def test_run_error(self):
         """
         Cloud Health to Graphite: The application correctly errors out when report data cannot be retrieved
@@ -132,17 +166,70 @@ class CloudHealthAPITest(unittest.TestCase):
         self.assertEqual(cm.exception.code, 1)
         self.app.logger.error.assert_called_once_with(str(error))
 
+    @patch('sys.stdout', new_callable=StringIO)
+    def test_run_stats(self, mock_stdout):
+        """
+        Cloud Health to Graphite: The number of datapoints sent for each report is counted
+        """
+        self.app.stats = MagicMock()
+
+        self.app.run()
+
+        # GOTCHA: Every date of the fake data but the total has a single value that is not None.
+        lines = len(CloudHealthAPITest._get_cloud_health_return(self.REPORT_ID)) - 1
+        self.app.stats.incr.assert_called_once_with('{0}.hourly.lines'.format(self.REPORT_NAME), lines)
+        self.app.stats.timer.assert_any_call('{0}.hourly.export'.format(self.REPORT_NAME))
+        self.app.stats.timer.assert_any_call('graphite.flush')
+
+    @patch('sys.stdout', new_callable=StringIO)
+    def test_run_no_debug(self, mock_stdout):
+        """
+        Cloud Health to Graphite: The report data is not formatted for the debug log when it is not logged
+        """
+        self.app.logger.isEnabledFor.return_value = False
+
+        with patch('bin.cloud_health_to_graphite.pprint.pformat') as mock_pformat:
+            self.app.run()
+
+        self.app.logger.isEnabledFor.assert_called_with(logging.DEBUG)
+        self.assertFalse(mock_pformat.called)
+        self.assertFalse(self.app.logger.debug.called)
+
+    @patch('sys.stdout', new_callable=StringIO)
+    def test_run_debug_report(self, mock_stdout):
+        """
+        Cloud Health to Graphite: A parsed report is logged as its nested dictionaries
+        """
+        report_data = parse_cost_report({
+            'dimensions': [
+                {'time': [{'label': '2016-05-01'}]},
+                {'AWS-Service-Category': [{'label': 'EC2 - Compute'}, {'label': 'S3 - Storage'}]},
+            ],
+            'data': [[[10], [1]]],
+        })
+        self.app.logger.isEnabledFor.return_value = True
+        self.app.cloud_health.get_custom_report = MagicMock(return_value=report_data)
+
+        self.app.run()
+
+        self.app.logger.debug.assert_called_once_with(pprint.pformat(report_data.to_dict()))
+        self.assertNotIn('CostReport', self.app.logger.debug.call_args[0][0])
+
     @patch('sys.stdout', new_callable=StringIO)
     def test_run_without_set_date(self, mock_stdout):
         """
         Cloud Health to Graphite: Cloud Health's report data is correctly displayed to stdout to be sent to graphite.
         """
+        self.app.logger.isEnabledFor.return_value = True
+
         self.app.run()
 
         self.app.cloud_health.get_custom_report.assert_called_once_with(
             report_id=self.REPORT_ID,
             category=None,
             time_interval=Interval.hourly,
+            time_select=None,
+            query=None,
         )
         self.app.logger.debug.assert_called_once_with(
             pprint.pformat(CloudHealthAPITest._get_cloud_health_return(self.REPORT_ID))
@@ -206,7 +293,7 @@ class CloudHealthAPITest(unittest.TestCase):
         # Create a lambda function that calls _get_cloud_health_return() with CloudHealthAPITest.DATE_FORMAT
         # This is because side_effect can only take a function pointer
         app.cloud_health.get_custom_report = MagicMock(
-            side_effect=lambda report_id, category, time_interval: CloudHealthAPITest._get_cloud_health_return(
+            side_effect=lambda report_id, time_interval, **kwargs: CloudHealthAPITest._get_cloud_health_return(
                 report_id=report_id, date_format=CloudHealthAPITest.DATE_FORMAT, time_interval=time_interval
             )
         )
@@ -272,6 +359,408 @@ class CloudHealthAPITest(unittest.TestCase):
 
         self.assertEqual(prints, mock_stdout.getvalue())
 
+    def test_sender(self):
+        """
+        Cloud Health to Graphite: Datapoints are printed to stdout by default
+        """
+        self.assertIsInstance(self.app.sender, StdoutSender)
+
+    @patch('sys.argv', ['prog', API_KEY, REPORT_ID_ARG, '-n', REPORT_NAME_ARG, '--graphite-mode', 'plaintext'])
+    def test_run_with_graphite_mode(self):
+        """
+        Cloud Health to Graphite: Datapoints are sent to the configured sender and flushed at the end of the run
+        """
+        app = Application()
+        self.assertIsInstance(app.sender, PlaintextSender)
+        app.sender = MagicMock()
+        app.cloud_health.get_custom_report = MagicMock(side_effect=CloudHealthAPITest._get_cloud_health_return)
+
+        app.run()
+
+        api_data = CloudHealthAPITest._get_cloud_health_return(self.REPORT_ID)
+        self.assertEqual(len(api_data) - 1, app.sender.send.call_count)
+        app.sender.send.assert_any_call(
+            'cloud_health.{env}.{report_name}.key1'.format(
+                env=app.args.stats_environment, report_name=self.REPORT_NAME,
+            ),
+            'value1',
+            int(calendar.timegm(datetime.strptime(min(api_data), '%Y-%m-%d').utctimetuple())),
+        )
+        app.sender.flush.assert_called_once_with()
+
+    @patch('sys.argv', ['prog', API_KEY, REPORT_ID_ARG, '-n', REPORT_NAME_ARG, '--hierarchy'])
+    def test_run_hierarchy(self):
+        """
+        Cloud Health to Graphite: With --hierarchy, each service is nested under its parents, which are rolled up
+        """
+        report_data = parse_cost_report(
+            {
+                'dimensions': [
+                    {'time': [{'label': '2016-05-01'}]},
+                    {'AWS-Service-Category': [
+                        {'label': 'EC2 - Compute', 'parent': -1},
+                        {'label': 'EC2 Instances', 'parent': 0},
+                        {'label': 'EBS', 'parent': 0},
+                    ]},
+                ],
+                'data': [[[10], [1], [2]]],
+            },
+            exclude_summary=False,
+        )
+        app = Application()
+        app.sender = MagicMock()
+        app.cloud_health.get_custom_report = MagicMock(return_value=report_data)
+
+        app.run()
+
+        prefix = 'cloud_health.{env}.{report_name}.'.format(
+            env=app.args.stats_environment, report_name=self.REPORT_NAME,
+        )
+        date = int(calendar.timegm(datetime(2016, 5, 1).utctimetuple()))
+        self.assertEqual(
+            sorted([
+                call(prefix + 'EC2_-_Compute', 3.0, date),
+                call(prefix + 'EC2_-_Compute.EC2_Instances', 1.0, date),
+                call(prefix + 'EC2_-_Compute.EBS', 2.0, date),
+            ]),
+            sorted(app.sender.send.call_args_list),
+        )
+
+    @patch('sys.stdout', new_callable=StringIO)
+    def test_run_incremental(self, mock_stdout):
+        """
+        Cloud Health to Graphite: Only the new and changed dates are exported in incremental mode
+        """
+        state_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, state_dir)
+        argv = ['prog', self.API_KEY, self.REPORT_ID_ARG, '--incremental', '--state-dir', state_dir]
+        report_data = {
+            '2016-05-01': {'key1': 1.0},
+            '2016-05-02': {'key1': 2.0},
+        }
+
+        with patch('sys.argv', argv):
+            app = Application()
+        app.cloud_health.get_custom_report = MagicMock(side_effect=lambda **kwargs: dict(report_data))
+
+        app.run()
+        self.assertEqual(2, len(mock_stdout.getvalue().splitlines()))
+        self.assertTrue(os.path.exists(app._get_state_path(self.REPORT_ID)))
+
+        # Nothing changed
+        mock_stdout.truncate(0)
+        app.run()
+        self.assertEqual('', mock_stdout.getvalue())
+
+        # One date changed and one is new
+        report_data['2016-05-02'] = {'key1': 2.5}
+        report_data['2016-05-03'] = {'key1': 3.0}
+        app.run()
+        lines = mock_stdout.getvalue().splitlines()
+        self.assertEqual(2, len(lines))
+        self.assertTrue(lines[0].endswith(' 2.5 1462147200') or lines[1].endswith(' 2.5 1462147200'))
+
+    @patch('sys.argv', [
+        'prog', API_KEY, REPORT_ID_ARG, '--incremental', '--incremental-lookback', '2', '--interval', 'daily',
+    ])
+    def test_get_time_select(self):
+        """
+        Cloud Health to Graphite: The dates from the lookback before the last export are retrieved
+        """
+        app = Application()
+        state = MagicMock(high_water_mark=calendar.timegm((datetime.utcnow() - timedelta(days=1)).utctimetuple()))
+
+        time_select = app._get_time_select([state])
+
+        self.assertEqual(4, len(time_select))
+        self.assertEqual(datetime.utcnow().strftime('%Y-%m-%d'), time_select[-1])
+        self.assertIsNone(app._get_time_select([MagicMock(high_water_mark=None)]))
+
+    @patch('sys.argv', [
+        'prog', API_KEY, REPORT_ID_ARG, '--incremental', '--incremental-lookback', '2', '--interval', 'hourly',
+    ])
+    def test_get_time_select_unique(self):
+        """
+        Cloud Health to Graphite: The hours sharing a label in the date format are only selected once
+        """
+        app = Application()
+        state = MagicMock(high_water_mark=calendar.timegm((datetime.utcnow() - timedelta(days=2)).utctimetuple()))
+
+        time_select = app._get_time_select([state])
+
+        self.assertEqual(sorted(set(time_select)), time_select)
+        self.assertIn(len(time_select), (3, 4))
+
+    @patch('sys.argv', [
+        'prog', API_KEY, REPORT_ID_ARG, '--incremental', '--incremental-lookback', '2', '--interval', 'hourly',
+        '--date-format', '%Y-%m-%dT%H:%M',
+    ])
+    def test_get_time_select_too_long(self):
+        """
+        Cloud Health to Graphite: The whole reports are retrieved when too many dates were not exported
+        """
+        app = Application()
+        state = MagicMock(high_water_mark=calendar.timegm((datetime.utcnow() - timedelta(days=30)).utctimetuple()))
+
+        self.assertIsNone(app._get_time_select([state]))
+
+        state = MagicMock(high_water_mark=calendar.timegm((datetime.utcnow() - timedelta(hours=3)).utctimetuple()))
+        self.assertEqual(6, len(app._get_time_select([state])))
+
+    def test_get_time_select_disabled(self):
+        """
+        Cloud Health to Graphite: The whole reports are retrieved without a lookback
+        """
+        self.assertIsNone(self.app._get_time_select([MagicMock(high_water_mark=1462060800)]))
+
+    def test_reports(self):
+        """
+        Cloud Health to Graphite: A single report ID is exported under the name passed with --report-name
+        """
+        self.assertEqual({self.REPORT_ID: self.REPORT_NAME}, dict(self.app.reports))
+
+    @patch('sys.argv', ['prog', API_KEY, REPORT_ID_ARG, '67891', '--report-name', REPORT_NAME_ARG])
+    def test_reports_multiple_report_name(self):
+        """
+        Cloud Health to Graphite: --report-name cannot be used with multiple report IDs
+        """
+        with self.assertRaises(SystemExit) as cm:
+            Application()
+        self.assertEqual(cm.exception.code, 2)
+
+    @patch('sys.argv', ['prog', API_KEY])
+    def test_reports_none(self):
+        """
+        Cloud Health to Graphite: At least one report must be given
+        """
+        with self.assertRaises(SystemExit) as cm:
+            Application()
+        self.assertEqual(cm.exception.code, 2)
+
+    def test_reports_file(self):
+        """
+        Cloud Health to Graphite: Reports are read from --report-file and default their name to their ID
+        """
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        report_file = os.path.join(temp_dir, 'reports.txt')
+        with open(report_file, 'w') as f:
+            f.write('# Reports exported every hour\n')
+            f.write('\n')
+            f.write('111 first report\n')
+            f.write('222\n')
+
+        with patch('sys.argv', ['prog', self.API_KEY, self.REPORT_ID_ARG, '--report-file', report_file]):
+            app = Application()
+
+        self.assertEqual(
+            [(self.REPORT_ID, str(self.REPORT_ID)), (111, 'first_report'), (222, '222')],
+            list(app.reports.items()),
+        )
+
+    @patch('sys.argv', ['prog', API_KEY, 'EC2 costs', REPORT_ID_ARG])
+    @patch('krux_cloud_health.cloud_health.CloudHealth.find_report', return_value=111)
+    def test_reports_by_name(self, mock_find_report):
+        """
+        Cloud Health to Graphite: Reports given by name are resolved to their ID and default their name to it
+        """
+        app = Application()
+
+        mock_find_report.assert_called_once_with('EC2 costs')
+        self.assertEqual(
+            [(111, 'EC2_costs'), (self.REPORT_ID, str(self.REPORT_ID))],
+            list(app.reports.items()),
+        )
+
+    @patch('sys.argv', ['prog', API_KEY, 'EC2 costs', '-n', 'override'])
+    @patch('krux_cloud_health.cloud_health.CloudHealth.find_report', return_value=111)
+    def test_reports_by_name_report_name(self, mock_find_report):
+        """
+        Cloud Health to Graphite: --report-name overrides the name of a single report given by name
+        """
+        app = Application()
+
+        self.assertEqual([(111, 'override')], list(app.reports.items()))
+
+    @patch('sys.argv', ['prog', API_KEY, 'EC2 costs'])
+    @patch('krux_cloud_health.cloud_health.CloudHealth.find_report', side_effect=ValueError('No custom report'))
+    def test_reports_by_unknown_name(self, mock_find_report):
+        """
+        Cloud Health to Graphite: A report name that cannot be resolved is an error
+        """
+        with self.assertRaises(SystemExit) as cm:
+            Application()
+        self.assertEqual(cm.exception.code, 2)
+
+    @patch('sys.argv', ['prog', API_KEY, REPORT_ID_ARG, '67891'])
+    @patch('sys.stdout', new_callable=StringIO)
+    def test_run_multiple_reports(self, mock_stdout):
+        """
+        Cloud Health to Graphite: All the reports are retrieved and exported under their own name
+        """
+        app = Application()
+        app.cloud_health.get_custom_report = MagicMock(side_effect=CloudHealthAPITest._get_cloud_health_return)
+
+        app.run()
+
+        self.assertEqual(2, app.cloud_health.get_custom_report.call_count)
+        # Only key1 of each date, except the total, has a value
+        expected_count = len(CloudHealthAPITest._get_cloud_health_return(self.REPORT_ID)) - 1
+        lines = mock_stdout.getvalue().splitlines()
+        for report_id in (self.REPORT_ID_ARG, '67891'):
+            prefix = 'cloud_health.{env}.{report_name}.'.format(
+                env=app.args.stats_environment, report_name=report_id,
+            )
+            self.assertEqual(expected_count, len([line for line in lines if line.startswith(prefix)]))
+
+    @patch('sys.argv', ['prog', API_KEY, REPORT_ID_ARG, '67891'])
+    @patch('sys.stdout', new_callable=StringIO)
+    def test_run_partial_error(self, mock_stdout):
+        """
+        Cloud Health to Graphite: The other reports are still exported when one of them fails
+        """
+        error = ValueError('Error message')
+
+        def get_custom_report(report_id, **kwargs):
+            if report_id == self.REPORT_ID:
+                raise error
+            return CloudHealthAPITest._get_cloud_health_return(report_id, **kwargs)
+
+        app = Application()
+        app.logger = MagicMock()
+        app.cloud_health.get_custom_report = MagicMock(side_effect=get_custom_report)
+
+        with self.assertRaises(SystemExit) as cm:
+            app.run()
+
+        self.assertEqual(cm.exception.code, 1)
+        app.logger.error.assert_called_once_with(str(error))
+        self.assertIn('cloud_health.{env}.67891.'.format(env=app.args.stats_environment), mock_stdout.getvalue())
+
+    @patch('sys.argv', ['prog', API_KEY, REPORT_ID_ARG, '67891'])
+    @patch('sys.stdout', new_callable=StringIO)
+    def test_run_partial_connection_error(self, mock_stdout):
+        """
+        Cloud Health to Graphite: The other reports are still exported when one of them cannot be retrieved
+        """
+        error = requests.ConnectionError('Connection refused')
+
+        def get_custom_report(report_id, **kwargs):
+            if report_id == self.REPORT_ID:
+                raise error
+            return CloudHealthAPITest._get_cloud_health_return(report_id, **kwargs)
+
+        app = Application()
+        app.logger = MagicMock()
+        app.cloud_health.get_custom_report = MagicMock(side_effect=get_custom_report)
+
+        with self.assertRaises(SystemExit) as cm:
+            app.run()
+
+        self.assertEqual(cm.exception.code, 1)
+        app.logger.error.assert_called_once_with('Failed to retrieve report %s: %r', self.REPORT_ID, error)
+        self.assertIn('cloud_health.{env}.67891.'.format(env=app.args.stats_environment), mock_stdout.getvalue())
+
+    @patch('sys.argv', ['prog', API_KEY, '--daemon'])
+    def test_daemon_no_jobs_file(self):
+        """
+        Cloud Health to Graphite: --daemon requires a jobs file
+        """
+        with self.assertRaises(SystemExit) as cm:
+            Application()
+        self.assertEqual(cm.exception.code, 2)
+
+    @patch('sys.stdout', new_callable=StringIO)
+    def test_daemon_run_job(self, mock_stdout):
+        """
+        Cloud Health to Graphite: In daemon mode, each job exports its report with its own interval and name
+        """
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        jobs_file = os.path.join(directory, 'jobs.json')
+        with open(jobs_file, 'w') as f:
+            json.dump({'jobs': [
+                {'report_id': self.REPORT_ID, 'report_name': self.REPORT_NAME_ARG, 'schedule': '1h'},
+            ]}, f)
+
+        with patch('sys.argv', ['prog', self.API_KEY, '--daemon', '--jobs-file', jobs_file, '--interval', 'daily']):
+            app = Application()
+        app.cloud_health.get_custom_report = MagicMock(side_effect=CloudHealthAPITest._get_cloud_health_return)
+
+        self.assertEqual(
+            [Job(self.REPORT_ID, Interval.daily, self.REPORT_NAME_ARG, 3600.0, self._DEFAULT_DATE_FORMAT)],
+            app.jobs,
+        )
+
+        app._run_job(app.jobs[0])
+
+        app.cloud_health.get_custom_report.assert_called_once_with(
+            report_id=self.REPORT_ID,
+            category=None,
+            time_interval=Interval.daily,
+            time_select=None,
+            query=None,
+        )
+        self.assertIn(
+            'cloud_health.{0}.{1}.key1 '.format(app.args.stats_environment, self.REPORT_NAME),
+            mock_stdout.getvalue(),
+        )
+
+    @patch('sys.stdout', new_callable=StringIO)
+    def test_daemon_concurrent_jobs(self, mock_stdout):
+        """
+        Cloud Health to Graphite: In daemon mode, the jobs retrieve their reports at the same time
+        """
+        started = []
+        all_started = threading.Event()
+        overlapped = []
+
+        def get_custom_report(report_id, time_interval, **kwargs):
+            started.append(report_id)
+            if len(started) == 2:
+                all_started.set()
+            # Without the other job retrieving its report at the same time, this waits for the whole timeout.
+            overlapped.append(all_started.wait(5))
+            return CloudHealthAPITest._get_cloud_health_return(report_id, time_interval=time_interval)
+
+        self.app.cloud_health.get_custom_report = MagicMock(side_effect=get_custom_report)
+
+        jobs = [
+            Job(report_id, Interval.daily, None, 3600.0, self._DEFAULT_DATE_FORMAT)
+            for report_id in (self.REPORT_ID, self.REPORT_ID + 1)
+        ]
+        threads = [threading.Thread(target=self.app._run_job, args=(job,)) for job in jobs]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual([True, True], overlapped)
+        for report_id in (self.REPORT_ID, self.REPORT_ID + 1):
+            self.assertIn(
+                'cloud_health.{0}.{1}.key1 '.format(self.app.args.stats_environment, report_id),
+                mock_stdout.getvalue(),
+            )
+
+    @patch('bin.cloud_health_to_graphite.Scheduler')
+    @patch('bin.cloud_health_to_graphite.signal')
+    def test_daemon_run(self, mock_signal, mock_scheduler):
+        """
+        Cloud Health to Graphite: In daemon mode, the jobs are run by the scheduler and SIGHUP reloads them
+        """
+        self.app.args.daemon = True
+        self.app.jobs = [MagicMock()]
+
+        self.app.run()
+
+        scheduler = mock_scheduler.return_value
+        scheduler.set_jobs.assert_called_once_with(self.app.jobs)
+        scheduler.run.assert_called_once_with()
+
+        handlers = dict((args[0], args[1]) for args, _ in mock_signal.signal.call_args_list)
+        handlers[mock_signal.SIGHUP](mock_signal.SIGHUP, None)
+        scheduler.reload.assert_called_once_with()
+
     def test_main(self):
         """
         Cloud Health to Graphite: Application is instantiated and run() is called in main()
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+#
+# © 2016-2018 Salesforce.com, inc.
+#
+
+#
+# Standard libraries
+#
+
+from __future__ import absolute_import
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+
+# Prints the seconds the import of a module took and the modules loaded once the --help of its main() was shown
+_SCRIPT = '''
+import json, os, sys, time
+
+start = time.time()
+module = __import__(sys.argv[1], fromlist=['main'])
+seconds = time.time() - start
+
+if hasattr(module, 'main'):
+    sys.argv = [sys.argv[1], '--help']
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        module.main()
+    except SystemExit:
+        pass
+
+sys.__stdout__.write(json.dumps({'seconds': seconds, 'modules': sorted(sys.modules)}))
+'''
+
+
+class StartupTest(unittest.TestCase):
+
+    ENTRY_POINTS = ['krux_cloud_health.cli', 'bin.cloud_health_to_graphite']
+
+    # Modules that are only needed once the arguments are parsed
+    LAZY_MODULES = ['requests', 'numpy', 'pyarrow', 'ijson', 'krux_cloud_health.cloud_health']
+
+    # Fraction of the import time of the API client that the import of an entry point may take. The budget is
+    # relative so that it holds on slower hosts. It used to take longer, as the entry points imported the client.
+    IMPORT_BUDGET = 0.5
+
+    # Number of imports of which the fastest is kept, so that a busy host does not fail the test
+    REPEAT = 3
+
+    @staticmethod
+    def _start(entry_point):
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(path for path in sys.path if path))
+        output = subprocess.check_output([sys.executable, '-c', _SCRIPT, entry_point], env=env)
+        return json.loads(output)
+
+    def test_help_does_not_load_lazy_modules(self):
+        """
+        Startup Test: --help of the entry points does not load the modules only needed to call the API
+        """
+        for entry_point in self.ENTRY_POINTS:
+            modules = set(self._start(entry_point)['modules'])
+            for module in self.LAZY_MODULES:
+                self.assertNotIn(module, modules, '{0} loads {1} on startup'.format(entry_point, module))
+
+    def _get_import_time(self, module):
+        return min(self._start(module)['seconds'] for _ in range(self.REPEAT))
+
+    def test_import_budget(self):
+        """
+        Startup Test: The entry points are imported within the budget
+        """
+        budget = self._get_import_time('krux_cloud_health.cloud_health') * self.IMPORT_BUDGET
+
+        for entry_point in self.ENTRY_POINTS:
+            seconds = self._get_import_time(entry_point)
+            self.assertLess(
+                seconds,
+                budget,
+                '{0} took {1:.3f}s to import, over the budget of {2:.3f}s'.format(entry_point, seconds, budget),
+            )
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+#
+# © 2016-2018 Salesforce.com, inc.
+#
+
+#
+# Standard libraries
+#
+
+from __future__ import absolute_import
+import threading
+import unittest
+from datetime import date
+
+#
+# Third party libraries
+#
+
+from mock import MagicMock, patch
+
+#
+# Internal libraries
+#
+
+from krux_cloud_health.async_cloud_health import asyncio, AsyncCloudHealth, get_async_cloud_health
+from krux_cloud_health.cloud_health import DEFAULT_MAX_WORKERS, DEFAULT_TIME_CHUNK, Interval
+from krux_cloud_health.query import Query
+
+
+class AsyncCloudHealthTest(unittest.TestCase):
+
+    REPORT_ID = 1234567890
+    COST_HISTORY_RV = {'2016-05-01': {'service1': 1.0}}
+
+    def setUp(self):
+        self.cloud_health = MagicMock()
+        self.cloud_health.cost_history.return_value = AsyncCloudHealthTest.COST_HISTORY_RV
+        self.async_cloud_health = AsyncCloudHealth(self.cloud_health, max_concurrency=2)
+        self.addCleanup(self.async_cloud_health.close)
+
+    @patch('krux_cloud_health.async_cloud_health.get_cloud_health')
+    def test_get_async_cloud_health(self, mock_get_cloud_health):
+        """
+        Async Cloud Health Test: The concurrency defaults to the pool size of the CloudHealth
+        """
+        mock_get_cloud_health.return_value.pool_size = 7
+        args = MagicMock()
+
+        async_cloud_health = get_async_cloud_health(args=args)
+        self.addCleanup(async_cloud_health.close)
+
+        mock_get_cloud_health.assert_called_once_with(args=args, logger=None, stats=None)
+        self.assertEqual(7, async_cloud_health.max_concurrency)
+
+    def test_cost_history(self):
+        """
+        Async Cloud Health Test: The result of CloudHealth is returned through a future
+        """
+        future = self.async_cloud_health.cost_history(Interval.daily, '2016-05-01')
+
+        self.assertEqual(AsyncCloudHealthTest.COST_HISTORY_RV, future.result(timeout=5))
+        self.cloud_health.cost_history.assert_called_once_with(Interval.daily, '2016-05-01', query=None)
+
+    def test_cost_history_range(self):
+        """
+        Async Cloud Health Test: The dates of a range are returned as a list through a future
+        """
+        rows = [('2016-05-01', {'service1': 1.0}), ('2016-05-02', {'service1': 2.0})]
+        self.cloud_health.cost_history_range.return_value = iter(rows)
+        query = Query().select('AWS-Account', '1234')
+
+        future = self.async_cloud_health.cost_history_range(date(2016, 5, 1), date(2016, 5, 2), query=query)
+
+        self.assertEqual(rows, future.result(timeout=5))
+        self.cloud_health.cost_history_range.assert_called_once_with(
+            date(2016, 5, 1),
+            date(2016, 5, 2),
+            time_interval=Interval.daily,
+            chunk=DEFAULT_TIME_CHUNK,
+            max_workers=DEFAULT_MAX_WORKERS,
+            date_format=None,
+            query=query,
+        )
+
+    def test_get_custom_report_query(self):
+        """
+        Async Cloud Health Test: The query is passed on to CloudHealth
+        """
+        query = Query().select('AWS-Account', '1234')
+
+        self.async_cloud_health.get_custom_reports([AsyncCloudHealthTest.REPORT_ID], query=query)[
+            AsyncCloudHealthTest.REPORT_ID
+        ].result(timeout=5)
+
+        self.cloud_health.get_custom_report.assert_called_once_with(
+            report_id=AsyncCloudHealthTest.REPORT_ID,
+            category=None,
+            time_interval=Interval.hourly,
+            time_select=None,
+            query=query,
+        )
+
+    def test_cost_current_error(self):
+        """
+        Async Cloud Health Test: The error of CloudHealth is raised by the future
+        """
+        self.cloud_health.cost_current.side_effect = ValueError('Error message')
+
+        future = self.async_cloud_health.cost_current()
+
+        with self.assertRaises(ValueError):
+            future.result(timeout=5)
+
+    def test_get_custom_reports(self):
+        """
+        Async Cloud Health Test: At most max_concurrency calls are in flight and pending calls can be cancelled
+        """
+        release = threading.Event()
+        lock = threading.Lock()
+        in_flight = [0, 0]
+
+        def get_custom_report(report_id, **kwargs):
+            with lock:
+                in_flight[0] += 1
+                in_flight[1] = max(in_flight)
+            release.wait(5)
+            with lock:
+                in_flight[0] -= 1
+            return {'id': report_id}
+
+        self.cloud_health.get_custom_report.side_effect = get_custom_report
+
+        futures = self.async_cloud_health.get_custom_reports(range(5))
+        self.assertTrue(futures[4].cancel())
+        release.set()
+
+        self.assertEqual({'id': 0}, futures[0].result(timeout=5))
+        self.assertTrue(futures[4].cancelled())
+        for report_id in range(4):
+            futures[report_id].result(timeout=5)
+        self.assertEqual(2, in_flight[1])
+
+    @unittest.skipIf(asyncio is None, 'asyncio is not available')
+    def test_loop(self):
+        """
+        Async Cloud Health Test: The futures are bound to the given asyncio event loop
+        """
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        async_cloud_health = AsyncCloudHealth(self.cloud_health, loop=loop)
+        self.addCleanup(async_cloud_health.close)
+
+        future = async_cloud_health.cost_history(Interval.daily)
+
+        self.assertEqual(AsyncCloudHealthTest.COST_HISTORY_RV, loop.run_until_complete(future))
+
+    @unittest.skipIf(asyncio is not None, 'asyncio is available')
+    def test_loop_no_asyncio(self):
+        """
+        Async Cloud Health Test: A loop cannot be given without asyncio
+        """
+        with self.assertRaises(ValueError):
+            AsyncCloudHealth(self.cloud_health, loop=MagicMock())
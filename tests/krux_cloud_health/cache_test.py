@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+#
+# © 2016-2018 Salesforce.com, inc.
+#
+
+#
+# Standard libraries
+#
+
+from __future__ import absolute_import
+import os
+import shutil
+import tempfile
+import unittest
+
+#
+# Internal libraries
+#
+
+from krux_cloud_health.cache import CacheEntry, FileResponseCache, get_cache_key
+
+
+class CacheTest(unittest.TestCase):
+
+    API_KEY = '12345'
+    REPORT = 'olap_reports/cost/history'
+    PARAMS = {'interval': 'daily', 'filters[]': 'time:select:2016-05-01'}
+    ENTRY = CacheEntry(body={'data': [[[1.0]]]}, stored_at=1462060800.0, etag='"etag"', last_modified=None)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.cache = FileResponseCache(directory=os.path.join(self.directory, 'cache'))
+
+    def test_get_cache_key(self):
+        """
+        Cache Test: The cache key does not depend on the order of the parameters and does not contain the API key
+        """
+        key = get_cache_key(CacheTest.REPORT, CacheTest.API_KEY, CacheTest.PARAMS)
+
+        self.assertEqual(key, get_cache_key(CacheTest.REPORT, CacheTest.API_KEY, dict(CacheTest.PARAMS)))
+        self.assertNotIn(CacheTest.API_KEY, key)
+        self.assertNotEqual(key, get_cache_key(CacheTest.REPORT, '67890', CacheTest.PARAMS))
+        self.assertNotEqual(key, get_cache_key(CacheTest.REPORT, CacheTest.API_KEY, {'interval': 'daily'}))
+
+    def test_get_validators(self):
+        """
+        Cache Test: The validators of an entry are sent as conditional headers
+        """
+        self.assertEqual({'If-None-Match': '"etag"'}, CacheTest.ENTRY.get_validators())
+        self.assertEqual({}, CacheTest.ENTRY._replace(etag=None).get_validators())
+
+    def test_get_missing(self):
+        """
+        Cache Test: A missing entry is a cache miss
+        """
+        self.assertIsNone(self.cache.get('missing'))
+
+    def test_set_get(self):
+        """
+        Cache Test: A stored entry is returned as is
+        """
+        self.cache.set('key', CacheTest.ENTRY)
+
+        self.assertEqual(CacheTest.ENTRY, self.cache.get('key'))
+
+    def test_get_corrupted(self):
+        """
+        Cache Test: A corrupted entry is a cache miss
+        """
+        self.cache.set('key', CacheTest.ENTRY)
+        with open(self.cache._get_path('key'), 'w') as f:
+            f.write('{')
+
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_evict(self):
+        """
+        Cache Test: The least recently used entries are removed once the cache is over its maximum size
+        """
+        self.cache.set('old', CacheTest.ENTRY)
+        self.cache.set('new', CacheTest.ENTRY)
+        self.cache.max_size = os.path.getsize(self.cache._get_path('old')) * 2
+        os.utime(self.cache._get_path('old'), (0, 0))
+        os.utime(self.cache._get_path('new'), (1, 1))
+
+        self.cache.set('newest', CacheTest.ENTRY)
+
+        self.assertIsNone(self.cache.get('old'))
+        self.assertIsNotNone(self.cache.get('new'))
+        self.assertIsNotNone(self.cache.get('newest'))
@@ -8,6 +8,7 @@
 #
 
 from __future__ import absolute_import
+import pprint
 import unittest
 
 #
@@ -23,6 +24,7 @@ from mock import MagicMock, patch
 from krux_cloud_health import __version__
 from krux_cloud_health.cli import Application, main
 from krux_cloud_health.cloud_health import Interval, NAME
+from krux_cloud_health.report import parse_cost_report
 from krux.stats import DummyStatsClient
 
 
@@ -44,7 +46,7 @@ class CLItest(unittest.TestCase):
             'Krux Ops': {'key': 'value'}
         }
 
-    @patch('krux_cloud_health.cli.get_cloud_health')
+    @patch('krux_cloud_health.cloud_health.get_cloud_health')
     @patch('sys.argv', ['api-key', API_KEY])
     def setUp(self, mock_get_cloud_health):
         self.app = Application()
@@ -89,6 +91,21 @@ class CLItest(unittest.TestCase):
         self.app.cloud_health.cost_history.assert_called_once_with(CLItest.INTERVAL)
         self.app.logger.info.assert_called_once_with(mock_pprint(CLItest.COST_HISTORY_RV))
 
+    def test_run_report(self):
+        """
+        CLI Test: A parsed report is logged as its nested dictionaries
+        """
+        report = parse_cost_report({
+            'dimensions': [{'time': [{'label': '2016-05-01'}]}, {'AWS-Service-Category': [{'label': 'key'}]}],
+            'data': [[[1]]],
+        })
+        self.app.cloud_health.cost_history.return_value = report
+        self.app.logger = MagicMock()
+
+        self.app.run()
+
+        self.app.logger.info.assert_called_once_with(pprint.pformat(report.to_dict(), indent=2, width=20))
+
     def test_main(self):
         """
         CLI Test: Application is instantiated and run() is called in main()
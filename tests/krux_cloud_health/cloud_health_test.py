@@ -8,7 +8,11 @@
 #
 
 from __future__ import absolute_import
+import json
+import threading
+import time
 import unittest
+from datetime import date, datetime
 
 #
 # Third party libraries
@@ -20,7 +24,12 @@ from mock import MagicMock, patch
 # Internal libraries
 #
 
-from krux_cloud_health.cloud_health import get_cloud_health, Interval, NAME
+import requests
+from krux.cli import get_parser
+from krux_cloud_health.cache import CacheEntry
+from krux_cloud_health.cloud_health import get_cloud_health, add_cloud_health_cli_arguments, Interval, NAME
+from krux_cloud_health.query import Query
+from krux_cloud_health.report import CostReport
 
 
 class CloudHealthTest(unittest.TestCase):
@@ -76,19 +85,34 @@ class CloudHealthTest(unittest.TestCase):
         'date2': {'service2': 4.11, 'service3': None},
     }
     REPORT_ID = 1234567890
+    TIMEOUT = (3.05, 60.0)
+
+    @staticmethod
+    def _get_args(*argv):
+        parser = get_parser(description=NAME)
+        add_cloud_health_cli_arguments(parser)
+        return parser.parse_args([CloudHealthTest.API_KEY] + list(argv))
+
+    @staticmethod
+    def _get_response(status_code=200, json=None, headers=None):
+        response = MagicMock(status_code=status_code, headers=headers or {})
+        response.json.return_value = json
+        return response
 
     def setUp(self):
-        self.cloud_health = get_cloud_health(args=MagicMock(api_key=CloudHealthTest.API_KEY))
+        self.cloud_health = get_cloud_health(args=CloudHealthTest._get_args('--no-cache'))
 
+    @patch('krux_cloud_health.cloud_health.FileResponseCache')
     @patch('krux_cloud_health.cloud_health.get_stats')
     @patch('krux_cloud_health.cloud_health.get_logger')
     @patch('krux_cloud_health.cloud_health.get_parser')
     @patch('krux_cloud_health.cloud_health.CloudHealth')
-    def test_get_cloud_health_no_args(self, mock_cloud_health, mock_parser, mock_logger, mock_stats):
+    def test_get_cloud_health_no_args(self, mock_cloud_health, mock_parser, mock_logger, mock_stats, mock_cache):
         """
         Cloud Health Test: All arguments created and passed into CloudHealth if none are provided.
         """
-        mock_parser.return_value.parse_args.return_value = MagicMock(api_key=CloudHealthTest.API_KEY)
+        args = CloudHealthTest._get_args()
+        mock_parser.return_value.parse_args.return_value = args
 
         get_cloud_health()
 
@@ -96,23 +120,60 @@ class CloudHealthTest(unittest.TestCase):
             api_key=CloudHealthTest.API_KEY,
             logger=mock_logger(name=NAME),
             stats=mock_stats(prefix=NAME),
+            pool_size=args.pool_size,
+            connect_timeout=args.connect_timeout,
+            read_timeout=args.read_timeout,
+            max_retries=args.max_retries,
+            backoff_factor=args.backoff_factor,
+            backoff_max=args.backoff_max,
+            cache=mock_cache.return_value,
+            rate_limiter=None,
+            parse_processes=0,
+            metadata_ttl=86400,
         )
+        mock_cache.assert_called_once_with(directory=args.cache_dir, max_size=args.cache_max_size * 1024 * 1024)
 
+    @patch('krux_cloud_health.cloud_health.get_rate_limiter')
     @patch('krux_cloud_health.cloud_health.get_stats')
     @patch('krux_cloud_health.cloud_health.get_logger')
     @patch('krux_cloud_health.cloud_health.CloudHealth')
-    def test_get_cloud_health_all_args(self, mock_cloud_health, mock_logger, mock_stats):
+    def test_get_cloud_health_all_args(self, mock_cloud_health, mock_logger, mock_stats, mock_rate_limiter):
         """
         Cloud Health Test: All arguments into passed CloudHealth if provided.
         """
-        mock_args = MagicMock(api_key=CloudHealthTest.API_KEY)
+        args = CloudHealthTest._get_args(
+            '--pool-size', '20',
+            '--connect-timeout', '1.5',
+            '--read-timeout', '10',
+            '--max-retries', '5',
+            '--backoff-factor', '2',
+            '--backoff-max', '10',
+            '--no-cache',
+            '--rate-limit', '2.5',
+            '--rate-limit-burst', '5',
+            '--rate-limit-dir', '/tmp/rate-limit',
+            '--parse-processes', '4',
+        )
 
-        get_cloud_health(mock_args, mock_logger, mock_stats)
+        get_cloud_health(args, mock_logger, mock_stats)
 
+        mock_rate_limiter.assert_called_once_with(
+            api_key=CloudHealthTest.API_KEY, rate=2.5, capacity=5, directory='/tmp/rate-limit',
+        )
         mock_cloud_health.assert_called_once_with(
             api_key=CloudHealthTest.API_KEY,
             logger=mock_logger,
             stats=mock_stats,
+            pool_size=20,
+            connect_timeout=1.5,
+            read_timeout=10.0,
+            max_retries=5,
+            backoff_factor=2.0,
+            backoff_max=10.0,
+            cache=None,
+            rate_limiter=mock_rate_limiter.return_value,
+            parse_processes=4,
+            metadata_ttl=86400,
         )
 
     def test_cost_history_time_input(self):
@@ -137,7 +198,7 @@ class CloudHealthTest(unittest.TestCase):
                 CloudHealthTest.PARAMS_TIME_INPUT
             ),
             CloudHealthTest.COST_HISTORY_CATEGORY_TYPE,
-            CloudHealthTest.TIME_INPUT
+            CloudHealthTest.TIME_INPUT,
         )
 
     def test_cost_history_no_time_input(self):
@@ -161,6 +222,86 @@ class CloudHealthTest(unittest.TestCase):
             None,
         )
 
+    def test_get_time_range(self):
+        """
+        Cloud Health Test: Get time range method lists the labels of every date of the interval in the range.
+        """
+        self.assertEqual(
+            ['2016-05-01T22:00', '2016-05-01T23:00', '2016-05-02T00:00'],
+            self.cloud_health._get_time_range(
+                datetime(2016, 5, 1, 22), datetime(2016, 5, 2, 0), Interval.hourly,
+            ),
+        )
+        self.assertEqual(
+            ['2016-04-30', '2016-05-01', '2016-05-02'],
+            self.cloud_health._get_time_range(date(2016, 4, 30), date(2016, 5, 2), Interval.daily),
+        )
+        self.assertEqual(
+            ['2016-05-01', '2016-05-08'],
+            self.cloud_health._get_time_range(date(2016, 5, 1), date(2016, 5, 14), Interval.weekly),
+        )
+        self.assertEqual(
+            ['2015-11', '2015-12', '2016-01', '2016-02'],
+            self.cloud_health._get_time_range(date(2015, 11, 15), date(2016, 2, 1), Interval.monthly),
+        )
+
+    def test_get_time_range_dates_hourly(self):
+        """
+        Cloud Health Test: Get time range method lists every hour of the days given as dates.
+        """
+        dates = self.cloud_health._get_time_range(date(2016, 5, 1), date(2016, 5, 2), Interval.hourly)
+
+        self.assertEqual(48, len(dates))
+        self.assertEqual('2016-05-01T00:00', dates[0])
+        self.assertEqual('2016-05-02T23:00', dates[-1])
+
+    def test_cost_history_range_weekly(self):
+        """
+        Cloud Health Test: Cost history range method refuses the weeks, whose labels cannot be computed.
+        """
+        with self.assertRaises(ValueError):
+            list(self.cloud_health.cost_history_range(date(2016, 5, 1), date(2016, 5, 14), Interval.weekly))
+
+    def test_cost_history_range(self):
+        """
+        Cloud Health Test: Cost history range method yields the dates in order even when windows complete out of order.
+        """
+        first_window_done = threading.Event()
+
+        def get_cost_history_window(time_interval, dates, query=None):
+            if dates[0] == '2016-05-01':
+                # Let the second window complete first
+                first_window_done.wait(1)
+            else:
+                first_window_done.set()
+            return dict((d, {'service': d}) for d in dates)
+
+        self.cloud_health._get_cost_history_window = MagicMock(side_effect=get_cost_history_window)
+
+        rows = list(self.cloud_health.cost_history_range(
+            date(2016, 5, 1), date(2016, 5, 5), Interval.daily, chunk=2, max_workers=2,
+        ))
+
+        self.assertEqual(['2016-05-01', '2016-05-02', '2016-05-03', '2016-05-04', '2016-05-05'], [d for d, _ in rows])
+        self.assertEqual({'service': '2016-05-03'}, rows[2][1])
+        self.assertEqual(3, self.cloud_health._get_cost_history_window.call_count)
+
+    def test_get_cost_history_window(self):
+        """
+        Cloud Health Test: Get cost history window method selects all the dates of the window in one API call.
+        """
+        self.cloud_health._get_api_call = MagicMock(return_value=CloudHealthTest.API_CALL)
+        self.cloud_health._get_data = MagicMock()
+
+        self.cloud_health._get_cost_history_window(Interval.daily, ['2016-05-01', '2016-05-02'])
+
+        self.cloud_health._get_api_call.assert_called_once_with(
+            CloudHealthTest.COST_HISTORY_REPORT,
+            CloudHealthTest.API_KEY,
+            {'interval': 'daily', 'filters[]': 'time:select:2016-05-01,2016-05-02'},
+        )
+        self.cloud_health._get_data.assert_called_once_with(CloudHealthTest.API_CALL, 'time')
+
     def test_cost_current(self):
         """
         Cloud Health Test: Cost current method properly passes in arguments to Get API call method.
@@ -173,6 +314,7 @@ class CloudHealthTest(unittest.TestCase):
         self.cloud_health._get_api_call.assert_called_once_with(
             CloudHealthTest.COST_CURRENT_REPORT,
             CloudHealthTest.API_KEY,
+            {},
         )
         self.cloud_health._get_data.assert_called_once_with(
             CloudHealthTest.API_CALL,
@@ -219,31 +361,127 @@ class CloudHealthTest(unittest.TestCase):
             CloudHealthTest.API_CALL, category_name=category, exclude_summary=False
         )
 
+    def test_get_custom_report_time_select(self):
+        """
+        Cloud Health Test: Custom report method asks the API for the selected dates only.
+        """
+        self.cloud_health._get_api_call = MagicMock(return_value=CloudHealthTest.API_CALL)
+        self.cloud_health._get_data = MagicMock()
+
+        self.cloud_health.get_custom_report(
+            report_id=CloudHealthTest.REPORT_ID, time_select=['2016-05-01', '2016-05-02'],
+        )
+
+        self.cloud_health._get_api_call.assert_called_once_with(
+            CloudHealthTest.CUSTOM_REPORT_TEMPLATE.format(report_id=CloudHealthTest.REPORT_ID),
+            CloudHealthTest.API_KEY,
+            {'interval': Interval.hourly.name, 'filters[]': 'time:select:2016-05-01,2016-05-02'}
+        )
+
+    def test_get_custom_report_query(self):
+        """
+        Cloud Health Test: Custom report method sends the filters, dimensions and measures of the query along with
+        the selected dates.
+        """
+        self.cloud_health._get_api_call = MagicMock(return_value=CloudHealthTest.API_CALL)
+        self.cloud_health._get_data = MagicMock()
+
+        query = Query().select('AWS-Account', '1234').add_measures('cost')
+        self.cloud_health.get_custom_report(
+            report_id=CloudHealthTest.REPORT_ID, time_select=['2016-05-01'], query=query,
+        )
+
+        self.cloud_health._get_api_call.assert_called_once_with(
+            CloudHealthTest.CUSTOM_REPORT_TEMPLATE.format(report_id=CloudHealthTest.REPORT_ID),
+            CloudHealthTest.API_KEY,
+            {
+                'interval': Interval.hourly.name,
+                'filters[]': ['time:select:2016-05-01', 'AWS-Account:select:1234'],
+                'measures[]': ['cost'],
+            }
+        )
+
+    def test_cost_current_query(self):
+        """
+        Cloud Health Test: Cost current method sends the parameters of the query
+        """
+        self.cloud_health._get_api_call = MagicMock(return_value=CloudHealthTest.API_CALL)
+        self.cloud_health._get_data = MagicMock()
+
+        self.cloud_health.cost_current(query=Query().reject('AWS-Account', ['1234', '5678']))
+
+        self.cloud_health._get_api_call.assert_called_once_with(
+            CloudHealthTest.COST_CURRENT_REPORT,
+            CloudHealthTest.API_KEY,
+            {'filters[]': ['AWS-Account:reject:1234,5678']},
+        )
+
+    def test_get_custom_reports(self):
+        """
+        Cloud Health Test: Get custom reports method retrieves every report and yields its data with its ID.
+        """
+        self.cloud_health.get_custom_report = MagicMock(side_effect=lambda report_id, **kwargs: {'id': report_id})
+        report_ids = range(20)
+
+        reports = dict(self.cloud_health.get_custom_reports(
+            report_ids, category='category', time_interval=Interval.daily, max_workers=4,
+        ))
+
+        self.assertEqual(dict((report_id, {'id': report_id}) for report_id in report_ids), reports)
+        self.cloud_health.get_custom_report.assert_any_call(
+            report_id=0, category='category', time_interval=Interval.daily, time_select=None, query=None,
+        )
+
+    def test_get_custom_reports_error(self):
+        """
+        Cloud Health Test: Get custom reports method raises the error of a failed report by default.
+        """
+        self.cloud_health.get_custom_report = MagicMock(side_effect=ValueError('Error message'))
+
+        with self.assertRaises(ValueError):
+            list(self.cloud_health.get_custom_reports([CloudHealthTest.REPORT_ID]))
+
+    def test_get_custom_reports_return_exceptions(self):
+        """
+        Cloud Health Test: Get custom reports method yields the error of a failed report with return_exceptions.
+        """
+        error = ValueError('Error message')
+        self.cloud_health.get_custom_report = MagicMock(side_effect=error)
+
+        reports = list(self.cloud_health.get_custom_reports([CloudHealthTest.REPORT_ID], return_exceptions=True))
+
+        self.assertEqual([(CloudHealthTest.REPORT_ID, error)], reports)
+
     @patch('krux_cloud_health.cloud_health.pprint.pformat')
-    @patch('krux_cloud_health.cloud_health.requests')
-    def test_get_api_call(self, mock_request, mock_pprint):
+    def test_get_api_call(self, mock_pprint):
         """
         Cloud Health Test: Get API call method calls API with valid report and API key.
         """
         self.cloud_health.logger = MagicMock()
-        mock_request.get.return_value.json.return_value = CloudHealthTest.API_CALL
+        self.cloud_health._session = MagicMock()
+        self.cloud_health._session.get.return_value = CloudHealthTest._get_response(json=CloudHealthTest.API_CALL)
 
         get_api_call = self.cloud_health._get_api_call(CloudHealthTest.COST_HISTORY_REPORT, CloudHealthTest.API_KEY)
 
-        mock_request.get.assert_called_once_with(
+        self.cloud_health._session.get.assert_called_once_with(
             CloudHealthTest.COST_HISTORY_URI,
             params=CloudHealthTest.URI_ARGS_NO_PARAMS,
+            headers={},
+            timeout=CloudHealthTest.TIMEOUT,
+            stream=False,
         )
         mock_pprint.assert_called_once_with(CloudHealthTest.API_CALL)
         self.cloud_health.logger.debug.assert_called_once_with(mock_pprint(CloudHealthTest.API_CALL))
         self.assertEqual(get_api_call, CloudHealthTest.API_CALL)
 
-    @patch('krux_cloud_health.cloud_health.requests')
-    def test_get_api_call_error(self, mock_request):
+    def test_get_api_call_error(self):
         """
         Cloud Health Test: Get API call method throws ValueError if API returns an error.
         """
-        mock_request.get.return_value.json.return_value = CloudHealthTest.API_CALL_ERROR
+        self.cloud_health._session = MagicMock()
+        self.cloud_health._session.get.return_value = CloudHealthTest._get_response(
+            json=CloudHealthTest.API_CALL_ERROR,
+        )
         self.cloud_health.logger = MagicMock()
 
         with self.assertRaises(ValueError) as ve:
@@ -253,6 +491,439 @@ class CloudHealthTest(unittest.TestCase):
             )
         self.assertEqual(ve.exception.message, CloudHealthTest.API_CALL_ERROR.get('error'))
 
+    @patch('krux_cloud_health.cloud_health.pprint.pformat')
+    def test_get_api_call_no_debug(self, mock_pprint):
+        """
+        Cloud Health Test: Get API call method does not format the API call when debug logging is disabled.
+        """
+        self.cloud_health.logger = MagicMock()
+        self.cloud_health.logger.isEnabledFor.return_value = False
+        self.cloud_health._session = MagicMock()
+        self.cloud_health._session.get.return_value = CloudHealthTest._get_response(json=CloudHealthTest.API_CALL)
+
+        self.cloud_health._get_api_call(CloudHealthTest.COST_HISTORY_REPORT, CloudHealthTest.API_KEY)
+
+        self.assertFalse(mock_pprint.called)
+        self.assertFalse(self.cloud_health.logger.debug.called)
+
+    def test_get_api_call_stats(self):
+        """
+        Cloud Health Test: Get API call method times the request and the decoding, and counts the bytes received.
+        """
+        self.cloud_health.stats = MagicMock()
+        self.cloud_health._session = MagicMock()
+        response = CloudHealthTest._get_response(json=CloudHealthTest.API_CALL)
+        response.content = b'{"api_call": "return"}'
+        self.cloud_health._session.get.return_value = response
+
+        self.cloud_health._get_api_call(
+            CloudHealthTest.COST_HISTORY_REPORT, CloudHealthTest.API_KEY, CloudHealthTest.PARAMS_INTERVAL,
+        )
+
+        self.assertEqual('cost.history.daily.http.latency', self.cloud_health.stats.timing.call_args[0][0])
+        self.cloud_health.stats.incr.assert_any_call('cost.history.daily.http.200')
+        self.cloud_health.stats.incr.assert_any_call('cost.history.daily.bytes', len(response.content))
+        self.cloud_health.stats.timer.assert_called_once_with('cost.history.daily.json')
+
+    def test_get_report_data_stats(self):
+        """
+        Cloud Health Test: Get report data method times the parsing and counts the cells parsed.
+        """
+        self.cloud_health.stats = MagicMock()
+
+        get_data = self.cloud_health._get_report_data(
+            CloudHealthTest.CUSTOM_REPORT_TEMPLATE.format(report_id=CloudHealthTest.REPORT_ID),
+            {'interval': 'hourly'},
+            CloudHealthTest.GET_DATA_API_CALL,
+        )
+
+        self.assertEqual(CloudHealthTest.GET_DATA_RV, get_data)
+        stat_prefix = 'custom.{0}.hourly.'.format(CloudHealthTest.REPORT_ID)
+        self.cloud_health.stats.timer.assert_called_once_with(stat_prefix + 'parse')
+        self.cloud_health.stats.incr.assert_called_once_with(stat_prefix + 'cells', 4)
+
+    def test_get_stat_name(self):
+        """
+        Cloud Health Test: The names of the stats encode the report and the interval.
+        """
+        self.assertEqual(
+            'cost.history.daily.parse',
+            self.cloud_health._get_stat_name(CloudHealthTest.COST_HISTORY_REPORT, {'interval': 'daily'}, 'parse'),
+        )
+        self.assertEqual(
+            'cost.current.none.parse',
+            self.cloud_health._get_stat_name('/' + CloudHealthTest.COST_CURRENT_REPORT, {}, 'parse'),
+        )
+
+    def test_iter_custom_report(self):
+        """
+        Cloud Health Test: Iter custom report method parses the response as it is downloaded.
+        """
+        body = json.dumps(CloudHealthTest.GET_DATA_API_CALL).encode('utf-8')
+        response = CloudHealthTest._get_response()
+        response.iter_content.return_value = [body[i:i + 16] for i in range(0, len(body), 16)]
+        self.cloud_health._get_response = MagicMock(return_value=response)
+
+        rows = list(self.cloud_health.iter_custom_report(CloudHealthTest.REPORT_ID, time_interval=Interval.daily))
+
+        self.assertEqual(
+            [
+                ('date1', {'service1': 1, 'service2': 2.25, 'service3': None}),
+                ('date2', {'service1': 3, 'service2': 4.11, 'service3': None}),
+            ],
+            rows,
+        )
+        args, kwargs = self.cloud_health._get_response.call_args
+        self.assertEqual(
+            '{}olap_reports/custom/{}'.format(CloudHealthTest.API_ENDPOINT, CloudHealthTest.REPORT_ID), args[0],
+        )
+        self.assertEqual({'api_key': CloudHealthTest.API_KEY, 'interval': 'daily'}, args[1])
+        self.assertTrue(kwargs['stream'])
+        response.close.assert_called_once_with()
+
+    def test_iter_cost_history_time_input(self):
+        """
+        Cloud Health Test: Iter cost history method only yields the requested category without the summaries.
+        """
+        response = CloudHealthTest._get_response()
+        response.iter_content.return_value = [json.dumps(CloudHealthTest.GET_DATA_API_CALL).encode('utf-8')]
+        self.cloud_health._get_response = MagicMock(return_value=response)
+
+        rows = list(self.cloud_health.iter_cost_history(CloudHealthTest.TIME_INTERVAL, 'date2'))
+
+        self.assertEqual([('date2', CloudHealthTest.GET_DATA_RV['date2'])], rows)
+        self.assertEqual(
+            'time:select:date2',
+            self.cloud_health._get_response.call_args[0][1]['filters[]'],
+        )
+
+    def test_iter_cost_history_time_pattern(self):
+        """
+        Cloud Health Test: Iter cost history method yields the categories matching a pattern without filtering the
+        report in the API.
+        """
+        response = CloudHealthTest._get_response()
+        response.iter_content.return_value = [json.dumps(CloudHealthTest.GET_DATA_API_CALL).encode('utf-8')]
+        self.cloud_health._get_response = MagicMock(return_value=response)
+
+        rows = list(self.cloud_health.iter_cost_history(CloudHealthTest.TIME_INTERVAL, 'date*'))
+
+        self.assertEqual(sorted(CloudHealthTest.GET_DATA_RV.items()), sorted(rows))
+        self.assertNotIn('filters[]', self.cloud_health._get_response.call_args[0][1])
+
+    def test_iter_records(self):
+        """
+        Cloud Health Test: Iter records method walks the pages of an endpoint and reports their total
+        """
+        self.cloud_health._get_response = MagicMock(side_effect=[
+            CloudHealthTest._get_response(json={'assets': [1, 2]}, headers={'X-Total-Count': '3'}),
+            CloudHealthTest._get_response(json={'assets': [3]}, headers={'X-Total-Count': '3'}),
+        ])
+
+        records = self.cloud_health.iter_records('api/search', {'name': 'AwsAsset'}, records_key='assets', per_page=2)
+
+        self.assertEqual(3, records.total)
+        self.assertEqual([1, 2, 3], list(records))
+        self.assertEqual(
+            {'api_key': CloudHealthTest.API_KEY, 'name': 'AwsAsset', 'page': 2, 'per_page': 2},
+            self.cloud_health._get_response.call_args[0][1],
+        )
+
+    def test_iter_records_error(self):
+        """
+        Cloud Health Test: Iter records method raises the error returned by the API
+        """
+        self.cloud_health._get_response = MagicMock(
+            return_value=CloudHealthTest._get_response(json={'error': 'Error message'}),
+        )
+
+        self.assertRaises(ValueError, list, self.cloud_health.iter_records('api/search'))
+
+    def test_list_reports(self):
+        """
+        Cloud Health Test: List reports method caches the list of the reports for the metadata TTL
+        """
+        reports = [{'id': 1234, 'name': 'EC2'}, {'id': 5678, 'name': 'S3'}]
+        self.cloud_health._get_api_call = MagicMock(return_value={'reports': reports})
+
+        self.assertEqual(reports, self.cloud_health.list_reports())
+        self.cloud_health._get_api_call.assert_called_once_with(
+            'olap_reports/custom', CloudHealthTest.API_KEY, {}, cache_ttl=self.cloud_health.metadata_ttl,
+        )
+
+    def test_find_report(self):
+        """
+        Cloud Health Test: Find report method resolves a unique report name to its ID
+        """
+        self.cloud_health.list_reports = MagicMock(return_value=[
+            {'id': 1234, 'name': 'EC2'}, {'id': 5678, 'name': 'S3'}, {'id': 9012, 'name': 'S3'},
+        ])
+
+        self.assertEqual(1234, self.cloud_health.find_report('EC2'))
+        self.assertRaises(ValueError, self.cloud_health.find_report, 'S3')
+        self.assertRaises(ValueError, self.cloud_health.find_report, 'RDS')
+
+    def test_describe_report(self):
+        """
+        Cloud Health Test: Describe report method retrieves the dimensions of a report without its data
+        """
+        self.cloud_health._get_api_call = MagicMock(return_value=CloudHealthTest.GET_DATA_API_CALL)
+
+        metadata = self.cloud_health.describe_report(CloudHealthTest.REPORT_ID)
+
+        self.cloud_health._get_api_call.assert_called_once_with(
+            CloudHealthTest.CUSTOM_REPORT_TEMPLATE.format(report_id=CloudHealthTest.REPORT_ID) + '/new',
+            CloudHealthTest.API_KEY,
+            {},
+            cache_ttl=self.cloud_health.metadata_ttl,
+        )
+        self.assertEqual(['date1', 'date2'], metadata.dimensions['time'])
+
+    def test_get_api_call_cache_ttl(self):
+        """
+        Cloud Health Test: Get API call method uses the given TTL instead of the one of the interval.
+        """
+        self.cloud_health.logger = MagicMock()
+        self.cloud_health.cache = MagicMock()
+        self.cloud_health.cache.get.return_value = CacheEntry(
+            body=CloudHealthTest.API_CALL, stored_at=time.time() - 3600, etag=None, last_modified=None,
+        )
+        self.cloud_health._session = MagicMock()
+
+        get_api_call = self.cloud_health._get_api_call(
+            'olap_reports/custom', CloudHealthTest.API_KEY, {}, cache_ttl=24 * 60 * 60,
+        )
+
+        self.assertEqual(CloudHealthTest.API_CALL, get_api_call)
+        self.assertFalse(self.cloud_health._session.get.called)
+
+    def test_get_time_select(self):
+        """
+        Cloud Health Test: Only the exact dates are filtered by the API
+        """
+        self.assertEqual(['date1'], self.cloud_health._get_time_select('date1'))
+        self.assertEqual(['date1', 'date2'], self.cloud_health._get_time_select(('date1', 'date2')))
+        self.assertIsNone(self.cloud_health._get_time_select(['date1', 'date*']))
+        self.assertIsNone(self.cloud_health._get_time_select(None))
+
+    @patch('krux_cloud_health.cloud_health.ijson', None)
+    def test_iter_cost_current_no_ijson(self):
+        """
+        Cloud Health Test: Iter cost current method falls back to Get API call method when ijson is not installed.
+        """
+        api_call = dict(CloudHealthTest.GET_DATA_API_CALL)
+        api_call['dimensions'] = [
+            {CloudHealthTest.COST_CURRENT_CATEGORY_TYPE: api_call['dimensions'][0]['time']},
+            api_call['dimensions'][1],
+        ]
+        self.cloud_health._get_api_call = MagicMock(return_value=api_call)
+
+        rows = dict(self.cloud_health.iter_cost_current())
+
+        self.cloud_health._get_api_call.assert_called_once_with(
+            CloudHealthTest.COST_CURRENT_REPORT, CloudHealthTest.API_KEY, {},
+        )
+        self.assertEqual(CloudHealthTest.GET_DATA_RV, rows)
+
+    def test_get_api_call_cache_miss(self):
+        """
+        Cloud Health Test: Get API call method stores the response and its validators in the cache.
+        """
+        self.cloud_health.logger = MagicMock()
+        self.cloud_health.cache = MagicMock()
+        self.cloud_health.cache.get.return_value = None
+        self.cloud_health._session = MagicMock()
+        self.cloud_health._session.get.return_value = CloudHealthTest._get_response(
+            json=CloudHealthTest.API_CALL, headers={'ETag': '"etag"'},
+        )
+
+        get_api_call = self.cloud_health._get_api_call(
+            CloudHealthTest.COST_HISTORY_REPORT, CloudHealthTest.API_KEY, CloudHealthTest.PARAMS_INTERVAL,
+        )
+
+        self.assertEqual(CloudHealthTest.API_CALL, get_api_call)
+        key, entry = self.cloud_health.cache.set.call_args[0]
+        self.assertNotIn(CloudHealthTest.API_KEY, key)
+        self.assertEqual(CloudHealthTest.API_CALL, entry.body)
+        self.assertEqual('"etag"', entry.etag)
+        self.assertIsNone(entry.last_modified)
+
+    def test_get_api_call_cache_hit(self):
+        """
+        Cloud Health Test: Get API call method returns a fresh cached response without calling the API.
+        """
+        self.cloud_health.logger = MagicMock()
+        self.cloud_health.cache = MagicMock()
+        self.cloud_health.cache.get.return_value = CacheEntry(
+            body=CloudHealthTest.API_CALL, stored_at=time.time(), etag=None, last_modified=None,
+        )
+        self.cloud_health._session = MagicMock()
+
+        get_api_call = self.cloud_health._get_api_call(
+            CloudHealthTest.COST_HISTORY_REPORT, CloudHealthTest.API_KEY, CloudHealthTest.PARAMS_INTERVAL,
+        )
+
+        self.assertEqual(CloudHealthTest.API_CALL, get_api_call)
+        self.assertFalse(self.cloud_health._session.get.called)
+        self.assertFalse(self.cloud_health.cache.set.called)
+
+    def test_get_api_call_cache_revalidate(self):
+        """
+        Cloud Health Test: Get API call method revalidates an expired cached response with its validators.
+        """
+        self.cloud_health.logger = MagicMock()
+        self.cloud_health.cache = MagicMock()
+        self.cloud_health.cache.get.return_value = CacheEntry(
+            body=CloudHealthTest.API_CALL, stored_at=0, etag='"etag"', last_modified='Sun, 01 May 2016 00:00:00 GMT',
+        )
+        self.cloud_health._session = MagicMock()
+        self.cloud_health._session.get.return_value = CloudHealthTest._get_response(status_code=304)
+
+        get_api_call = self.cloud_health._get_api_call(
+            CloudHealthTest.COST_HISTORY_REPORT, CloudHealthTest.API_KEY, CloudHealthTest.PARAMS_INTERVAL,
+        )
+
+        self.assertEqual(CloudHealthTest.API_CALL, get_api_call)
+        self.assertEqual(
+            {'If-None-Match': '"etag"', 'If-Modified-Since': 'Sun, 01 May 2016 00:00:00 GMT'},
+            self.cloud_health._session.get.call_args[1]['headers'],
+        )
+        _, entry = self.cloud_health.cache.set.call_args[0]
+        self.assertGreater(entry.stored_at, 0)
+
+    def test_get_cache_ttl(self):
+        """
+        Cloud Health Test: Get cache TTL method uses the TTL of the interval of the API call.
+        """
+        cloud_health = get_cloud_health(args=CloudHealthTest._get_args('--no-cache'))
+        cloud_health.cache_ttl[Interval.daily] = 123
+        cloud_health.cache_ttl[None] = 456
+
+        self.assertEqual(123, cloud_health._get_cache_ttl(CloudHealthTest.PARAMS_INTERVAL))
+        self.assertEqual(456, cloud_health._get_cache_ttl({}))
+
+    def test_session_pool_size(self):
+        """
+        Cloud Health Test: The session keeps as many connections alive as requested by --pool-size.
+        """
+        cloud_health = get_cloud_health(args=CloudHealthTest._get_args('--pool-size', '25', '--no-cache'))
+
+        adapter = cloud_health._session.get_adapter(CloudHealthTest.COST_HISTORY_URI)
+        self.assertEqual(25, adapter._pool_maxsize)
+
+    @patch('krux_cloud_health.cloud_health.time.sleep')
+    def test_get_response_retry_status(self, mock_sleep):
+        """
+        Cloud Health Test: Get response method retries throttled and failed responses with a backoff.
+        """
+        self.cloud_health.logger = MagicMock()
+        self.cloud_health._session = MagicMock()
+        self.cloud_health._session.get.side_effect = [
+            CloudHealthTest._get_response(status_code=503),
+            CloudHealthTest._get_response(status_code=429),
+            CloudHealthTest._get_response(json=CloudHealthTest.API_CALL),
+        ]
+
+        response = self.cloud_health._get_response(
+            CloudHealthTest.COST_HISTORY_URI, CloudHealthTest.URI_ARGS_NO_PARAMS
+        )
+
+        self.assertEqual(CloudHealthTest.API_CALL, response.json())
+        self.assertEqual(3, self.cloud_health._session.get.call_count)
+        self.assertEqual(2, mock_sleep.call_count)
+        self.assertEqual(2, self.cloud_health.logger.warning.call_count)
+
+    @patch('krux_cloud_health.cloud_health.time.sleep')
+    def test_get_response_rate_limiter(self, mock_sleep):
+        """
+        Cloud Health Test: Get response method takes a token from the rate limiter before each attempt.
+        """
+        self.cloud_health.logger = MagicMock()
+        self.cloud_health.rate_limiter = MagicMock()
+        self.cloud_health._session = MagicMock()
+        self.cloud_health._session.get.side_effect = [
+            CloudHealthTest._get_response(status_code=429),
+            CloudHealthTest._get_response(json=CloudHealthTest.API_CALL),
+        ]
+
+        self.cloud_health._get_response(CloudHealthTest.COST_HISTORY_URI, CloudHealthTest.URI_ARGS_NO_PARAMS)
+
+        self.assertEqual(2, self.cloud_health.rate_limiter.acquire.call_count)
+
+    @patch('krux_cloud_health.cloud_health.time.sleep')
+    def test_get_response_retry_after(self, mock_sleep):
+        """
+        Cloud Health Test: Get response method waits for the delay requested by the Retry-After header.
+        """
+        self.cloud_health.logger = MagicMock()
+        self.cloud_health._session = MagicMock()
+        self.cloud_health._session.get.side_effect = [
+            CloudHealthTest._get_response(status_code=429, headers={'Retry-After': '7'}),
+            CloudHealthTest._get_response(json=CloudHealthTest.API_CALL),
+        ]
+
+        self.cloud_health._get_response(CloudHealthTest.COST_HISTORY_URI, CloudHealthTest.URI_ARGS_NO_PARAMS)
+
+        mock_sleep.assert_called_once_with(7.0)
+
+    @patch('krux_cloud_health.cloud_health.time.sleep')
+    def test_get_response_retry_after_max(self, mock_sleep):
+        """
+        Cloud Health Test: Get response method waits at most backoff_max, even if Retry-After requests longer.
+        """
+        self.cloud_health.logger = MagicMock()
+        self.cloud_health._session = MagicMock()
+        self.cloud_health._session.get.side_effect = [
+            CloudHealthTest._get_response(status_code=429, headers={'Retry-After': '3600'}),
+            CloudHealthTest._get_response(json=CloudHealthTest.API_CALL),
+        ]
+
+        self.cloud_health._get_response(CloudHealthTest.COST_HISTORY_URI, CloudHealthTest.URI_ARGS_NO_PARAMS)
+
+        mock_sleep.assert_called_once_with(self.cloud_health.backoff_max)
+
+    @patch('krux_cloud_health.cloud_health.time.sleep')
+    def test_get_response_retries_exhausted(self, mock_sleep):
+        """
+        Cloud Health Test: Get response method returns the last response once the retries are exhausted.
+        """
+        self.cloud_health.logger = MagicMock()
+        self.cloud_health._session = MagicMock()
+        self.cloud_health._session.get.return_value = CloudHealthTest._get_response(status_code=503)
+
+        response = self.cloud_health._get_response(
+            CloudHealthTest.COST_HISTORY_URI, CloudHealthTest.URI_ARGS_NO_PARAMS
+        )
+
+        self.assertEqual(503, response.status_code)
+        self.assertEqual(self.cloud_health.max_retries + 1, self.cloud_health._session.get.call_count)
+        self.assertEqual(self.cloud_health.max_retries, mock_sleep.call_count)
+
+    @patch('krux_cloud_health.cloud_health.time.sleep')
+    def test_get_response_connection_error(self, mock_sleep):
+        """
+        Cloud Health Test: Get response method re-raises connection errors once the retries are exhausted.
+        """
+        self.cloud_health.logger = MagicMock()
+        self.cloud_health._session = MagicMock()
+        self.cloud_health._session.get.side_effect = requests.ConnectionError('Connection refused')
+
+        with self.assertRaises(requests.ConnectionError):
+            self.cloud_health._get_response(CloudHealthTest.COST_HISTORY_URI, CloudHealthTest.URI_ARGS_NO_PARAMS)
+
+        self.assertEqual(self.cloud_health.max_retries + 1, self.cloud_health._session.get.call_count)
+
+    def test_get_backoff(self):
+        """
+        Cloud Health Test: Get backoff method doubles the delay on each attempt and caps it at backoff_max.
+        """
+        for attempt in range(10):
+            delay = min(self.cloud_health.backoff_max, self.cloud_health.backoff_factor * (2 ** attempt))
+            backoff = self.cloud_health._get_backoff(attempt)
+
+            self.assertGreaterEqual(backoff, delay / 2)
+            self.assertLessEqual(backoff, delay)
+
     def test_get_data(self):
         """
         Cloud Health Test: Get Data method correctly gets category and service information from API call. It then
@@ -275,6 +946,20 @@ class CloudHealthTest(unittest.TestCase):
         )
         self.assertEqual(get_data, CloudHealthTest.GET_DATA_INFO_RV)
 
+    def test_get_data_cost_report(self):
+        """
+        Cloud Health Test: Get Data method returns a CostReport with indexed lookups of the values.
+        """
+        get_data = self.cloud_health._get_data(
+            CloudHealthTest.GET_DATA_API_CALL,
+            CloudHealthTest.COST_HISTORY_CATEGORY_TYPE,
+        )
+
+        self.assertIsInstance(get_data, CostReport)
+        self.assertEqual(4.11, get_data.get_value('date2', 'service2'))
+        self.assertIsNone(get_data.get_value('date2', 'service3'))
+        self.assertEqual(CloudHealthTest.GET_DATA_RV, get_data.to_dict())
+
     def test_get_data_info(self):
         """
         Cloud Health Test: Get Data Info method organizes information for inputted category and
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+#
+# © 2016-2018 Salesforce.com, inc.
+#
+
+#
+# Standard libraries
+#
+
+from __future__ import absolute_import
+import unittest
+
+#
+# Internal libraries
+#
+
+from krux_cloud_health.delta import Change, compute_delta, numpy
+from krux_cloud_health.report import CostReport
+
+
+@unittest.skipIf(numpy is None, 'numpy is not installed')
+class DeltaTest(unittest.TestCase):
+
+    PARENTS = {'ec2': 'compute', 'lambda': 'compute', 's3': 'storage'}
+
+    def setUp(self):
+        nan = float('nan')
+        self.before = CostReport(
+            categories=['account1', 'account2'],
+            services=['ec2', 'lambda', 's3'],
+            values=numpy.array([[100.0, 10.0, 50.0], [20.0, nan, 5.0]]),
+            parents=DeltaTest.PARENTS,
+        )
+        self.after = CostReport(
+            categories=['account1', 'account3'],
+            services=['ec2', 'lambda', 's3'],
+            values=numpy.array([[150.0, 10.0, 40.0], [1.0, nan, nan]]),
+            parents=DeltaTest.PARENTS,
+        )
+        self.delta = compute_delta(self.before, self.after)
+
+    def test_compute_delta(self):
+        """
+        Delta Test: The snapshots are aligned on the union of their categories
+        """
+        self.assertEqual(['account1', 'account3', 'account2'], self.delta.categories)
+        self.assertEqual(Change('account1', 'ec2', 100.0, 150.0, 50.0, 50.0), self.delta.get_change('account1', 'ec2'))
+        self.assertEqual(Change('account2', 'ec2', 20.0, None, -20.0, -100.0), self.delta.get_change('account2', 'ec2'))
+        self.assertEqual(Change('account3', 'ec2', None, 1.0, 1.0, None), self.delta.get_change('account3', 'ec2'))
+        self.assertEqual(
+            Change('account3', 'lambda', None, None, None, None), self.delta.get_change('account3', 'lambda'),
+        )
+
+    def test_top_movers(self):
+        """
+        Delta Test: The costs that moved the most in either direction come first
+        """
+        self.assertEqual(
+            [('account1', 'ec2'), ('account2', 'ec2')],
+            [(change.category, change.service) for change in self.delta.top_movers(2)],
+        )
+        self.assertEqual(
+            [('account2', 'ec2'), ('account2', 's3'), ('account1', 'ec2')],
+            [(change.category, change.service) for change in self.delta.top_movers(3, by='percent')],
+        )
+        self.assertRaises(ValueError, self.delta.top_movers, 3, 'services')
+
+    def test_rollup(self):
+        """
+        Delta Test: The services are summed into their parent
+        """
+        rollup = self.delta.rollup()
+
+        self.assertEqual(['compute', 'storage'], rollup.services)
+        self.assertEqual(
+            Change('account1', 'compute', 110.0, 160.0, 50.0, 50.0 / 110.0 * 100),
+            rollup.get_change('account1', 'compute'),
+        )
+        self.assertEqual(
+            Change('account3', 'storage', None, None, None, None), rollup.get_change('account3', 'storage'),
+        )
+
+    def test_total(self):
+        """
+        Delta Test: The total of each category sums all its services
+        """
+        total = self.delta.total()
+
+        self.assertEqual(Change('account1', 'Total', 160.0, 200.0, 40.0, 25.0), total.get_change('account1', 'Total'))
+        self.assertEqual(Change('account2', 'Total', 25.0, None, -25.0, -100.0), total.get_change('account2', 'Total'))
+
+    def test_summary_services(self):
+        """
+        Delta Test: The costs reported for a service and its children are not counted twice
+        """
+        parents = {'ec2-compute': 'ec2', 'ec2-storage': 'ec2'}
+        before = CostReport(
+            categories=['account1'],
+            services=['ec2', 'ec2-compute', 'ec2-storage', 's3'],
+            values=numpy.array([[10.0, 6.0, 4.0, 5.0]]),
+            parents=parents,
+        )
+        after = CostReport(
+            categories=['account1'],
+            services=['ec2', 'ec2-compute', 'ec2-storage', 's3'],
+            values=numpy.array([[20.0, 12.0, 8.0, 5.0]]),
+            parents=parents,
+        )
+        delta = compute_delta(before, after)
+
+        self.assertEqual(
+            Change('account1', 'Total', 15.0, 25.0, 10.0, 10.0 / 15.0 * 100),
+            delta.total().get_change('account1', 'Total'),
+        )
+
+        rollup = delta.rollup()
+        self.assertEqual(['ec2', 's3'], rollup.services)
+        self.assertEqual(Change('account1', 'ec2', 10.0, 20.0, 10.0, 100.0), rollup.get_change('account1', 'ec2'))
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+#
+# © 2016-2018 Salesforce.com, inc.
+#
+
+#
+# Standard libraries
+#
+
+from __future__ import absolute_import
+import os
+import shutil
+import tempfile
+import unittest
+
+#
+# Internal libraries
+#
+
+from krux_cloud_health.files import atomic_write, makedirs
+
+
+class FilesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, 'state', 'file.json')
+
+    def test_makedirs(self):
+        """
+        Files Test: The directory and its parents are created, and an existing directory is kept
+        """
+        directory = os.path.join(self.directory, 'parent', 'child')
+
+        makedirs(directory)
+        makedirs(directory)
+
+        self.assertTrue(os.path.isdir(directory))
+
+    def test_atomic_write(self):
+        """
+        Files Test: The file is replaced once the block completes and no temporary file is left behind
+        """
+        with atomic_write(self.path) as temp_path:
+            with open(temp_path, 'w') as f:
+                f.write('old')
+        with atomic_write(self.path) as temp_path:
+            with open(temp_path, 'w') as f:
+                f.write('new')
+
+            with open(self.path) as f:
+                self.assertEqual('old', f.read())
+
+        with open(self.path) as f:
+            self.assertEqual('new', f.read())
+        self.assertEqual(['file.json'], os.listdir(os.path.dirname(self.path)))
+
+    def test_atomic_write_error(self):
+        """
+        Files Test: The file is kept and the temporary file is removed when the block fails
+        """
+        with atomic_write(self.path) as temp_path:
+            with open(temp_path, 'w') as f:
+                f.write('old')
+
+        with self.assertRaises(ValueError):
+            with atomic_write(self.path) as temp_path:
+                with open(temp_path, 'w') as f:
+                    f.write('partial')
+                raise ValueError()
+
+        with open(self.path) as f:
+            self.assertEqual('old', f.read())
+        self.assertEqual(['file.json'], os.listdir(os.path.dirname(self.path)))
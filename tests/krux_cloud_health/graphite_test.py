@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+#
+# © 2016-2018 Salesforce.com, inc.
+#
+
+#
+# Standard libraries
+#
+
+from __future__ import absolute_import
+from datetime import datetime
+import calendar
+import os
+import shutil
+import socket
+import struct
+import tempfile
+import threading
+import unittest
+from StringIO import StringIO
+
+#
+# Third party libraries
+#
+
+from mock import MagicMock, patch
+from six.moves import cPickle as pickle
+
+#
+# Internal libraries
+#
+
+from krux.cli import get_parser
+from krux_cloud_health.graphite import (
+    add_graphite_cli_arguments,
+    get_graphite_sender,
+    MetricPathBuilder,
+    PickleSender,
+    PlaintextSender,
+    StdoutSender,
+    TimestampParser,
+)
+
+
+class CarbonServer(object):
+    """
+    Carbon stand-in that records everything it receives.
+    """
+
+    def __init__(self):
+        self.received = b''
+        self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server.bind(('127.0.0.1', 0))
+        self._server.listen(1)
+        self.port = self._server.getsockname()[1]
+        self.connections = 0
+        self._thread = threading.Thread(target=self._serve)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _serve(self):
+        while True:
+            try:
+                connection, _ = self._server.accept()
+            except socket.error:
+                return
+            self.connections += 1
+            while True:
+                data = connection.recv(4096)
+                if not data:
+                    break
+                self.received += data
+            connection.close()
+
+    def close(self):
+        self._server.close()
+
+
+class GraphiteTest(unittest.TestCase):
+
+    DATAPOINTS = [
+        ('cloud_health.dev.report.service1', 1.5, 1462060800),
+        ('cloud_health.dev.report.service2', 2, 1462064400),
+        ('cloud_health.dev.report.service3', 0.25, 1462068000),
+    ]
+    PLAINTEXT = (
+        b'cloud_health.dev.report.service1 1.5 1462060800\n'
+        b'cloud_health.dev.report.service2 2 1462064400\n'
+        b'cloud_health.dev.report.service3 0.25 1462068000\n'
+    )
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.spool_file = os.path.join(self.directory, 'spool')
+        self.logger = MagicMock()
+
+    def _get_closed_port(self):
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.bind(('127.0.0.1', 0))
+        port = server.getsockname()[1]
+        server.close()
+        return port
+
+    def _wait_for(self, server, size):
+        for _ in range(100):
+            if len(server.received) >= size:
+                return
+            threading.Event().wait(0.01)
+
+    def test_metric_path_builder(self):
+        """
+        Graphite Test: The names of the metrics are sanitized and appended to the prefix
+        """
+        builder = MetricPathBuilder('cloud_health.dev.report')
+
+        self.assertEqual('cloud_health.dev.report.EC2_-_Compute', builder.get_path('EC2 - Compute'))
+        self.assertEqual('cloud_health.dev.report.S3_Storage', builder.get_path('S3. Storage'))
+        self.assertIs(builder.get_path('EC2 - Compute'), builder.get_path('EC2 - Compute'))
+
+    def test_metric_path_builder_nested(self):
+        """
+        Graphite Test: Nested paths sanitize each of their names
+        """
+        builder = MetricPathBuilder('cloud_health.dev.report')
+
+        self.assertEqual(
+            'cloud_health.dev.report.EC2_-_Compute.EC2_Instances',
+            builder.get_nested_path(['EC2 - Compute', 'EC2.Instances']),
+        )
+
+    def test_timestamp_parser(self):
+        """
+        Graphite Test: The fixed formats are parsed like strptime() does
+        """
+        dates = {
+            '%Y-%m-%d': '2016-05-01',
+            '%Y-%m-%d %H:%M': '2016-05-01 13:00',
+            '%Y-%m-%dT%H:%M:%S': '2016-05-01T13:14:15',
+            '%d/%m/%Y': '01/05/2016',
+        }
+        for date_format, date in dates.items():
+            expected = int(calendar.timegm(datetime.strptime(date, date_format).utctimetuple()))
+
+            self.assertEqual(expected, TimestampParser(date_format).parse(date))
+
+    def test_timestamp_parser_invalid(self):
+        """
+        Graphite Test: An invalid date raises a ValueError
+        """
+        parser = TimestampParser('%Y-%m-%d')
+
+        for date in ('2016-13-01', '2016-05-01 13:00', 'Total'):
+            with self.assertRaises(ValueError):
+                parser.parse(date)
+
+    def test_get_graphite_sender_stdout(self):
+        """
+        Graphite Test: Datapoints are printed to stdout by default
+        """
+        parser = get_parser(description='graphite')
+        add_graphite_cli_arguments(parser)
+
+        self.assertIsInstance(get_graphite_sender(parser.parse_args([])), StdoutSender)
+
+    def test_get_graphite_sender_pickle(self):
+        """
+        Graphite Test: The pickle sender uses the pickle port of Carbon by default
+        """
+        parser = get_parser(description='graphite')
+        add_graphite_cli_arguments(parser)
+
+        sender = get_graphite_sender(parser.parse_args([
+            '--graphite-mode', 'pickle', '--graphite-host', 'carbon', '--graphite-batch-size', '10',
+        ]))
+
+        self.assertIsInstance(sender, PickleSender)
+        self.assertEqual(('carbon', 2004, 10), (sender.host, sender.port, sender.batch_size))
+
+    @patch('sys.stdout', new_callable=StringIO)
+    def test_stdout_sender(self, mock_stdout):
+        """
+        Graphite Test: The stdout sender prints each datapoint in the plaintext format
+        """
+        with StdoutSender() as sender:
+            for datapoint in GraphiteTest.DATAPOINTS:
+                sender.send(*datapoint)
+
+        self.assertEqual(GraphiteTest.PLAINTEXT.decode('utf-8'), mock_stdout.getvalue())
+
+    def test_plaintext_sender(self):
+        """
+        Graphite Test: The plaintext sender sends all the batches over a single connection
+        """
+        server = CarbonServer()
+        self.addCleanup(server.close)
+
+        with PlaintextSender('127.0.0.1', server.port, batch_size=2, logger=self.logger) as sender:
+            for datapoint in GraphiteTest.DATAPOINTS:
+                sender.send(*datapoint)
+
+        self._wait_for(server, len(GraphiteTest.PLAINTEXT))
+        self.assertEqual(GraphiteTest.PLAINTEXT, server.received)
+        self.assertEqual(1, server.connections)
+
+    def test_pickle_sender(self):
+        """
+        Graphite Test: The pickle sender sends length-prefixed pickled batches
+        """
+        server = CarbonServer()
+        self.addCleanup(server.close)
+
+        with PickleSender('127.0.0.1', server.port, logger=self.logger) as sender:
+            for datapoint in GraphiteTest.DATAPOINTS:
+                sender.send(*datapoint)
+
+        self._wait_for(server, 4)
+        length, = struct.unpack('!L', server.received[:4])
+        self._wait_for(server, 4 + length)
+        self.assertEqual(
+            [(path, (timestamp, float(value))) for path, value, timestamp in GraphiteTest.DATAPOINTS],
+            pickle.loads(server.received[4:4 + length]),
+        )
+
+    def test_socket_sender_unreachable(self):
+        """
+        Graphite Test: An error is raised when Carbon is unreachable and there is no spool file
+        """
+        sender = PlaintextSender('127.0.0.1', self._get_closed_port(), logger=self.logger)
+        sender.send(*GraphiteTest.DATAPOINTS[0])
+
+        with self.assertRaises(socket.error):
+            sender.flush()
+
+    def test_socket_sender_spool(self):
+        """
+        Graphite Test: The datapoints are spooled while Carbon is unreachable and sent once it is back
+        """
+        sender = PlaintextSender(
+            '127.0.0.1', self._get_closed_port(), spool_file=self.spool_file, logger=self.logger,
+        )
+        for datapoint in GraphiteTest.DATAPOINTS[:2]:
+            sender.send(*datapoint)
+        sender.close()
+
+        with open(self.spool_file, 'rb') as spool:
+            self.assertEqual(b''.join(GraphiteTest.PLAINTEXT.splitlines(True)[:2]), spool.read())
+
+        server = CarbonServer()
+        self.addCleanup(server.close)
+        sender.port = server.port
+        sender.send(*GraphiteTest.DATAPOINTS[2])
+        sender.close()
+
+        self._wait_for(server, len(GraphiteTest.PLAINTEXT))
+        self.assertEqual(GraphiteTest.PLAINTEXT, server.received)
+        self.assertFalse(os.path.exists(self.spool_file))
+
+    def test_socket_sender_spool_without_datapoints(self):
+        """
+        Graphite Test: The spooled datapoints are sent even when there are no new ones
+        """
+        with open(self.spool_file, 'wb') as spool:
+            spool.write(GraphiteTest.PLAINTEXT)
+
+        server = CarbonServer()
+        self.addCleanup(server.close)
+        PlaintextSender('127.0.0.1', server.port, spool_file=self.spool_file, logger=self.logger).close()
+
+        self._wait_for(server, len(GraphiteTest.PLAINTEXT))
+        self.assertEqual(GraphiteTest.PLAINTEXT, server.received)
+        self.assertFalse(os.path.exists(self.spool_file))
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+#
+# © 2016-2018 Salesforce.com, inc.
+#
+
+#
+# Standard libraries
+#
+
+from __future__ import absolute_import
+import unittest
+
+#
+# Third party libraries
+#
+
+from mock import MagicMock
+
+#
+# Internal libraries
+#
+
+from krux_cloud_health.paging import PageIterator
+
+
+class PageIteratorTest(unittest.TestCase):
+
+    RECORDS = list(range(25))
+
+    def _get_page(self, total=None):
+        def get_page(page):
+            start = (page - 1) * 10
+            return PageIteratorTest.RECORDS[start:start + 10], total
+
+        return MagicMock(side_effect=get_page)
+
+    def test_iter(self):
+        """
+        Page Iterator Test: The records of all the pages are yielded until a page is not full
+        """
+        get_page = self._get_page()
+
+        self.assertEqual(PageIteratorTest.RECORDS, list(PageIterator(get_page, per_page=10)))
+        self.assertEqual(3, get_page.call_count)
+
+    def test_iter_total(self):
+        """
+        Page Iterator Test: The iteration stops once the total number of records is reached
+        """
+        get_page = self._get_page(total=20)
+
+        self.assertEqual(PageIteratorTest.RECORDS[:20], list(PageIterator(get_page, per_page=10, prefetch=False)))
+        self.assertEqual(2, get_page.call_count)
+
+    def test_total(self):
+        """
+        Page Iterator Test: The total is known from the first page, which the iteration then reuses
+        """
+        get_page = self._get_page(total=25)
+        pages = PageIterator(get_page, per_page=10)
+
+        self.assertEqual(25, pages.total)
+        self.assertEqual(1, get_page.call_count)
+
+        self.assertEqual(PageIteratorTest.RECORDS, list(pages))
+        self.assertEqual(3, get_page.call_count)
+
+    def test_iter_stop(self):
+        """
+        Page Iterator Test: The pages after the one being consumed are not retrieved when the caller stops early
+        """
+        get_page = self._get_page()
+        records = iter(PageIterator(get_page, per_page=10))
+
+        self.assertEqual(0, next(records))
+        records.close()
+
+        self.assertLessEqual(get_page.call_count, 2)
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+#
+# © 2016-2018 Salesforce.com, inc.
+#
+
+#
+# Standard libraries
+#
+
+from __future__ import absolute_import
+import unittest
+
+#
+# Third party libraries
+#
+
+from mock import MagicMock
+
+#
+# Internal libraries
+#
+
+from krux.cli import get_parser
+from krux_cloud_health.cloud_health import add_cloud_health_cli_arguments, Interval, NAME
+from krux_cloud_health.pool import CloudHealthPool, get_cloud_health_pool
+
+
+class CloudHealthPoolTest(unittest.TestCase):
+
+    REPORT_ID = 1234567890
+
+    def setUp(self):
+        self.clients = dict((tenant, MagicMock()) for tenant in ('tenant1', 'tenant2', 'tenant3'))
+        for tenant, client in self.clients.items():
+            client.get_custom_report.return_value = {'2016-05-01': {'service1': tenant}}
+
+        self.pool = CloudHealthPool(self.clients, max_workers=2)
+
+    def test_get_cloud_health_pool(self):
+        """
+        Cloud Health Pool Test: Each tenant gets its own client, API key and connection pool
+        """
+        parser = get_parser(description=NAME)
+        add_cloud_health_cli_arguments(parser)
+        args = parser.parse_args(['ignored', '--rate-limit', '5'])
+
+        pool = get_cloud_health_pool({'tenant1': 'key1', 'tenant2': 'key2'}, args, logger=MagicMock())
+
+        self.assertEqual(['tenant1', 'tenant2'], pool.tenants)
+        self.assertEqual('key1', pool['tenant1'].api_key)
+        self.assertEqual('key2', pool['tenant2'].api_key)
+        self.assertIsNot(pool['tenant1']._session, pool['tenant2']._session)
+        self.assertIsNot(pool['tenant1'].rate_limiter, pool['tenant2'].rate_limiter)
+        self.assertEqual('ignored', args.api_key)
+
+    def test_get_custom_report(self):
+        """
+        Cloud Health Pool Test: The report of every tenant is returned keyed by tenant
+        """
+        reports = self.pool.get_custom_report(CloudHealthPoolTest.REPORT_ID, time_interval=Interval.daily)
+
+        self.assertEqual(
+            dict((tenant, {'2016-05-01': {'service1': tenant}}) for tenant in self.clients),
+            reports,
+        )
+        self.clients['tenant1'].get_custom_report.assert_called_once_with(
+            report_id=CloudHealthPoolTest.REPORT_ID,
+            category=None,
+            time_interval=Interval.daily,
+            time_select=None,
+            query=None,
+        )
+
+    def test_map_tenants(self):
+        """
+        Cloud Health Pool Test: Only the requested tenants are called
+        """
+        results = self.pool.map(lambda cloud_health: cloud_health.cost_current(), tenants=['tenant2'])
+
+        self.assertEqual(['tenant2'], list(results))
+        self.assertFalse(self.clients['tenant1'].cost_current.called)
+
+    def test_map_error(self):
+        """
+        Cloud Health Pool Test: The error of a tenant is raised by default, or returned in place of its result
+        """
+        error = ValueError('Error message')
+        self.clients['tenant2'].cost_current.side_effect = error
+
+        self.assertRaises(ValueError, self.pool.cost_current)
+
+        results = self.pool.cost_current(return_exceptions=True)
+        self.assertIs(error, results['tenant2'])
+        self.assertEqual(self.clients['tenant1'].cost_current.return_value, results['tenant1'])
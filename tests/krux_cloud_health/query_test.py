@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+#
+# © 2016-2018 Salesforce.com, inc.
+#
+
+#
+# Standard libraries
+#
+
+from __future__ import absolute_import
+import unittest
+
+#
+# Internal libraries
+#
+
+from krux_cloud_health.query import format_filter, parse_filter, Query
+
+
+class QueryTest(unittest.TestCase):
+
+    def test_format_filter(self):
+        """
+        Query Test: Filters are formatted as dimension:operation:members
+        """
+        self.assertEqual('AWS-Account:select:1234,5678', format_filter('AWS-Account', 'select', [1234, 5678]))
+        self.assertEqual('time:reject:2016-05-01', format_filter('time', 'reject', '2016-05-01'))
+        self.assertRaises(ValueError, format_filter, 'time', 'keep', ['2016-05-01'])
+        self.assertRaises(ValueError, format_filter, 'time', 'select', [])
+
+    def test_parse_filter(self):
+        """
+        Query Test: Filters of the command line are parsed into their dimension, operation and members
+        """
+        self.assertEqual(('AWS-Account', 'select', ['1234', '5678']), parse_filter('AWS-Account:select:1234,5678'))
+        self.assertEqual(('time', 'select', ['2016-05-01T00:00']), parse_filter('time:select:2016-05-01T00:00'))
+        self.assertRaises(ValueError, parse_filter, 'AWS-Account:1234')
+        self.assertRaises(ValueError, parse_filter, 'AWS-Account:keep:1234')
+
+    def test_get_params(self):
+        """
+        Query Test: The parameters of the query are added to the ones of the API call, which are kept
+        """
+        query = Query().select('AWS-Account', ['1234']).reject('AWS-Service-Category', 'ec2-other')
+        query.add_dimensions('time', 'AWS-Service-Category').add_measures('cost')
+
+        params = {'interval': 'daily', 'filters[]': 'time:select:2016-05-01'}
+
+        self.assertEqual(
+            {
+                'interval': 'daily',
+                'filters[]': [
+                    'time:select:2016-05-01',
+                    'AWS-Account:select:1234',
+                    'AWS-Service-Category:reject:ec2-other',
+                ],
+                'dimensions[]': ['time', 'AWS-Service-Category'],
+                'measures[]': ['cost'],
+            },
+            query.get_params(params),
+        )
+        self.assertEqual('time:select:2016-05-01', params['filters[]'])
+
+    def test_empty(self):
+        """
+        Query Test: An empty query is false and adds no parameters
+        """
+        self.assertFalse(Query())
+        self.assertTrue(Query(measures=['cost']))
+        self.assertEqual({'interval': 'daily'}, Query().get_params({'interval': 'daily'}))
+        self.assertEqual(Query(filters=[('time', 'select', ['a'])]), Query().select('time', 'a'))
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+#
+# © 2016-2018 Salesforce.com, inc.
+#
+
+#
+# Standard libraries
+#
+
+from __future__ import absolute_import
+import os
+import shutil
+import tempfile
+import unittest
+
+#
+# Third party libraries
+#
+
+from mock import patch
+
+#
+# Internal libraries
+#
+
+from krux_cloud_health.rate_limit import FileTokenBucket, get_rate_limiter, TokenBucket
+
+
+class RateLimitTest(unittest.TestCase):
+
+    API_KEY = '12345'
+    NOW = 1462060800.0
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_get_rate_limiter_disabled(self):
+        """
+        Rate Limit Test: There is no limit without a positive rate
+        """
+        self.assertIsNone(get_rate_limiter(RateLimitTest.API_KEY, 0))
+        self.assertIsNone(get_rate_limiter(RateLimitTest.API_KEY, None))
+
+    def test_get_rate_limiter_shared(self):
+        """
+        Rate Limit Test: The clients of an API key share its bucket
+        """
+        bucket = get_rate_limiter(RateLimitTest.API_KEY, 5)
+
+        self.assertIsInstance(bucket, TokenBucket)
+        self.assertIs(bucket, get_rate_limiter(RateLimitTest.API_KEY, 5))
+        self.assertIsNot(bucket, get_rate_limiter('67890', 5))
+
+    def test_get_rate_limiter_directory(self):
+        """
+        Rate Limit Test: The bucket is a file without the API key in its name when a directory is given
+        """
+        bucket = get_rate_limiter(RateLimitTest.API_KEY, 5, directory=self.directory)
+
+        self.assertIsInstance(bucket, FileTokenBucket)
+        self.assertEqual(self.directory, os.path.dirname(bucket.path))
+        self.assertNotIn(RateLimitTest.API_KEY, os.path.basename(bucket.path))
+
+    @patch('krux_cloud_health.rate_limit.time')
+    def test_token_bucket(self, mock_time):
+        """
+        Rate Limit Test: The burst is served at once, then the calls are spaced at the rate
+        """
+        mock_time.time.return_value = RateLimitTest.NOW
+        bucket = TokenBucket(rate=2, capacity=2)
+
+        waits = [bucket.acquire() for _ in range(4)]
+
+        self.assertEqual([0, 0, 0.5, 1.0], waits)
+        self.assertEqual(2, mock_time.sleep.call_count)
+
+    @patch('krux_cloud_health.rate_limit.time')
+    def test_token_bucket_refill(self, mock_time):
+        """
+        Rate Limit Test: The bucket refills at the rate up to its capacity
+        """
+        mock_time.time.return_value = RateLimitTest.NOW
+        bucket = TokenBucket(rate=1, capacity=2)
+        bucket.acquire(2)
+
+        mock_time.time.return_value = RateLimitTest.NOW + 10
+
+        self.assertEqual(0, bucket.acquire(2))
+        self.assertEqual(1.0, bucket.acquire())
+
+    @patch('krux_cloud_health.rate_limit.time')
+    def test_file_token_bucket(self, mock_time):
+        """
+        Rate Limit Test: The buckets of the same file share their tokens
+        """
+        mock_time.time.return_value = RateLimitTest.NOW
+        path = os.path.join(self.directory, 'buckets', 'key.bucket')
+        first = FileTokenBucket(path, rate=1, capacity=1)
+        second = FileTokenBucket(path, rate=1, capacity=1)
+
+        self.assertEqual(0, first.acquire())
+        self.assertEqual(1.0, second.acquire())
+        self.assertEqual(2.0, first.acquire())
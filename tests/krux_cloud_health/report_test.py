@@ -0,0 +1,317 @@
+# -*- coding: utf-8 -*-
+#
+# © 2016-2018 Salesforce.com, inc.
+#
+
+#
+# Standard libraries
+#
+
+from __future__ import absolute_import
+from array import array
+import re
+import unittest
+
+#
+# Third party libraries
+#
+
+from mock import patch
+
+#
+# Internal libraries
+#
+
+from krux_cloud_health.report import (
+    CostReport,
+    get_category_matcher,
+    get_service_mask,
+    numpy,
+    parse_cost_report,
+    parse_report_metadata,
+    select_categories,
+)
+
+
+class ReportTest(unittest.TestCase):
+
+    ITEMS_LIST = [
+        {'label': 'service1', 'parent': -1},
+        {'label': 'service2', 'parent': 0},
+        {'label': 'service3', 'parent': 0},
+        {'label': 'Total'},
+    ]
+    API_CALL = {
+        'dimensions': [
+            {
+                'time': [
+                    {'label': 'date1'},
+                    {'label': 'date2'},
+                ]
+            },
+            {
+                'AWS-Service-Category': ITEMS_LIST
+            },
+        ],
+        'data': [
+            [[3.24555], [1], [2.24555], [None]],
+            [[None], [3], [4.1111], [None]],
+        ]
+    }
+    DICT_RV = {
+        'date1': {'service2': 1, 'service3': 2.25},
+        'date2': {'service2': 3, 'service3': 4.11},
+    }
+
+    def test_get_service_mask(self):
+        """
+        Report Test: The summary services and the total are excluded
+        """
+        self.assertEqual([False, True, True, False], get_service_mask(ReportTest.ITEMS_LIST))
+        self.assertEqual([True, True, True, False], get_service_mask(ReportTest.ITEMS_LIST, exclude_summary=False))
+
+    @unittest.skipIf(numpy is None, 'numpy is not installed')
+    def test_parse_cost_report(self):
+        """
+        Report Test: The data is parsed into a categories x services matrix
+        """
+        report = parse_cost_report(ReportTest.API_CALL)
+
+        self.assertEqual(['date1', 'date2'], report.categories)
+        self.assertEqual(['service2', 'service3'], report.services)
+        self.assertEqual((2, 2), report.values.shape)
+        self.assertEqual(ReportTest.DICT_RV, report.to_dict())
+
+    @unittest.skipIf(numpy is None, 'numpy is not installed')
+    def test_parse_cost_report_missing(self):
+        """
+        Report Test: Missing values are NaN in the matrix and None in the dictionaries
+        """
+        report = parse_cost_report(ReportTest.API_CALL, exclude_summary=False)
+
+        self.assertTrue(numpy.isnan(report.values[1, 0]))
+        self.assertEqual(
+            {
+                'date1': {'service1': 3.25, 'service2': 1, 'service3': 2.25},
+                'date2': {'service1': None, 'service2': 3, 'service3': 4.11},
+            },
+            report.to_dict(),
+        )
+
+    @unittest.skipIf(numpy is None, 'numpy is not installed')
+    def test_to_numpy_no_services(self):
+        """
+        Report Test: A report without services converts to an array without columns
+        """
+        for values in (array('d'), numpy.full((2, 0), numpy.nan)):
+            report = CostReport(categories=['date1', 'date2'], services=[], values=values)
+
+            self.assertEqual((2, 0), report.to_numpy().shape)
+
+    def test_parse_cost_report_category_name(self):
+        """
+        Report Test: Only the row of the requested category is kept
+        """
+        report = parse_cost_report(ReportTest.API_CALL, category_name='date2')
+
+        self.assertEqual({'date2': ReportTest.DICT_RV['date2']}, report.to_dict())
+
+    def test_select_categories(self):
+        """
+        Report Test: Categories are selected by label, list, glob pattern or regular expression, with their index
+        """
+        categories = [{'label': 'date1'}, {'label': 'date2'}, {'label': 'other'}, {'label': 'date[3]'}]
+
+        self.assertEqual([('date2', 1)], select_categories(categories, 'date2'))
+        self.assertEqual([('date1', 0), ('other', 2)], select_categories(categories, ['other', 'date1', 'missing']))
+        self.assertEqual([('date1', 0), ('date2', 1)], select_categories(categories, 'date?'))
+        self.assertEqual([('date2', 1), ('other', 2)], select_categories(categories, re.compile(r'date2|oth')))
+        self.assertEqual([('date[3]', 3)], select_categories(categories, 'date[3]'))
+        self.assertEqual(4, len(select_categories(categories)))
+
+    def test_get_category_matcher(self):
+        """
+        Report Test: The matcher selects the labels like select_categories() does
+        """
+        matches = get_category_matcher(['date1', 'other*'])
+
+        self.assertTrue(matches('date1'))
+        self.assertTrue(matches('other2'))
+        self.assertFalse(matches('date2'))
+        self.assertTrue(get_category_matcher()('date2'))
+
+    def test_parse_cost_report_category_pattern(self):
+        """
+        Report Test: The rows of the categories matching a pattern are kept
+        """
+        report = parse_cost_report(ReportTest.API_CALL, category_name='date*')
+
+        self.assertEqual(ReportTest.DICT_RV, report.to_dict())
+
+    def test_parse_report_metadata(self):
+        """
+        Report Test: The labels of the members of each dimension and of the measures are kept in order
+        """
+        api_call = dict(ReportTest.API_CALL, measures=[{'label': 'Cost ($)', 'name': 'cost'}])
+
+        metadata = parse_report_metadata('olap_reports/custom/1234', api_call)
+
+        self.assertEqual(['time', 'AWS-Service-Category'], list(metadata.dimensions))
+        self.assertEqual(['date1', 'date2'], metadata.dimensions['time'])
+        self.assertEqual(['Cost ($)'], metadata.measures)
+        self.assertEqual((2, 4), metadata.shape)
+
+    def test_rollup(self):
+        """
+        Report Test: The services are rolled up to any level of their tree, the parents summing their leaves
+        """
+        api_call = {
+            'dimensions': [
+                {'time': [{'label': 'date1'}, {'label': 'date2'}]},
+                {'AWS-Service-Category': [
+                    {'label': 'compute', 'parent': -1},
+                    {'label': 'ec2', 'parent': 0},
+                    {'label': 'ec2-instances', 'parent': 1},
+                    {'label': 'ec2-other', 'parent': 1},
+                    {'label': 'lambda', 'parent': 0},
+                    {'label': 'Total'},
+                ]},
+            ],
+            'data': [
+                [[100], [9], [1], [2], [4], [100]],
+                [[None], [None], [3], [None], [None], [None]],
+            ],
+        }
+        report = parse_cost_report(api_call)
+
+        self.assertEqual(3, report.levels)
+        self.assertEqual(('compute', 'ec2', 'ec2-other'), report.get_service_path('ec2-other'))
+        self.assertEqual({'date1': {'compute': 7}, 'date2': {'compute': 3}}, report.get_rollup(0).to_dict())
+        self.assertEqual(
+            {'date1': {'ec2': 3, 'lambda': 4}, 'date2': {'ec2': 3, 'lambda': None}},
+            report.get_rollup(1).to_dict(),
+        )
+        self.assertEqual(['ec2-instances', 'ec2-other', 'lambda'], report.get_rollup().services)
+        self.assertEqual({'date1': {'Total': 7}, 'date2': {'Total': 3}}, report.get_total().to_dict())
+        self.assertEqual(
+            ['compute', 'ec2', 'ec2-instances', 'ec2-other', 'lambda'],
+            report.get_hierarchy().services,
+        )
+
+    @patch('krux_cloud_health.report.numpy', None)
+    def test_rollup_array(self):
+        """
+        Report Test: Without numpy, the rollups are stored in a flat array of doubles
+        """
+        report = parse_cost_report(ReportTest.API_CALL, exclude_summary=False)
+
+        rollup = report.get_rollup(0)
+
+        self.assertIsInstance(rollup.values, array)
+        self.assertEqual({'date1': {'service1': 3.25}, 'date2': {'service1': 7.11}}, rollup.to_dict())
+
+    def test_parse_cost_report_no_data(self):
+        """
+        Report Test: An API call without data is parsed into an empty report
+        """
+        report = parse_cost_report({})
+
+        self.assertEqual(0, len(report))
+        self.assertEqual({}, report.to_dict())
+
+    @patch('krux_cloud_health.report.numpy', None)
+    def test_parse_cost_report_array(self):
+        """
+        Report Test: Without numpy, the values are stored in a flat array of doubles with NaN for the missing values
+        """
+        report = parse_cost_report(ReportTest.API_CALL, exclude_summary=False)
+
+        self.assertIsInstance(report.values, array)
+        self.assertEqual(6, len(report.values))
+        self.assertNotEqual(report.values[3], report.values[3])
+        self.assertIsNone(report.get_value('date2', 'service1'))
+        self.assertEqual(4.11, report.get_value('date2', 'service3'))
+
+    def test_cost_report_mapping(self):
+        """
+        Report Test: A CostReport behaves like the nested dictionaries it replaces
+        """
+        report = parse_cost_report(ReportTest.API_CALL)
+
+        self.assertEqual(ReportTest.DICT_RV, report)
+        self.assertEqual(['date1', 'date2'], list(report))
+        self.assertIn('date1', report)
+        self.assertEqual(2.25, report['date1']['service3'])
+        self.assertEqual(ReportTest.DICT_RV['date2'], dict(report['date2'].items()))
+        self.assertRaises(KeyError, lambda: report['date3'])
+        self.assertRaises(KeyError, lambda: report['date1']['service1'])
+
+    def test_cost_report_delete(self):
+        """
+        Report Test: Categories can be removed from a CostReport
+        """
+        report = parse_cost_report(ReportTest.API_CALL)
+
+        del report['date1']
+
+        self.assertEqual(1, len(report))
+        self.assertNotIn('date1', report)
+        self.assertEqual({'date2': ReportTest.DICT_RV['date2']}, report.to_dict())
+
+
+    @patch('krux_cloud_health.report.MIN_PARALLEL_VALUES', 1)
+    def test_parse_cost_report_processes(self):
+        """
+        Report Test: A report parsed by several processes is the same as one parsed in this process
+        """
+        report = parse_cost_report(ReportTest.API_CALL, exclude_summary=False, processes=2)
+
+        self.assertEqual(['date1', 'date2'], report.categories)
+        self.assertEqual(parse_cost_report(ReportTest.API_CALL, exclude_summary=False).to_dict(), report.to_dict())
+
+    @patch('krux_cloud_health.report.multiprocessing.Pool')
+    def test_parse_cost_report_processes_shards(self, mock_pool):
+        """
+        Report Test: The rows of a large report are split evenly into one shard per process
+        """
+        rows = 744
+        api_call = {
+            'dimensions': [
+                {'time': [{'label': 'date{0}'.format(index)} for index in range(rows)]},
+                {'AWS-Service-Category': [{'label': 'service{0}'.format(index)} for index in range(1000)]},
+            ],
+            'data': [[[1]] * 1000] * rows,
+        }
+        mock_pool.return_value.map.side_effect = lambda function, shards: [
+            array('d', [1] * (len(shard) * 1000)) for shard in shards
+        ]
+
+        report = parse_cost_report(api_call, exclude_summary=False, processes=16)
+
+        mock_pool.assert_called_once()
+        self.assertEqual(16, mock_pool.call_args[0][0])
+        shards = mock_pool.return_value.map.call_args[0][1]
+        self.assertEqual([47] * 15 + [39], [len(shard) for shard in shards])
+        self.assertEqual(rows * 1000, len(report.values))
+
+    def test_parse_cost_report_processes_small(self):
+        """
+        Report Test: A small report is parsed in this process, even if several processes are given
+        """
+        with patch('krux_cloud_health.report.multiprocessing.Pool') as mock_pool:
+            report = parse_cost_report(ReportTest.API_CALL, exclude_summary=False, processes=16)
+
+        self.assertFalse(mock_pool.called)
+        self.assertEqual(parse_cost_report(ReportTest.API_CALL, exclude_summary=False).to_dict(), report.to_dict())
+
+    @patch('krux_cloud_health.report.numpy', None)
+    @patch('krux_cloud_health.report.MIN_PARALLEL_VALUES', 1)
+    def test_parse_cost_report_processes_array(self):
+        """
+        Report Test: Without numpy, the shards parsed by several processes are merged into a single flat array
+        """
+        report = parse_cost_report(ReportTest.API_CALL, exclude_summary=False, processes=2)
+
+        self.assertIsInstance(report.values, array)
+        self.assertEqual(6, len(report.values))
+        self.assertEqual(4.11, report.get_value('date2', 'service3'))
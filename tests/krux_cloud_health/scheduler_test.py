@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+#
+# © 2016-2018 Salesforce.com, inc.
+#
+
+#
+# Standard libraries
+#
+
+from __future__ import absolute_import
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+#
+# Third party libraries
+#
+
+from mock import MagicMock, patch
+
+#
+# Internal libraries
+#
+
+from krux_cloud_health.cloud_health import Interval
+from krux_cloud_health.scheduler import Job, load_jobs, parse_period, Scheduler
+
+
+class SchedulerTest(unittest.TestCase):
+
+    NOW = 1462060800.0
+    JOB = Job(report_id=1234, interval=Interval.daily, report_name='EC2', period=3600.0, date_format='%Y-%m-%d')
+    OTHER_JOB = JOB._replace(report_id=5678, report_name=None)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+        self.run_job = MagicMock()
+        self.scheduler = Scheduler(self.run_job, MagicMock(), jitter=0.1, logger=MagicMock())
+
+    def _write_jobs(self, jobs):
+        path = os.path.join(self.directory, 'jobs.json')
+        with open(path, 'w') as f:
+            json.dump({'jobs': jobs}, f)
+        return path
+
+    def test_parse_period(self):
+        """
+        Scheduler Test: Periods are given in seconds or with a unit
+        """
+        self.assertEqual(90.0, parse_period(90))
+        self.assertEqual(90.0, parse_period('90s'))
+        self.assertEqual(900.0, parse_period('15m'))
+        self.assertEqual(3600.0, parse_period('1h'))
+        self.assertEqual(86400.0, parse_period('1d'))
+        self.assertRaises(ValueError, parse_period, 'hourly')
+        self.assertRaises(ValueError, parse_period, 0)
+
+    def test_load_jobs(self):
+        """
+        Scheduler Test: The jobs are loaded with the defaults of the missing fields
+        """
+        path = self._write_jobs([
+            {'report_id': 1234, 'interval': 'daily', 'report_name': 'EC2', 'schedule': '1h'},
+            {'report_id': '5678', 'schedule': 3600},
+        ])
+
+        self.assertEqual(
+            [SchedulerTest.JOB, SchedulerTest.OTHER_JOB],
+            load_jobs(path, interval=Interval.daily, date_format='%Y-%m-%d'),
+        )
+
+    def test_load_jobs_invalid(self):
+        """
+        Scheduler Test: Jobs without a report ID or with an unknown interval are refused
+        """
+        self.assertRaises(ValueError, load_jobs, self._write_jobs([{'schedule': '1h'}]))
+        self.assertRaises(
+            ValueError, load_jobs, self._write_jobs([{'report_id': 1, 'schedule': '1h', 'interval': 'x'}]),
+        )
+
+    @patch('krux_cloud_health.scheduler.random.uniform', return_value=0.0)
+    @patch('krux_cloud_health.scheduler.time.time', return_value=NOW)
+    def test_dispatch(self, mock_time, mock_uniform):
+        """
+        Scheduler Test: Due jobs are submitted and scheduled again one period later
+        """
+        executor = MagicMock()
+        self.scheduler.set_jobs([SchedulerTest.JOB])
+
+        delay = self.scheduler._dispatch(executor)
+
+        executor.submit.assert_called_once_with(self.scheduler._run, SchedulerTest.JOB)
+        self.assertEqual(SchedulerTest.JOB.period, delay)
+
+    @patch('krux_cloud_health.scheduler.random.uniform', return_value=0.0)
+    @patch('krux_cloud_health.scheduler.time.time', return_value=NOW)
+    def test_dispatch_running(self, mock_time, mock_uniform):
+        """
+        Scheduler Test: A job whose previous run is not done is skipped
+        """
+        executor = MagicMock()
+        self.scheduler.set_jobs([SchedulerTest.JOB])
+        self.scheduler._running.add(SchedulerTest.JOB)
+
+        self.scheduler._dispatch(executor)
+
+        self.assertFalse(executor.submit.called)
+
+    def test_run_job(self):
+        """
+        Scheduler Test: A failed job is logged and can run again
+        """
+        self.run_job.side_effect = ValueError('Error message')
+        self.scheduler._running.add(SchedulerTest.JOB)
+
+        self.scheduler._run(SchedulerTest.JOB)
+
+        self.run_job.assert_called_once_with(SchedulerTest.JOB)
+        self.assertTrue(self.scheduler.logger.exception.called)
+        self.assertNotIn(SchedulerTest.JOB, self.scheduler._running)
+
+    @patch('krux_cloud_health.scheduler.time.time', return_value=NOW)
+    def test_reload(self, mock_time):
+        """
+        Scheduler Test: The jobs still listed after a reload keep their schedule
+        """
+        self.scheduler.set_jobs([SchedulerTest.JOB])
+        due = self.scheduler._queue[0][0]
+
+        self.scheduler.get_jobs.return_value = [SchedulerTest.JOB, SchedulerTest.OTHER_JOB]
+        mock_time.return_value = SchedulerTest.NOW + 60
+        self.scheduler._reload()
+
+        scheduled = dict((job, job_due) for job_due, _, _, job in self.scheduler._queue)
+        self.assertEqual(due, scheduled[SchedulerTest.JOB])
+        self.assertIn(SchedulerTest.OTHER_JOB, scheduled)
+
+    def test_reload_error(self):
+        """
+        Scheduler Test: The current jobs are kept when they cannot be reloaded
+        """
+        self.scheduler.set_jobs([SchedulerTest.JOB])
+        self.scheduler.get_jobs.side_effect = ValueError('Invalid job')
+
+        self.scheduler._reload()
+
+        self.assertEqual([SchedulerTest.JOB], [job for _, _, _, job in self.scheduler._queue])
+        self.assertTrue(self.scheduler.logger.exception.called)
+
+    def test_run_stop(self):
+        """
+        Scheduler Test: Run returns once stop is called
+        """
+        self.scheduler.stop()
+
+        self.scheduler.run()
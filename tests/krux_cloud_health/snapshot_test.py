@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+#
+# © 2016-2018 Salesforce.com, inc.
+#
+
+#
+# Standard libraries
+#
+
+from __future__ import absolute_import
+import os
+import shutil
+import tempfile
+import unittest
+
+#
+# Internal libraries
+#
+
+from krux_cloud_health.cloud_health import Interval
+from krux_cloud_health.report import CostReport, parse_cost_report
+from krux_cloud_health.snapshot import FORMAT_ARROW, FORMAT_PARQUET, numpy, pyarrow, SnapshotStore
+
+
+@unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+class SnapshotTest(unittest.TestCase):
+
+    REPORT_ID = 1234567890
+    API_CALL = {
+        'dimensions': [
+            {
+                'time': [
+                    {'label': '2016-05-01'},
+                    {'label': '2016-05-02'},
+                    {'label': '2016-05-03'},
+                ]
+            },
+            {
+                'AWS-Service-Category': [
+                    {'label': 'service1', 'parent': 0},
+                    {'label': 'service2', 'parent': 0},
+                ]
+            },
+        ],
+        'data': [
+            [[1.5], [None]],
+            [[2.5], [3.5]],
+            [[4.5], [5.5]],
+        ]
+    }
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.report = parse_cost_report(SnapshotTest.API_CALL)
+
+    def test_get_path(self):
+        """
+        Snapshot Test: Snapshots are partitioned by report and interval
+        """
+        store = SnapshotStore(self.directory)
+
+        self.assertEqual(
+            os.path.join(self.directory, 'report=1234567890', 'interval=daily', 'snapshot.arrow'),
+            store.get_path(SnapshotTest.REPORT_ID, Interval.daily),
+        )
+
+    def test_unknown_format(self):
+        """
+        Snapshot Test: An unknown format is refused
+        """
+        self.assertRaises(ValueError, SnapshotStore, self.directory, 'csv')
+
+    def test_load_missing(self):
+        """
+        Snapshot Test: Loading a report that was never saved returns None
+        """
+        self.assertIsNone(SnapshotStore(self.directory).load(SnapshotTest.REPORT_ID, Interval.daily))
+
+    def test_save_load(self):
+        """
+        Snapshot Test: A saved report is loaded back identical, in both formats
+        """
+        for file_format in (FORMAT_ARROW, FORMAT_PARQUET):
+            store = SnapshotStore(self.directory, file_format)
+            store.save(SnapshotTest.REPORT_ID, Interval.daily, self.report)
+
+            report = store.load(SnapshotTest.REPORT_ID, Interval.daily)
+
+            self.assertEqual(self.report.categories, report.categories)
+            self.assertEqual(self.report.services, report.services)
+            self.assertEqual(self.report.to_dict(), report.to_dict())
+
+    def test_save_load_parents(self):
+        """
+        Snapshot Test: The tree of the services is loaded back, in both formats
+        """
+        report = CostReport(
+            categories=['2016-05-01'],
+            services=['ec2', 'ec2-compute', 'ec2-storage'],
+            values=numpy.array([[10.0, 6.0, 4.0]]),
+            parents={'ec2-compute': 'ec2', 'ec2-storage': 'ec2'},
+        )
+
+        for file_format in (FORMAT_ARROW, FORMAT_PARQUET):
+            store = SnapshotStore(self.directory, file_format)
+            store.save(SnapshotTest.REPORT_ID, Interval.daily, report)
+
+            loaded = store.load(SnapshotTest.REPORT_ID, Interval.daily)
+            self.assertEqual(report.parents, loaded.parents)
+            self.assertEqual({'2016-05-01': {'Total': 10.0}}, loaded.get_total().to_dict())
+
+            loaded = store.load(SnapshotTest.REPORT_ID, Interval.daily, services=['ec2-compute'])
+            self.assertEqual(report.parents, loaded.parents)
+
+    def test_save_load_no_services(self):
+        """
+        Snapshot Test: A report without services, like a custom report of the total only, is saved and loaded back
+        """
+        report = CostReport(categories=['2016-05-01'], services=[], values=numpy.full((1, 0), numpy.nan))
+
+        store = SnapshotStore(self.directory)
+        store.save(SnapshotTest.REPORT_ID, Interval.daily, report)
+
+        loaded = store.load(SnapshotTest.REPORT_ID, Interval.daily)
+        self.assertEqual(['2016-05-01'], loaded.categories)
+        self.assertEqual([], loaded.services)
+
+    def test_save_deleted_category(self):
+        """
+        Snapshot Test: The categories removed from a report are not saved
+        """
+        store = SnapshotStore(self.directory)
+        del self.report['2016-05-01']
+        store.save(SnapshotTest.REPORT_ID, Interval.daily, self.report)
+
+        self.assertEqual(self.report.to_dict(), store.load(SnapshotTest.REPORT_ID, Interval.daily).to_dict())
+
+    def test_load_predicates(self):
+        """
+        Snapshot Test: Only the dates in the range and the selected services are loaded, in both formats
+        """
+        for file_format in (FORMAT_ARROW, FORMAT_PARQUET):
+            store = SnapshotStore(self.directory, file_format)
+            store.save(SnapshotTest.REPORT_ID, Interval.daily, self.report)
+
+            report = store.load(
+                SnapshotTest.REPORT_ID,
+                Interval.daily,
+                start='2016-05-02',
+                end='2016-05-03',
+                services=['service2'],
+            )
+
+            self.assertEqual({'2016-05-02': {'service2': 3.5}, '2016-05-03': {'service2': 5.5}}, report.to_dict())
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+#
+# © 2016-2018 Salesforce.com, inc.
+#
+
+#
+# Standard libraries
+#
+
+from __future__ import absolute_import
+import os
+import shutil
+import tempfile
+import unittest
+
+#
+# Internal libraries
+#
+
+from krux_cloud_health.state import ExportState, get_values_hash
+
+
+class StateTest(unittest.TestCase):
+
+    DAY = 24 * 60 * 60
+    TIMESTAMP = 1462060800
+    VALUES = {'service1': 1.5, 'service2': None}
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, 'state', '12345-daily.json')
+
+    def test_get_values_hash(self):
+        """
+        State Test: The hash depends on the values only
+        """
+        self.assertEqual(get_values_hash(StateTest.VALUES), get_values_hash(dict(StateTest.VALUES)))
+        self.assertNotEqual(get_values_hash(StateTest.VALUES), get_values_hash({'service1': 1.5}))
+
+    def test_load_missing(self):
+        """
+        State Test: A report that was never exported has an empty state
+        """
+        state = ExportState.load(self.path)
+
+        self.assertIsNone(state.high_water_mark)
+        self.assertEqual({}, state.hashes)
+        self.assertTrue(state.is_changed(StateTest.TIMESTAMP, StateTest.VALUES))
+
+    def test_save_load(self):
+        """
+        State Test: The saved state is loaded back
+        """
+        state = ExportState.load(self.path)
+        state.update(StateTest.TIMESTAMP, StateTest.VALUES)
+        state.save()
+
+        state = ExportState.load(self.path)
+
+        self.assertEqual(StateTest.TIMESTAMP, state.high_water_mark)
+        self.assertEqual({StateTest.TIMESTAMP: get_values_hash(StateTest.VALUES)}, state.hashes)
+
+    def test_is_changed(self):
+        """
+        State Test: Only the new and changed series are changed
+        """
+        state = ExportState(self.path)
+        state.update(StateTest.TIMESTAMP, StateTest.VALUES)
+
+        self.assertFalse(state.is_changed(StateTest.TIMESTAMP, dict(StateTest.VALUES)))
+        self.assertTrue(state.is_changed(StateTest.TIMESTAMP, {'service1': 2.0}))
+        self.assertTrue(state.is_changed(StateTest.TIMESTAMP + StateTest.DAY, StateTest.VALUES))
+        # Unknown but recent
+        self.assertTrue(state.is_changed(StateTest.TIMESTAMP - StateTest.DAY, StateTest.VALUES))
+
+    def test_retention(self):
+        """
+        State Test: The series older than the retention are forgotten and considered unchanged
+        """
+        state = ExportState(self.path, retention=StateTest.DAY)
+        state.update(StateTest.TIMESTAMP - 2 * StateTest.DAY, StateTest.VALUES)
+        state.update(StateTest.TIMESTAMP, StateTest.VALUES)
+        state.save()
+
+        self.assertEqual([StateTest.TIMESTAMP], list(state.hashes))
+        self.assertFalse(state.is_changed(StateTest.TIMESTAMP - 2 * StateTest.DAY, {'service1': 2.0}))
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+#
+# © 2016-2018 Salesforce.com, inc.
+#
+
+#
+# Standard libraries
+#
+
+from __future__ import absolute_import
+import json
+import unittest
+
+#
+# Internal libraries
+#
+
+from krux_cloud_health.stream import IterStream, ijson, iter_api_call_rows
+
+
+class StreamTest(unittest.TestCase):
+
+    DIMENSIONS = [
+        {'time': [{'label': 'date1'}, {'label': 'date2'}]},
+        {'AWS-Service-Category': [{'label': 'service1', 'parent': -1}]},
+    ]
+    DATA = [
+        [[1.5]],
+        [[None]],
+    ]
+
+    @staticmethod
+    def _get_stream(document, chunk_size=7):
+        body = document.encode('utf-8')
+        return IterStream(body[i:i + chunk_size] for i in range(0, len(body), chunk_size))
+
+    def test_iter_stream_read(self):
+        """
+        Stream Test: The chunks are re-split into reads of the requested size
+        """
+        stream = IterStream([b'abc', b'de', b'', b'fghij'])
+
+        self.assertEqual(b'abcd', stream.read(4))
+        self.assertEqual(b'efgh', stream.read(4))
+        self.assertEqual(b'ij', stream.read())
+        self.assertEqual(b'', stream.read(4))
+
+    @unittest.skipIf(ijson is None, 'ijson is not installed')
+    def test_iter_api_call_rows(self):
+        """
+        Stream Test: Each data row is yielded with the dimensions and its index
+        """
+        document = json.dumps({'dimensions': StreamTest.DIMENSIONS, 'data': StreamTest.DATA})
+
+        rows = list(iter_api_call_rows(StreamTest._get_stream(document)))
+
+        self.assertEqual(
+            [(StreamTest.DIMENSIONS, 0, [[1.5]]), (StreamTest.DIMENSIONS, 1, [[None]])],
+            rows,
+        )
+        self.assertIsInstance(rows[0][2][0][0], float)
+
+    @unittest.skipIf(ijson is None, 'ijson is not installed')
+    def test_iter_api_call_rows_data_first(self):
+        """
+        Stream Test: The rows sent before the dimensions are yielded once the dimensions are parsed
+        """
+        document = '{{"data": {0}, "dimensions": {1}}}'.format(
+            json.dumps(StreamTest.DATA), json.dumps(StreamTest.DIMENSIONS),
+        )
+
+        rows = list(iter_api_call_rows(StreamTest._get_stream(document)))
+
+        self.assertEqual([0, 1], [index for _, index, _ in rows])
+        self.assertEqual(StreamTest.DIMENSIONS, rows[0][0])
+
+    @unittest.skipIf(ijson is None, 'ijson is not installed')
+    def test_iter_api_call_rows_error(self):
+        """
+        Stream Test: An error returned by the API is raised as a ValueError
+        """
+        with self.assertRaises(ValueError) as ve:
+            list(iter_api_call_rows(StreamTest._get_stream('{"error": "Error message"}')))
+        self.assertEqual('Error message', str(ve.exception))
+
+    @unittest.skipIf(ijson is None, 'ijson is not installed')
+    def test_iter_api_call_rows_invalid(self):
+        """
+        Stream Test: An invalid document is raised as a ValueError
+        """
+        with self.assertRaises(ValueError):
+            list(iter_api_call_rows(StreamTest._get_stream('<html>Bad Gateway</html>')))